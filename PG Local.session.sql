@@ -78,7 +78,7 @@ LIMIT 20;
        -- Tfidf_vector Convert Pgvector--
 
 CREATE EXTENSION IF NOT EXISTS vector;
-ALTER TABLE games ADD COLUMN tfidf_vec_vector vector(5000);
+ALTER TABLE games ADD COLUMN IF NOT EXISTS tfidf_vec_vector vector(5000);
 
 UPDATE games
 SET tfidf_vec_vector = tfidf_vector::vector
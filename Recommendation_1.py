@@ -2,6 +2,7 @@ import psycopg2
 import pandas as pd
 import numpy as np
 from scipy.stats import spearmanr
+from popularity_ranking import get_ranking, fetch_game_vectors
 
 # ---------------------- Connect to PostgreSQL ----------------------
 conn = psycopg2.connect(
@@ -47,25 +48,13 @@ user_rows = cursor.fetchall()
 user_df = pd.DataFrame(user_rows, columns=['item_id', 'item_name', 'tfidf_vec_vector'])
 user_df['tfidf_vec_vector'] = user_df['tfidf_vec_vector'].apply(parse_pgvector)
 
-# ---------------------- Step 2: Get Top 10 Global Games (Excluding Matching Names) ----------------------
-user_game_names = tuple(user_df['item_name'].tolist())
-
-if len(user_game_names) == 1:
-    user_game_names += ("",)
-
-query_global_top = f"""
-SELECT ui.item_id, ui.item_name, g.tfidf_vec_vector, 
-       SUM(ui.playtime_forever) AS total_playtime, 
-       SUM(ui.playtime_2weeks) AS total_2weeks
-FROM user_items ui
-JOIN games g ON ui.item_id = g.id
-WHERE ui.item_name NOT IN %s
-GROUP BY ui.item_id, ui.item_name, g.tfidf_vec_vector
-ORDER BY total_playtime DESC, total_2weeks DESC
-LIMIT 10;
-"""
-cursor.execute(query_global_top, (user_game_names,))
-global_rows = cursor.fetchall()
+# ---------------------- Step 2: Get Top 10 Global Games (Excluding User's Games) ----------------------
+ranking = get_ranking(cursor)
+global_top_ids = ranking.top_n(10, by='total_playtime', exclude=set(user_df['item_id']))
+global_rows = [
+    (gid, ranking.names[gid], vec, ranking.stats[gid][1], ranking.stats[gid][2])
+    for gid, _, vec in fetch_game_vectors(cursor, global_top_ids)
+]
 global_df = pd.DataFrame(global_rows, columns=['item_id', 'item_name', 'tfidf_vec_vector', 'playtime_forever', 'playtime_2weeks'])
 global_df['tfidf_vec_vector'] = global_df['tfidf_vec_vector'].apply(parse_pgvector)
 
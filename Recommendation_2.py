@@ -2,6 +2,7 @@ import psycopg2
 import pandas as pd
 import numpy as np
 from scipy.stats import spearmanr
+from popularity_ranking import get_ranking, fetch_game_vectors
 
 # -------------------- PostgreSQL Connection --------------------
 conn = psycopg2.connect(
@@ -46,23 +47,13 @@ user_rows = cursor.fetchall()
 user_df = pd.DataFrame(user_rows, columns=['item_id', 'item_name', 'tfidf_vec_vector'])
 user_df['tfidf_vec_vector'] = user_df['tfidf_vec_vector'].apply(parse_pgvector)
 
-# Extract user game names to exclude from global top games
-user_game_names = tuple(user_df['item_name'].tolist())
-if len(user_game_names) == 1:
-    user_game_names += ("",)  # Ensure tuple has a trailing comma for single-item tuples
-
 # -------------------- Step 2: Global Top 10 Games by Popularity (excluding user's games) --------------------
-query_global_top = """
-SELECT ui.item_id, ui.item_name, g.tfidf_vec_vector, COUNT(ui.user_id) AS user_count
-FROM user_items ui
-JOIN games g ON ui.item_id = g.id
-WHERE ui.item_name NOT IN %s
-GROUP BY ui.item_id, ui.item_name, g.tfidf_vec_vector
-ORDER BY user_count DESC
-LIMIT 10;
-"""
-cursor.execute(query_global_top, (user_game_names,))
-global_rows = cursor.fetchall()
+ranking = get_ranking(cursor)
+global_top_ids = ranking.top_n(10, by='player_count', exclude=set(user_df['item_id']))
+global_rows = [
+    (gid, ranking.names[gid], vec, ranking.stats[gid][0])
+    for gid, _, vec in fetch_game_vectors(cursor, global_top_ids)
+]
 global_df = pd.DataFrame(global_rows, columns=['item_id', 'item_name', 'tfidf_vec_vector', 'user_count'])
 global_df['tfidf_vec_vector'] = global_df['tfidf_vec_vector'].apply(parse_pgvector)
 
@@ -52,7 +52,7 @@ cursor.execute(f"""
 SELECT id, app_name, tfidf_vec_vector
 FROM games
 WHERE id NOT IN %s
-ORDER BY tfidf_vec_vector <=> %s::vector
+ORDER BY tfidf_sparse <=> %s::vector::sparsevec
 LIMIT 10;
 """, (played_ids, avg_vector_pg))
 
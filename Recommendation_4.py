@@ -16,17 +16,30 @@ cursor = conn.cursor()
 
 # -------------------- Step 1: Get Top 20 Similar Users --------------------
 target_user = 'Br0wni3'
+# Users with more than 1000 played games are not in the HNSW index, so they
+# are scored exactly and merged with the indexed candidates
 cursor.execute("""
-    SELECT user_id
-    FROM user_play_ratio
-    WHERE user_id != %s
-    ORDER BY playtime_vector <=> (
-        SELECT playtime_vector
-        FROM user_play_ratio
-        WHERE user_id = %s
-    ) ASC
+    WITH target AS (
+        SELECT playtime_sparse FROM user_play_ratio
+        WHERE user_id = %(user)s AND playtime_sparse IS NOT NULL
+    )
+    SELECT user_id FROM (
+        (SELECT user_id, playtime_sparse <=> (SELECT playtime_sparse FROM target) AS distance
+         FROM user_play_ratio
+         WHERE user_id != %(user)s AND playtime_nnz <= 1000
+           AND EXISTS (SELECT 1 FROM target)
+         ORDER BY playtime_sparse <=> (SELECT playtime_sparse FROM target)
+         LIMIT 20)
+        UNION ALL
+        (SELECT user_id, playtime_sparse <=> (SELECT playtime_sparse FROM target) AS distance
+         FROM user_play_ratio
+         WHERE user_id != %(user)s AND playtime_nnz > 1000
+           AND EXISTS (SELECT 1 FROM target))
+    ) candidates
+    WHERE distance IS NOT NULL
+    ORDER BY distance ASC
     LIMIT 20;
-""", (target_user, target_user))
+""", {'user': target_user})
 
 top_user_ids = [row[0] for row in cursor.fetchall()]
 
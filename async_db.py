@@ -0,0 +1,128 @@
+import asyncpg
+from pgvector.asyncpg import register_vector
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    database="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port=5432,
+)
+
+POOL_MIN = 2
+POOL_MAX = 20
+STATEMENT_CACHE = 256
+
+# ------------------ Pool ------------------
+async def _init_connection(conn):
+    """Per-connection setup: pgvector codecs so vector columns decode to numpy."""
+    await register_vector(conn)
+
+async def create_pool(min_size=POOL_MIN, max_size=POOL_MAX, **overrides):
+    cfg = dict(DB_CFG, **overrides)
+    return await asyncpg.create_pool(min_size=min_size, max_size=max_size,
+                                     statement_cache_size=STATEMENT_CACHE,
+                                     init=_init_connection, **cfg)
+
+# ------------------ Queries ------------------
+class AsyncGameDB:
+    """
+    Non-blocking data access for the service endpoints.
+
+    Each method borrows a pooled connection only for the duration of one
+    prepared statement, so concurrent requests wait on the pool rather than
+    on each other.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    @classmethod
+    async def connect(cls, **pool_kwargs):
+        return cls(await create_pool(**pool_kwargs))
+
+    async def close(self):
+        await self.pool.close()
+
+    async def user_top_games(self, user_id, limit=10):
+        rows = await self.pool.fetch("""
+            SELECT item_id, item_name, playtime_forever + playtime_2weeks AS total_play
+            FROM user_items
+            WHERE user_id = $1
+            ORDER BY playtime_forever + playtime_2weeks DESC
+            LIMIT $2;
+        """, user_id, limit)
+        return [dict(r) for r in rows]
+
+    async def owned_item_ids(self, user_id):
+        rows = await self.pool.fetch("SELECT item_id FROM user_items WHERE user_id = $1;", user_id)
+        return {r['item_id'] for r in rows}
+
+    async def popular_games(self, limit=10, exclude=()):
+        """Top games by player count from game_popularity, skipping ``exclude``."""
+        rows = await self.pool.fetch("""
+            SELECT item_id, item_name, player_count
+            FROM game_popularity
+            WHERE NOT (item_id = ANY($2::text[]))
+            ORDER BY player_count DESC
+            LIMIT $1;
+        """, limit, list(exclude))
+        return [dict(r) for r in rows]
+
+    async def similar_users(self, user_id, limit=20):
+        """
+        Nearest users by playtime ratios: HNSW on playtime_sparse for users
+        with <= 1000 played games, plus an exact scan of the heavier ones.
+        """
+        rows = await self.pool.fetch("""
+            WITH target AS (
+                SELECT playtime_sparse FROM user_play_ratio
+                WHERE user_id = $1 AND playtime_sparse IS NOT NULL
+            )
+            SELECT user_id, distance FROM (
+                (SELECT upr.user_id,
+                        upr.playtime_sparse <=> (SELECT playtime_sparse FROM target) AS distance
+                 FROM user_play_ratio upr
+                 WHERE upr.user_id <> $1 AND upr.playtime_nnz <= 1000
+                   AND EXISTS (SELECT 1 FROM target)
+                 ORDER BY upr.playtime_sparse <=> (SELECT playtime_sparse FROM target)
+                 LIMIT $2)
+                UNION ALL
+                (SELECT upr.user_id,
+                        upr.playtime_sparse <=> (SELECT playtime_sparse FROM target) AS distance
+                 FROM user_play_ratio upr
+                 WHERE upr.user_id <> $1 AND upr.playtime_nnz > 1000
+                   AND EXISTS (SELECT 1 FROM target))
+            ) candidates
+            WHERE distance IS NOT NULL
+            ORDER BY distance
+            LIMIT $2;
+        """, user_id, limit)
+        return [dict(r) for r in rows]
+
+    async def similar_games(self, item_id, limit=10):
+        """Nearest games by TF-IDF (HNSW on tfidf_sparse, migrations/003)."""
+        rows = await self.pool.fetch("""
+            SELECT g.id AS item_id, g.app_name,
+                   g.tfidf_sparse <=> t.tfidf_sparse AS distance
+            FROM games g,
+                 (SELECT tfidf_sparse FROM games WHERE id = $1) t
+            WHERE g.id <> $1
+            ORDER BY g.tfidf_sparse <=> t.tfidf_sparse
+            LIMIT $2;
+        """, item_id, limit)
+        return [dict(r) for r in rows]
+
+    async def latest_change_id(self):
+        return await self.pool.fetchval("SELECT COALESCE(MAX(change_id), 0) FROM user_changes;")
+
+    async def changes_since(self, change_id):
+        """(latest change_id, user_ids changed after ``change_id``) from delta_ingest's user_changes log."""
+        row = await self.pool.fetchrow("""
+            SELECT COALESCE(MAX(change_id), $1) AS last_id,
+                   COALESCE(array_agg(DISTINCT user_id), '{}') AS user_ids
+            FROM user_changes
+            WHERE change_id > $1;
+        """, change_id)
+        return row['last_id'], list(row['user_ids'])
@@ -2,97 +2,65 @@ import json
 import sys
 from pathlib import Path
 
+from ingest_validation import REJECTS_DIR, RejectLog
+from coercion import compile_schema, list_of, to_count, to_str
+
 RAW_FILE   = Path('data1/australian_users_items.json')
 CLEAN_FILE = Path('data/australian_users_items_clean.json')
+CLEAN_JSONL = Path('data/australian_users_items_clean.jsonl')   # one user per line, for streaming readers
 
-USER_KEY_ORDER = [
-    'user_id',
-    'steam_id',
-    'items_count',
-    'user_url',
-    'items'
-]
-
-ITEM_KEY_ORDER = [
-    'item_id',
-    'item_name',
-    'playtime_forever',
-    'playtime_2weeks'
-]
+ITEM_FIELD_TYPES = {
+    'item_id': to_str,
+    'item_name': to_str,
+    'playtime_forever': to_count,
+    'playtime_2weeks': to_count,
+}
+ITEM_KEY_ORDER = list(ITEM_FIELD_TYPES)
 
-def fix_type(val):
-    """Convert the most common 'lazy' values to canonical JSON types."""
-    if val is None:
-        return None
-    if isinstance(val, (int, float, bool)):
-        return val
-    if isinstance(val, str):
-        val = val.strip()
-        # boolean strings
-        if val.lower() in ('true', 'false'):
-            return val.lower() == 'true'
-        # numeric strings
-        try:
-            if '.' in val:
-                return float(val)
-            return int(val)
-        except ValueError:
-            pass
-        # "Free to Play", "Free", etc.
-        if val.lower() in ('free to play', 'free'):
-            return val  # keep as string, but normalized
-        return val
-    if isinstance(val, list):
-        return [fix_type(v) for v in val]
-    return val
+# Return a new item dict with keys in ITEM_KEY_ORDER, each field coerced by its schema type
+reorder_item = compile_schema(ITEM_FIELD_TYPES)
 
-def reorder_item(item: dict) -> dict:
-    """Return a new item dict with keys in ITEM_KEY_ORDER."""
-    ordered = {}
-    for k in ITEM_KEY_ORDER:
-        v = item.get(k)
-        ordered[k] = fix_type(v)
-    # append any extra keys that the template missed
-    for k, v in item.items():
-        if k not in ITEM_KEY_ORDER:
-            ordered[k] = fix_type(v)
-    return ordered
+USER_FIELD_TYPES = {
+    'user_id': to_str,
+    'steam_id': to_str,
+    'items_count': to_count,
+    'user_url': to_str,
+    'items': list_of(reorder_item),
+}
+USER_KEY_ORDER = list(USER_FIELD_TYPES)
 
-def reorder_user(obj: dict) -> dict:
-    """Return a new user dict with keys in USER_KEY_ORDER."""
-    ordered = {}
-    for k in USER_KEY_ORDER:
-        v = obj.get(k)
-        if k == 'items' and isinstance(v, list):
-            v = [reorder_item(item) for item in v]
-        ordered[k] = fix_type(v)
-    # append any extra keys that the template missed
-    for k, v in obj.items():
-        if k not in USER_KEY_ORDER:
-            ordered[k] = fix_type(v)
-    return ordered
+# Return a new user dict with keys in USER_KEY_ORDER
+reorder_user = compile_schema(USER_FIELD_TYPES)
 
 def main() -> None:
     if not RAW_FILE.exists():
         sys.exit(f'{RAW_FILE} not found.')
 
-    users = []
-    with RAW_FILE.open(encoding='utf-8') as f:
-        for line in f:
+    # Stream every cleaned user straight out: the JSON array (same layout as
+    # json.dump(indent=2)) and one JSON object per line for streaming readers
+    count = 0
+    with RAW_FILE.open(encoding='utf-8') as f, \
+            CLEAN_FILE.open('w', encoding='utf-8') as out, \
+            CLEAN_JSONL.open('w', encoding='utf-8') as out_lines, \
+            RejectLog(REJECTS_DIR / 'australian_users_items_clean.jsonl') as rejects:
+        out.write('[')
+        for lineno, line in enumerate(f, 1):
             line = line.strip()
             if not line:
                 continue
             try:
                 obj = eval(line)         
                 obj = reorder_user(obj)
-                users.append(obj)
             except Exception as e:
-                print(f'Skipped bad line: {e}')
-
-    with CLEAN_FILE.open('w', encoding='utf-8') as f:
-        json.dump(users, f, indent=2, ensure_ascii=False, sort_keys=False)
+                rejects.reject('raw', type(e).__name__, line, line=lineno, error=str(e))
+                continue
+            body = json.dumps(obj, indent=2, ensure_ascii=False).replace('\n', '\n  ')
+            out.write(f"{',' if count else ''}\n  {body}")
+            out_lines.write(json.dumps(obj, ensure_ascii=False) + '\n')
+            count += 1
+        out.write('\n]' if count else ']')
 
-    print(f'Wrote {len(users)} user objects to {CLEAN_FILE}')
+    print(f'Wrote {count} user objects to {CLEAN_FILE} and {CLEAN_JSONL}; {rejects.summary()}')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,217 @@
+import psycopg2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from concurrent.futures import ProcessPoolExecutor
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+N_TOP = 10            # games per side of the matching (user top vs global top)
+USER_LIMIT = None     # evaluate every user when None
+CHUNK_SIZE = 2048     # users per worker task for the assignment step
+WORKERS = None        # defaults to os.cpu_count()
+
+# ------------------ Helpers ------------------
+def parse_pgvector(vec):
+    if vec is None:
+        return np.array([])
+    if isinstance(vec, (list, tuple, np.ndarray)):
+        try:
+            return np.array(vec, dtype=float)
+        except Exception:
+            return np.array([])
+    if isinstance(vec, str):
+        s = vec.strip().strip('{}[]')
+        if not s:
+            return np.array([])
+        try:
+            return np.array([float(x.strip()) for x in s.split(',') if x.strip()], dtype=float)
+        except ValueError:
+            return np.array([])
+    return np.array([])
+
+def _l2_normalize(stack):
+    """Normalize the last axis to unit length (zero rows stay zero)."""
+    norms = np.linalg.norm(stack, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return stack / norms
+
+# ------------------ Batched Similarity ------------------
+def batched_cosine(user_stack, global_stack):
+    """
+    Cosine similarity for many users in one einsum.
+
+    Args:
+        user_stack: (users, n, dim) array of each user's top game vectors
+        global_stack: (users, n, dim) or (n, dim) array of the global games
+            to match against (a single shared set is broadcast to every user)
+
+    Returns:
+        (users, n, n) similarity tensor, same layout as the per-user
+        ``cosine_similarity(user_mat, global_mat)`` in cosine_similarity_1.py
+    """
+    u = _l2_normalize(np.asarray(user_stack, dtype=np.float32))
+    g = _l2_normalize(np.asarray(global_stack, dtype=np.float32))
+    if g.ndim == 2:
+        return np.einsum('uid,jd->uij', u, g, optimize=True)
+    return np.einsum('uid,ujd->uij', u, g, optimize=True)
+
+def _assign_chunk(sim_chunk):
+    """Run the Hungarian algorithm on every matrix of a (k, n, n) chunk."""
+    out = np.empty(sim_chunk.shape[0], dtype=np.float64)
+    for i, sim in enumerate(sim_chunk):
+        row_ind, col_ind = linear_sum_assignment(1.0 - sim)
+        out[i] = sim[row_ind, col_ind].mean()
+    return out
+
+def batched_matching_scores(sim_tensor, chunk_size=CHUNK_SIZE, workers=WORKERS):
+    """
+    Average matched cosine per user for a (users, n, n) similarity tensor.
+
+    Chunks of the tensor are solved in a process pool; small inputs are
+    solved in-process to avoid the pool start-up cost.
+    """
+    sim_tensor = np.asarray(sim_tensor)
+    if sim_tensor.shape[0] <= chunk_size:
+        return _assign_chunk(sim_tensor)
+
+    chunks = [sim_tensor[i:i + chunk_size] for i in range(0, sim_tensor.shape[0], chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.concatenate(list(pool.map(_assign_chunk, chunks)))
+
+def evaluate_users(user_stack, global_stack, chunk_size=CHUNK_SIZE, workers=WORKERS):
+    """Stacked cosine + optimal matching; returns per-user average matched cosine."""
+    sims = batched_cosine(user_stack, global_stack)
+    return batched_matching_scores(sims, chunk_size=chunk_size, workers=workers)
+
+# ------------------ Database Loading ------------------
+def fetch_user_top_stacks(cursor, n_top=N_TOP, user_limit=USER_LIMIT):
+    """
+    Load every user's top-N game vectors in a single query.
+
+    Users with fewer than ``n_top`` vectors of the common dimension are
+    skipped, exactly like the single-user scripts bail out.
+
+    Returns:
+        (user_ids, stack, owned) where stack is (users, n_top, dim) and
+        owned maps user_id -> set of owned item_ids
+    """
+    cursor.execute(
+        """
+        SELECT user_id, item_id, tfidf_vec_vector
+        FROM (
+            SELECT ui.user_id, ui.item_id, g.tfidf_vec_vector,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY ui.user_id
+                       ORDER BY ui.playtime_forever + ui.playtime_2weeks DESC
+                   ) AS rnk
+            FROM user_items ui
+            JOIN games g ON ui.item_id = g.id
+        ) t
+        WHERE rnk <= %s
+        ORDER BY user_id, rnk;
+        """,
+        (n_top,),
+    )
+    per_user = {}
+    for user_id, item_id, vec in cursor.fetchall():
+        per_user.setdefault(user_id, []).append((item_id, parse_pgvector(vec)))
+
+    cursor.execute("SELECT user_id, item_id FROM user_items;")
+    owned = {}
+    for user_id, item_id in cursor.fetchall():
+        owned.setdefault(user_id, set()).add(item_id)
+
+    dims = [v.shape[0] for rows in per_user.values() for _, v in rows if v.size > 0]
+    if not dims:
+        return [], np.empty((0, n_top, 0)), owned
+    dim = max(set(dims), key=dims.count)
+
+    user_ids, stacks = [], []
+    for user_id, rows in per_user.items():
+        vecs = [v for _, v in rows if v.size == dim]
+        if len(vecs) < n_top:
+            continue
+        user_ids.append(user_id)
+        stacks.append(np.stack(vecs[:n_top]))
+        if user_limit and len(user_ids) >= user_limit:
+            break
+
+    if not stacks:
+        return [], np.empty((0, n_top, dim)), owned
+    return user_ids, np.stack(stacks).astype(np.float32), owned
+
+def fetch_global_ranking(cursor, limit):
+    """Global games by summed playtime (the cosine_similarity_1.py ordering)."""
+    cursor.execute(
+        """
+        SELECT ui.item_id, g.tfidf_vec_vector
+        FROM user_items ui
+        JOIN games g ON ui.item_id = g.id
+        GROUP BY ui.item_id, g.tfidf_vec_vector
+        ORDER BY SUM(ui.playtime_forever + ui.playtime_2weeks) DESC
+        LIMIT %s;
+        """,
+        (limit,),
+    )
+    return [(item_id, parse_pgvector(vec)) for item_id, vec in cursor.fetchall()]
+
+def build_global_stack(user_ids, owned, ranking, dim, n_top=N_TOP):
+    """
+    Per-user global top-N excluding owned games, as a (users, n_top, dim) stack.
+
+    The ranking is fetched once and walked per user, so the exclusion costs
+    no extra query. Users whose exclusions exhaust the ranking get a mask of
+    False in the returned ``valid`` array.
+    """
+    ranking = [(gid, v) for gid, v in ranking if v.size == dim]
+    stack = np.zeros((len(user_ids), n_top, dim), dtype=np.float32)
+    valid = np.zeros(len(user_ids), dtype=bool)
+    for u, user_id in enumerate(user_ids):
+        mine = owned.get(user_id, ())
+        picked = 0
+        for gid, v in ranking:
+            if gid in mine:
+                continue
+            stack[u, picked] = v
+            picked += 1
+            if picked == n_top:
+                valid[u] = True
+                break
+    return stack, valid
+
+# ------------------ Main ------------------
+def main():
+    conn = psycopg2.connect(**DB_CFG)
+    cursor = conn.cursor()
+
+    try:
+        user_ids, user_stack, owned = fetch_user_top_stacks(cursor)
+        if not user_ids:
+            raise RuntimeError("No users with enough TF-IDF vectors for matching.")
+        dim = user_stack.shape[2]
+
+        # Enough headroom for the largest library's exclusions
+        max_owned = max(len(owned.get(u, ())) for u in user_ids)
+        ranking = fetch_global_ranking(cursor, max_owned + N_TOP)
+        global_stack, valid = build_global_stack(user_ids, owned, ranking, dim)
+
+        user_ids = [u for u, ok in zip(user_ids, valid) if ok]
+        scores = evaluate_users(user_stack[valid], global_stack[valid])
+
+        print(f"=== Optimal Matching Average Cosine ({len(user_ids)} users) ===")
+        for user_id, score in zip(user_ids, scores):
+            print(f"{user_id}: {score:.4f}")
+        print(f"\nMean over users: {float(scores.mean()):.4f}")
+    finally:
+        cursor.close()
+        conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Throughput of per-request scoring vs MicroBatcher coalescing on synthetic ALS factors.
+
+Fires CONCURRENCY simultaneous requests per round from distinct users and
+reports requests/second for both paths; no database or saved model needed.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import scipy.sparse as sp
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from implicit_als import ImplicitALS
+from micro_batching import MicroBatcher
+
+# ------------------ Helpers ------------------
+def synthetic_model(n_users, n_items, factors, seed=0):
+    rng = np.random.default_rng(seed)
+    owned = sp.random(n_users, n_items, density=50 / n_items, format='csr', random_state=seed)
+    owned.data[:] = 1
+    return ImplicitALS(
+        [f"u{i}" for i in range(n_users)], [str(i) for i in range(n_items)],
+        rng.standard_normal((n_users, factors)).astype(np.float32),
+        rng.standard_normal((n_items, factors)).astype(np.float32),
+        owned=owned.astype(np.int8),
+    )
+
+async def run_single(model, users, pool, k):
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[loop.run_in_executor(pool, model.recommend, u, k) for u in users])
+
+async def run_batched(model, users, pool, k, max_batch, max_wait_ms):
+    batcher = MicroBatcher(lambda keys: model.recommend_batch(keys, k), max_batch=max_batch,
+                           max_wait_ms=max_wait_ms, executor=pool)
+    await asyncio.gather(*[batcher.submit(u) for u in users])
+    return batcher.stats()
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--items', type=int, default=10_000)
+    parser.add_argument('--factors', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=512)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+
+    model = synthetic_model(args.users, args.items, args.factors)
+    rng = np.random.default_rng(1)
+    rounds = [[f"u{i}" for i in rng.choice(args.users, args.concurrency, replace=False)]
+              for _ in range(args.rounds)]
+    total = args.concurrency * args.rounds
+
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        t0 = time.perf_counter()
+        for users in rounds:
+            asyncio.run(run_single(model, users, pool, 10))
+        single = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for users in rounds:
+            stats = asyncio.run(run_batched(model, users, pool, 10, args.max_batch, args.max_wait_ms))
+        batched = time.perf_counter() - t0
+
+    print(f"per-request: {total / single:10.0f} req/s")
+    print(f"micro-batch: {total / batched:10.0f} req/s  (mean batch {stats['mean_batch_size']:.1f})")
+    print(f"speed-up:    {single / batched:10.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+EXPLAIN the recommenders' hot per-user queries and report how each table is scanned.
+
+Run it before and after ``python migrate.py`` (optionally with ``--analyze``
+for real timings) and compare, or ``--save`` one run and ``--compare`` the next:
+every query should move from a Seq Scan on user_items / games /
+user_play_ratio to an Index (Only) Scan.
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import psycopg2
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+USER_ID = "doctr"
+LARGE_TABLES = {'user_items', 'games', 'user_play_ratio'}
+
+HOT_QUERIES = {
+    'user_top_by_total': ("""
+        SELECT ui.item_id, ui.item_name, g.tfidf_vec_vector
+        FROM user_items ui
+        JOIN games g ON ui.item_id = g.id
+        WHERE ui.user_id = %(user)s
+        ORDER BY ui.playtime_forever + ui.playtime_2weeks DESC
+        LIMIT 10
+    """),
+    'user_top_by_forever': ("""
+        SELECT item_id, item_name, playtime_forever, playtime_2weeks
+        FROM user_items
+        WHERE user_id = %(user)s
+        ORDER BY playtime_forever DESC, playtime_2weeks DESC
+        LIMIT 10
+    """),
+    'user_owned_ids': ("""
+        SELECT item_id FROM user_items WHERE user_id = %(user)s
+    """),
+    'item_player_count': ("""
+        SELECT COUNT(*) FROM user_items
+        WHERE item_id = (SELECT item_id FROM user_items WHERE user_id = %(user)s LIMIT 1)
+    """),
+    'similar_users': ("""
+        WITH target AS (
+            SELECT playtime_sparse FROM user_play_ratio
+            WHERE user_id = %(user)s AND playtime_sparse IS NOT NULL
+        )
+        SELECT user_id FROM (
+            (SELECT upr.user_id,
+                    upr.playtime_sparse <=> (SELECT playtime_sparse FROM target) AS distance
+             FROM user_play_ratio upr
+             WHERE upr.user_id <> %(user)s AND upr.playtime_nnz <= 1000
+               AND EXISTS (SELECT 1 FROM target)
+             ORDER BY upr.playtime_sparse <=> (SELECT playtime_sparse FROM target)
+             LIMIT 20)
+            UNION ALL
+            (SELECT upr.user_id,
+                    upr.playtime_sparse <=> (SELECT playtime_sparse FROM target) AS distance
+             FROM user_play_ratio upr
+             WHERE upr.user_id <> %(user)s AND upr.playtime_nnz > 1000
+               AND EXISTS (SELECT 1 FROM target))
+        ) candidates
+        WHERE distance IS NOT NULL
+        ORDER BY distance
+        LIMIT 20
+    """),
+    'similar_games': ("""
+        SELECT g.id
+        FROM games g
+        ORDER BY g.tfidf_sparse <=> (
+            SELECT tfidf_sparse FROM games WHERE tfidf_sparse IS NOT NULL LIMIT 1
+        )
+        LIMIT 10
+    """),
+}
+
+# ------------------ Helpers ------------------
+def _scan_nodes(plan, out):
+    """Collect (node type, relation, index) for every scan node in a plan tree."""
+    node = plan.get('Node Type', '')
+    if 'Scan' in node:
+        out.append((node, plan.get('Relation Name'), plan.get('Index Name')))
+    for child in plan.get('Plans', []):
+        _scan_nodes(child, out)
+    return out
+
+def explain(cursor, sql, params, analyze=False):
+    opts = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    cursor.execute(f"EXPLAIN ({opts}) {sql}", params)
+    doc = cursor.fetchone()[0]
+    doc = json.loads(doc) if isinstance(doc, str) else doc
+    return doc[0]
+
+def check_plans(cursor, user_id=USER_ID, analyze=False):
+    """Plan summary per hot query: scan nodes, estimated cost and (with analyze) time."""
+    report = {}
+    for name, sql in HOT_QUERIES.items():
+        try:
+            t0 = time.perf_counter()
+            doc = explain(cursor, sql, {'user': user_id}, analyze=analyze)
+            elapsed = time.perf_counter() - t0
+        except psycopg2.Error as e:
+            cursor.connection.rollback()
+            report[name] = {'error': str(e).strip()}
+            continue
+        scans = _scan_nodes(doc['Plan'], [])
+        report[name] = {
+            'scans': scans,
+            'seq_scans': [rel for node, rel, _ in scans if node == 'Seq Scan' and rel in LARGE_TABLES],
+            'total_cost': doc['Plan'].get('Total Cost'),
+            'execution_ms': doc.get('Execution Time') if analyze else None,
+            'wall_ms': round(elapsed * 1000, 2),
+        }
+    return report
+
+def print_report(report, baseline=None):
+    for name, r in report.items():
+        if 'error' in r:
+            print(f"- {name}: ERROR {r['error']}")
+            continue
+        status = "SEQ SCAN on " + ", ".join(r['seq_scans']) if r['seq_scans'] else "index only"
+        scans = "; ".join(f"{n} {rel or ''}{' using ' + idx if idx else ''}".strip()
+                          for n, rel, idx in r['scans'])
+        line = f"- {name}: {status} | cost {r['total_cost']}"
+        if r['execution_ms'] is not None:
+            line += f" | {r['execution_ms']:.2f} ms"
+        if baseline and name in baseline and 'total_cost' in baseline[name]:
+            line += f" (was cost {baseline[name]['total_cost']}" \
+                    f"{', seq scan' if baseline[name]['seq_scans'] else ''})"
+        print(line)
+        print(f"    {scans}")
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--user', default=USER_ID)
+    parser.add_argument('--analyze', action='store_true', help="run EXPLAIN ANALYZE (executes the queries)")
+    parser.add_argument('--save', type=Path, help="write the report as JSON")
+    parser.add_argument('--compare', type=Path, help="JSON report from an earlier run")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CFG)
+    try:
+        with conn.cursor() as cur:
+            report = check_plans(cur, args.user, args.analyze)
+    finally:
+        conn.close()
+
+    baseline = json.loads(args.compare.read_text()) if args.compare else None
+    print_report(report, baseline)
+    if args.save:
+        args.save.write_text(json.dumps(report, indent=2))
+
+    # Non-zero exit if any hot query still sequentially scans a large table
+    sys.exit(1 if any(r.get('seq_scans') for r in report.values()) else 0)
+
+if __name__ == "__main__":
+    main()
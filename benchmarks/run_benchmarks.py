@@ -0,0 +1,332 @@
+"""
+Benchmark the offline pipeline stages on seeded synthetic data at several user scales.
+
+Each case is timed ``--repeat`` times after data generation; results are
+written as JSON (commit, library versions, per-case timings) so a later run
+can ``--compare`` against it and exit non-zero on regressions. No database
+is needed; the ingest case measures the JSON -> Arrow snapshot path.
+"""
+import argparse
+import atexit
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import scipy
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+import synthetic_data
+import snapshot
+from hybrid_recommender import HybridRecommender, play_matrices
+from implicit_als import ImplicitALS, confidence_matrix
+from item_cooccurrence import ItemCooccurrence, cooccurrence_topn
+from inverted_index import InvertedIndex, build_index
+from minhash_lsh import MinHashLSH
+from user_similarity import _row_normalize
+
+# ------------------ Configuration ------------------
+SCALES = (10_000, 100_000, 1_000_000)
+RESULTS_DIR = ROOT / 'benchmarks' / 'results'
+REPEAT = 3
+SAMPLE_USERS = 200        # users per neighbour / recommendation case
+BATCH = 64                # users per recommend_batch call
+TOP_K = 10
+SIMILARITY_BLOCK = 2048   # games per block in the all-pairs top-K
+REGRESSION = 1.25         # --compare fails when median time grows by more than this factor
+
+CASES = []
+
+def case(name, unit, max_users=None, scaled=True):
+    """
+    Register ``fn(ctx) -> (callable, work)``. The callable is what gets
+    timed; ``work`` is how many ``unit``s one call processes.
+    Cases with ``scaled=False`` do not depend on the user count and run
+    at the first scale only.
+    """
+    def register(fn):
+        CASES.append({'name': name, 'unit': unit, 'max_users': max_users,
+                      'scaled': scaled, 'setup': fn})
+        return fn
+    return register
+
+# ------------------ Context ------------------
+class Context:
+    """Lazily built data for one scale, shared by the cases."""
+
+    def __init__(self, n_users, seed):
+        self.n_users = n_users
+        self.seed = seed
+        self._cache = {}
+
+    def _get(self, key, build):
+        if key not in self._cache:
+            self._cache[key] = build()
+        return self._cache[key]
+
+    @property
+    def data(self):
+        return self._get('data', lambda: synthetic_data.generate_interactions(self.n_users, seed=self.seed))
+
+    @property
+    def games(self):
+        return self._get('games', lambda: synthetic_data.generate_games(seed=self.seed))
+
+    @property
+    def text(self):
+        return self._get('text', lambda: synthetic_data.combined_text(self.games))
+
+    @property
+    def tfidf(self):
+        return self._get('tfidf', lambda: TfidfVectorizer(max_features=5000).fit_transform(self.text))
+
+    @property
+    def shape(self):
+        return (self.data['n_users'], self.data['n_items'])
+
+    @property
+    def hybrid(self):
+        def build():
+            d = self.data
+            play, play_total = play_matrices(d['user'], d['item'], d['playtime_forever'],
+                                             d['playtime_2weeks'], self.shape)
+            names = [g['app_name'] for g in self.games[:d['n_items']]]
+            return HybridRecommender([f"user{u}" for u in range(d['n_users'])],
+                                     [str(i) for i in range(d['n_items'])], names,
+                                     play, play_total, self.tfidf[:d['n_items']])
+        return self._get('hybrid', build)
+
+    @property
+    def owned(self):
+        d = self.data
+        return self._get('owned', lambda: sp.csr_matrix(
+            (np.ones(d['user'].size, dtype=np.bool_), (d['user'], d['item'])), shape=self.shape))
+
+    @property
+    def conf(self):
+        d = self.data
+        return self._get('conf', lambda: confidence_matrix(
+            d['user'], d['item'], d['playtime_forever'], d['playtime_2weeks'], self.shape))
+
+    def sample_users(self, n=SAMPLE_USERS):
+        """Users with at least one game, fixed by the seed."""
+        owners = np.unique(self.data['user'])
+        rng = np.random.default_rng(self.seed)
+        return rng.choice(owners, size=min(n, owners.size), replace=False)
+
+# ------------------ Cases ------------------
+@case('ingest_json_to_snapshot', 'rows', max_users=100_000)
+def bench_ingest(ctx):
+    tmp = Path(tempfile.mkdtemp(prefix='bench_ingest_'))
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    users_json, games_json = tmp / 'users.json', tmp / 'games.json'
+    users_json.write_text(json.dumps(synthetic_data.user_records(ctx.data, ctx.games)), encoding='utf-8')
+    games_json.write_text(json.dumps(ctx.games), encoding='utf-8')
+
+    def run():
+        snapshot.export_from_json(users_json, games_json, tmp / 'snapshot')
+        snapshot.interaction_arrays(snapshot.load_table('user_items', tmp / 'snapshot'))
+    return run, int(ctx.data['user'].size)
+
+@case('tfidf_build', 'games', scaled=False)
+def bench_tfidf(ctx):
+    text = ctx.text
+    return (lambda: TfidfVectorizer(max_features=5000).fit_transform(text)), len(text)
+
+@case('ratio_matrix_build', 'rows')
+def bench_ratio(ctx):
+    d = ctx.data
+    return (lambda: play_matrices(d['user'], d['item'], d['playtime_forever'],
+                                  d['playtime_2weeks'], ctx.shape)), int(d['user'].size)
+
+@case('game_topk_similarity', 'games', scaled=False)
+def bench_topk(ctx):
+    tfidf = _row_normalize(sp.csr_matrix(ctx.tfidf, dtype=np.float32))
+
+    def run():
+        n = tfidf.shape[0]
+        out = np.empty((n, TOP_K), dtype=np.int64)
+        for start in range(0, n, SIMILARITY_BLOCK):
+            # sparse @ dense block: the similarity block is dense anyway
+            block = tfidf[start:start + SIMILARITY_BLOCK].toarray().T
+            sims = np.asarray(tfidf @ block).T
+            rows = np.arange(sims.shape[0])
+            sims[rows, rows + start] = -np.inf
+            out[start:start + sims.shape[0]] = np.argpartition(-sims, TOP_K, axis=1)[:, :TOP_K]
+        return out
+    return run, tfidf.shape[0]
+
+@case('user_neighbour_search', 'users')
+def bench_neighbours(ctx):
+    model, users = ctx.hybrid, ctx.sample_users()
+    return (lambda: [model.neighbours(int(u)) for u in users]), len(users)
+
+@case('user_neighbour_search_indexed', 'users')
+def bench_neighbours_indexed(ctx):
+    tmp = Path(tempfile.mkdtemp(prefix='bench_index_'))
+    atexit.register(shutil.rmtree, tmp, ignore_errors=True)
+    engine = ctx.hybrid.similarity
+    build_index(engine.user_ids, engine.matrix, tmp)
+    index, users = InvertedIndex(tmp), ctx.sample_users()
+    return (lambda: [index.neighbours_of(int(u)) for u in users]), len(users)
+
+@case('user_all_pairs_topk', 'users', max_users=10_000)
+def bench_all_pairs(ctx):
+    engine = ctx.hybrid.similarity
+    return (lambda: engine.all_pairs(TOP_K)), engine.matrix.shape[0]
+
+@case('minhash_lsh_build', 'users', max_users=100_000)
+def bench_lsh_build(ctx):
+    owned = ctx.owned
+    return (lambda: MinHashLSH.build(range(owned.shape[0]), owned)), owned.shape[0]
+
+@case('minhash_lsh_query', 'users', max_users=100_000)
+def bench_lsh_query(ctx):
+    lsh, users = MinHashLSH.build(range(ctx.owned.shape[0]), ctx.owned), ctx.sample_users()
+    return (lambda: [lsh.neighbours_of(int(u)) for u in users]), len(users)
+
+@case('item_cooccurrence_build', 'games', max_users=100_000)
+def bench_cooccurrence_build(ctx):
+    owned = ctx.owned
+    return (lambda: cooccurrence_topn(owned)), owned.shape[1]
+
+@case('item_cooccurrence_recommend', 'users', max_users=100_000)
+def bench_cooccurrence_recommend(ctx):
+    d, n_users = ctx.data, ctx.shape[0]
+    model = ItemCooccurrence.fit([f"user{u}" for u in range(n_users)], [str(i) for i in range(ctx.shape[1])],
+                                 d['user'], d['item'], d['playtime_forever'], ctx.shape)
+    users = [f"user{u}" for u in ctx.sample_users()]
+    return (lambda: [model.recommend(u, k=TOP_K) for u in users]), len(users)
+
+@case('hybrid_recommend', 'users')
+def bench_hybrid(ctx):
+    model, users = ctx.hybrid, [f"user{u}" for u in ctx.sample_users()]
+    return (lambda: [model.recommend(u, k=TOP_K) for u in users]), len(users)
+
+@case('als_fit_2_iterations', 'rows', max_users=100_000)
+def bench_als_fit(ctx):
+    conf, n_users, n_items = ctx.conf, *ctx.shape
+    user_ids, item_ids = [f"user{u}" for u in range(n_users)], [str(i) for i in range(n_items)]
+    return (lambda: ImplicitALS.fit(user_ids, item_ids, conf, iterations=2)), int(conf.nnz)
+
+@case('als_recommend_batch', 'users')
+def bench_als_batch(ctx):
+    n_users, n_items = ctx.shape
+    rng = np.random.default_rng(ctx.seed)
+    conf = ctx.conf
+    owned = sp.csr_matrix((np.ones_like(conf.data, dtype=np.bool_), conf.indices, conf.indptr),
+                          shape=conf.shape)
+    # Random factors: scoring cost does not depend on how well the model fits
+    model = ImplicitALS([f"user{u}" for u in range(n_users)], [str(i) for i in range(n_items)],
+                        rng.standard_normal((n_users, 64)).astype(np.float32),
+                        rng.standard_normal((n_items, 64)).astype(np.float32), owned=owned)
+    users = [f"user{u}" for u in ctx.sample_users(BATCH * 10)]
+    batches = [users[i:i + BATCH] for i in range(0, len(users), BATCH)]
+    return (lambda: [model.recommend_batch(b, k=TOP_K) for b in batches]), len(users)
+
+# ------------------ Runner ------------------
+def time_case(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(scales, repeat, seed, only=None):
+    results = []
+    for i, n_users in enumerate(scales):
+        ctx = Context(n_users, seed)
+        for c in CASES:
+            if only and c['name'] not in only:
+                continue
+            if c['max_users'] and n_users > c['max_users']:
+                print(f"- {c['name']} @ {n_users}: skipped (max {c['max_users']} users)")
+                continue
+            if not c['scaled'] and i > 0:
+                continue
+            fn, work = c['setup'](ctx)
+            times = time_case(fn, repeat)
+            median = statistics.median(times)
+            results.append({
+                'case': c['name'], 'users': n_users if c['scaled'] else None,
+                'rows': int(ctx.data['user'].size) if c['scaled'] else None,
+                'times_s': [round(t, 6) for t in times], 'min_s': round(min(times), 6),
+                'median_s': round(median, 6), 'work': work, 'unit': c['unit'],
+                'throughput': round(work / median, 2) if median else None,
+            })
+            print(f"- {c['name']} @ {n_users if c['scaled'] else '-'}: "
+                  f"{median * 1000:10.1f} ms median  ({work / median:,.0f} {c['unit']}/s)")
+    return results
+
+def _key(r):
+    return (r['case'], r['users'])
+
+def compare(results, baseline, threshold=REGRESSION):
+    """Cases whose median time grew by more than ``threshold`` times."""
+    before = {_key(r): r for r in baseline['results']}
+    regressions = []
+    for r in results:
+        old = before.get(_key(r))
+        if not old or not old['median_s']:
+            continue
+        ratio = r['median_s'] / old['median_s']
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"  {r['case']} @ {r['users'] or '-'}: {old['median_s'] * 1000:.1f} -> "
+              f"{r['median_s'] * 1000:.1f} ms ({ratio:.2f}x){flag}")
+        if flag:
+            regressions.append(r['case'])
+    return regressions
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=list(SCALES))
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', help="case names to run")
+    parser.add_argument('--save', type=Path, help="JSON output (default: results/<commit>.json)")
+    parser.add_argument('--compare', type=Path, help="JSON results from an earlier run")
+    parser.add_argument('--threshold', type=float, default=REGRESSION)
+    args = parser.parse_args()
+
+    results = run(args.scales, args.repeat, args.seed, args.only)
+    commit = _git_commit()
+    report = {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'seed': args.seed,
+        'repeat': args.repeat,
+        'machine': {'python': platform.python_version(), 'numpy': np.__version__,
+                    'scipy': scipy.__version__, 'platform': platform.platform(),
+                    'processor': platform.processor()},
+        'results': results,
+    }
+    out = args.save or RESULTS_DIR / f"{commit or 'local'}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    print(f"✅ results -> {out}")
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.threshold)
+        sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
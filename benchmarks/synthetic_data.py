@@ -0,0 +1,165 @@
+"""
+Seeded synthetic data shaped like australian_users_items and steam_games.
+
+Library sizes follow a Pareto tail (a few users own thousands of games, a
+fifth own none), game popularity is Zipf-like, and playtime is log-normal
+with many never-launched games. Running the module writes the cleaned JSON
+dumps that ``load_json.py`` / ``snapshot.py`` read, so the same shapes can
+be pushed through the real ingest.
+"""
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+# ------------------ Configuration ------------------
+N_GAMES = 32_000           # steam_games has ~32k entries
+N_PLAYED = 11_000          # ~11k distinct item_ids appear in user_items
+EMPTY_LIBRARY = 0.18       # share of users with no games
+LIBRARY_MIN = 8            # Pareto scale: typical library ~ 8-60 games
+LIBRARY_SHAPE = 1.1        # Pareto tail index; lower = heavier tail
+LIBRARY_MAX = 7_500
+POPULARITY_EXPONENT = 0.9  # Zipf exponent over the played games
+NEVER_PLAYED = 0.30        # owned but playtime_forever == 0
+RECENT_SHARE = 0.05        # rows with playtime_2weeks > 0
+
+GENRES = ['Action', 'Adventure', 'Casual', 'Indie', 'RPG', 'Simulation', 'Strategy',
+          'Sports', 'Racing', 'Massively Multiplayer', 'Free to Play', 'Early Access']
+TAGS = ['Singleplayer', 'Multiplayer', 'Co-op', 'Open World', 'Story Rich', 'Puzzle',
+        'Platformer', 'Shooter', 'FPS', 'Survival', 'Horror', 'Sandbox', 'Roguelike',
+        'Pixel Graphics', 'Anime', 'Great Soundtrack', 'Atmospheric', 'Difficult',
+        'Turn-Based', 'Tactical', 'Crafting', 'Building', 'Sci-fi', 'Fantasy', 'VR',
+        'Retro', 'Funny', 'Classic', 'Zombies', 'Space', 'Physics', 'Stealth']
+SPECS = ['Single-player', 'Multi-player', 'Online Multi-Player', 'Steam Achievements',
+         'Steam Trading Cards', 'Full controller support', 'Partial Controller Support',
+         'Steam Cloud', 'Steam Leaderboards', 'Steam Workshop', 'In-App Purchases', 'Co-op']
+SENTIMENTS = ['Overwhelmingly Positive', 'Very Positive', 'Mostly Positive', 'Positive',
+              'Mixed', 'Mostly Negative', 'Negative']
+WORDS = ['Dark', 'Legend', 'Quest', 'Star', 'Iron', 'Shadow', 'Tales', 'Empire', 'Rogue',
+         'Dungeon', 'City', 'Racer', 'Space', 'Lost', 'Kingdom', 'Battle', 'Island', 'Night',
+         'Hero', 'Zero', 'Forge', 'Ghost', 'Dragon', 'Pixel', 'World', 'Tactics', 'Origins']
+
+# ------------------ Generators ------------------
+def library_sizes(n_users, n_played=N_PLAYED, seed=0):
+    rng = np.random.default_rng(seed)
+    sizes = np.floor((rng.pareto(LIBRARY_SHAPE, n_users) + 1.0) * LIBRARY_MIN).astype(np.int64)
+    sizes = np.minimum(sizes, min(LIBRARY_MAX, n_played))
+    sizes[rng.random(n_users) < EMPTY_LIBRARY] = 0
+    return sizes
+
+def generate_interactions(n_users, n_played=N_PLAYED, seed=0):
+    """
+    user_items as parallel arrays, sorted by user.
+
+    Returns:
+        dict with int32 ``user`` and ``item`` rows, int32 ``playtime_forever``
+        and ``playtime_2weeks`` minutes, and ``n_users`` / ``n_items``.
+    """
+    rng = np.random.default_rng(seed + 1)
+    sizes = library_sizes(n_users, n_played, seed)
+    users = np.repeat(np.arange(n_users, dtype=np.int64), sizes)
+
+    weights = 1.0 / np.arange(1, n_played + 1) ** POPULARITY_EXPONENT
+    items = rng.choice(n_played, size=users.size, p=weights / weights.sum())
+
+    # Drawing with replacement can repeat a game within a library; keep one of each
+    keys = np.unique(users * n_played + items)
+    users = (keys // n_played).astype(np.int32)
+    items = (keys % n_played).astype(np.int32)
+
+    n = users.size
+    forever = rng.lognormal(mean=5.5, sigma=2.0, size=n).astype(np.int32)
+    forever[rng.random(n) < NEVER_PLAYED] = 0
+    recent = np.zeros(n, dtype=np.int32)
+    active = (rng.random(n) < RECENT_SHARE) & (forever > 0)
+    recent[active] = np.minimum(rng.lognormal(4.0, 1.2, active.sum()), 20_160).astype(np.int32)
+
+    return {'user': users, 'item': items, 'playtime_forever': forever,
+            'playtime_2weeks': recent, 'n_users': n_users, 'n_items': n_played}
+
+def _pick(rng, vocab, low, high, p=None):
+    k = int(rng.integers(low, high + 1))
+    return [vocab[i] for i in rng.choice(len(vocab), size=min(k, len(vocab)), replace=False, p=p)]
+
+def generate_games(n_games=N_GAMES, seed=0):
+    """steam_games_clean.json records; ids 0..n_games-1 line up with interaction item rows."""
+    rng = np.random.default_rng(seed + 2)
+    tag_p = 1.0 / np.arange(1, len(TAGS) + 1)
+    tag_p /= tag_p.sum()
+    studios = [f"{rng.choice(WORDS)} {rng.choice(['Games', 'Studio', 'Interactive', 'Soft'])}"
+               for _ in range(max(1, n_games // 8))]
+    games = []
+    for i in range(n_games):
+        title = " ".join(rng.choice(WORDS, size=int(rng.integers(1, 4))))
+        dev = studios[int(rng.integers(len(studios)))]
+        price = float(np.round(rng.choice([0.0, 4.99, 9.99, 14.99, 19.99, 29.99, 59.99]), 2))
+        games.append({
+            'id': str(i),
+            'app_name': title,
+            'title': title,
+            'url': f"http://store.steampowered.com/app/{i}/",
+            'release_date': f"{int(rng.integers(2000, 2018))}-{int(rng.integers(1, 13)):02d}-{int(rng.integers(1, 29)):02d}",
+            'developer': dev,
+            'publisher': dev if rng.random() < 0.6 else studios[int(rng.integers(len(studios)))],
+            'genres': _pick(rng, GENRES, 1, 3),
+            'tags': _pick(rng, TAGS, 2, 12, tag_p),
+            'price': price,
+            'discount_price': None,
+            'early_access': bool(rng.random() < 0.08),
+            'metascore': int(rng.integers(40, 96)) if rng.random() < 0.1 else None,
+            'sentiment': str(rng.choice(SENTIMENTS)),
+            'specs': _pick(rng, SPECS, 1, 6),
+            'reviews_url': f"http://steamcommunity.com/app/{i}/reviews/?browsefilter=mostrecent&p=1",
+        })
+    return games
+
+def user_records(data, games):
+    """australian_users_items_clean.json records for an interaction dict."""
+    names = [g['app_name'] for g in games]
+    bounds = np.searchsorted(data['user'], np.arange(data['n_users'] + 1))
+    records = []
+    for u in range(data['n_users']):
+        lo, hi = bounds[u], bounds[u + 1]
+        records.append({
+            'user_id': f"user{u}",
+            'steam_id': str(76561197960265728 + u),
+            'items_count': int(hi - lo),
+            'user_url': f"http://steamcommunity.com/id/user{u}",
+            'items': [
+                {'item_id': str(int(i)), 'item_name': names[int(i)],
+                 'playtime_forever': int(f), 'playtime_2weeks': int(r)}
+                for i, f, r in zip(data['item'][lo:hi], data['playtime_forever'][lo:hi],
+                                   data['playtime_2weeks'][lo:hi])
+            ],
+        })
+    return records
+
+def combined_text(games):
+    """Per-game text in the same field order as TFIDFProcessor.fetch_text_data."""
+    return [" ".join(str(v) for v in (
+        g['title'], g['app_name'], g['developer'], g['publisher'],
+        " ".join(g['genres']), " ".join(g['tags']), " ".join(g['specs']),
+        g['sentiment'], g['price'], g['discount_price'] or '', g['release_date'],
+    )) for g in games]
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=10_000)
+    parser.add_argument('--games', type=int, default=N_GAMES)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', type=Path, default=Path('data/synthetic'))
+    args = parser.parse_args()
+
+    games = generate_games(args.games, args.seed)
+    data = generate_interactions(args.users, min(N_PLAYED, args.games), args.seed)
+    args.out.mkdir(parents=True, exist_ok=True)
+    with (args.out / 'steam_games_clean.json').open('w', encoding='utf-8') as f:
+        json.dump(games, f)
+    with (args.out / 'australian_users_items_clean.json').open('w', encoding='utf-8') as f:
+        json.dump(user_records(data, games), f)
+    print(f"✅ {args.users} users, {data['user'].size} user_items rows, {len(games)} games -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import re
+
+# ------------------ Patterns ------------------
+# Full-string numeric checks, so conversion never has to go through an exception
+_INT_RE = re.compile(r'[+-]?\d+')
+_FLOAT_RE = re.compile(r'[+-]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?')
+_BOOLS = {'true': True, 'false': False}
+
+# ------------------ Field converters ------------------
+def to_str(val):
+    """Text fields and ids: always str (so '1942' stays a name and ids match TEXT columns)."""
+    if type(val) is str:
+        return val.strip()
+    if val is None:
+        return None
+    return str(val)
+
+def to_int(val, default=None):
+    if type(val) is int:
+        return val
+    if val is None or isinstance(val, bool):
+        return default
+    if isinstance(val, int):
+        return val
+    if isinstance(val, float):
+        return int(val) if val.is_integer() else default
+    if isinstance(val, str):
+        val = val.strip()
+        if _INT_RE.fullmatch(val):
+            return int(val)
+        if _FLOAT_RE.fullmatch(val):
+            f = float(val)
+            return int(f) if f.is_integer() else default
+    return default
+
+def to_count(val):
+    """Non-null integer that defaults to 0 (playtime minutes, item counts)."""
+    if type(val) is int:
+        return val
+    return to_int(val, 0)
+
+def to_float_or_label(val):
+    """Prices: a float, or the store's label text ('Free to Play', 'Free') kept as str."""
+    if val is None or isinstance(val, bool):
+        return None
+    if isinstance(val, (int, float)):
+        return float(val)
+    if isinstance(val, str):
+        val = val.strip()
+        if not val:
+            return None
+        return float(val) if _FLOAT_RE.fullmatch(val) else val
+    return None
+
+def to_bool(val):
+    if val is None or isinstance(val, bool):
+        return val
+    if isinstance(val, str):
+        return _BOOLS.get(val.strip().lower())
+    if isinstance(val, (int, float)):
+        return bool(val)
+    return None
+
+def to_str_list(val):
+    """Tag-like fields: list[str]; a bare string becomes a one-element list."""
+    if val is None:
+        return []
+    if isinstance(val, str):
+        val = val.strip()
+        return [val] if val else []
+    if isinstance(val, (list, tuple)):
+        return [to_str(v) for v in val if v is not None]
+    return []
+
+def fix_type(val):
+    """
+    Generic fallback for keys outside the schema: canonical JSON types from
+    'lazy' strings (booleans, ints, floats), recursing into lists.
+    """
+    if val is None or isinstance(val, (int, float, bool)):
+        return val
+    if isinstance(val, str):
+        val = val.strip()
+        lowered = val.lower()
+        if lowered in _BOOLS:
+            return _BOOLS[lowered]
+        if _INT_RE.fullmatch(val):
+            return int(val)
+        if _FLOAT_RE.fullmatch(val):
+            return float(val)
+        return val
+    if isinstance(val, list):
+        return [fix_type(v) for v in val]
+    return val
+
+# ------------------ Schemas ------------------
+def list_of(convert):
+    """Converter for a list whose elements each go through ``convert``."""
+    def convert_list(val):
+        if not isinstance(val, list):
+            return []
+        return [convert(v) for v in val if isinstance(v, dict)]
+    return convert_list
+
+def compile_schema(schema):
+    """
+    Build a reorder function from an ordered {field: converter} mapping.
+
+    The returned function emits the schema fields in order, each through
+    its own converter, then any extra keys through ``fix_type``.
+    """
+    fields = tuple(schema.items())
+    known = frozenset(schema)
+
+    def reorder(obj):
+        ordered = {k: convert(obj.get(k)) for k, convert in fields}
+        if not known.issuperset(obj):
+            for k, v in obj.items():
+                if k not in known:
+                    ordered[k] = fix_type(v)
+        return ordered
+    return reorder
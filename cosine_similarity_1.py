@@ -2,6 +2,7 @@ import psycopg2
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from scipy.optimize import linear_sum_assignment
+from popularity_ranking import get_ranking, fetch_game_vectors
 
 # ----------- PostgreSQL Connection -----------
 conn = psycopg2.connect(
@@ -39,18 +40,9 @@ user_game_names = [row[1] for row in user_games]
 user_vectors = [parse_pgvector(row[2]) for row in user_games]
 
 # ----------- Step 2: Get Global Top 10 Games (Excluding User's Games) -----------
-query_global_top = """
-SELECT ui.item_id, MAX(ui.item_name), g.tfidf_vec_vector
-FROM user_items ui
-JOIN games g ON ui.item_id = g.id
-WHERE ui.item_id NOT IN %s
-GROUP BY ui.item_id, g.tfidf_vec_vector
-ORDER BY SUM(ui.playtime_forever + ui.playtime_2weeks) DESC
-LIMIT 10;
-"""
-
-cursor.execute(query_global_top, (tuple(user_game_ids),))
-global_games = cursor.fetchall()
+ranking = get_ranking(cursor)
+global_top_ids = ranking.top_n(10, by='total_combined', exclude=set(user_game_ids))
+global_games = [(gid, ranking.names[gid], vec) for gid, _, vec in fetch_game_vectors(cursor, global_top_ids)]
 global_game_ids = [row[0] for row in global_games]
 global_game_names = [row[1] for row in global_games]
 global_vectors = [parse_pgvector(row[2]) for row in global_games]
@@ -2,6 +2,7 @@ import psycopg2
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from scipy.optimize import linear_sum_assignment
+from popularity_ranking import get_ranking, fetch_game_vectors
 
 # ------------------ PostgreSQL Connection ------------------
 conn = psycopg2.connect(
@@ -40,16 +41,12 @@ user_game_names = [row[1] for row in user_rows]
 user_vectors = [parse_pgvector(row[2]) for row in user_rows]
 
 # ------------------ Step 2: Global Top 10 Games (excluding user's) ------------------
-cursor.execute("""
-    SELECT ui.item_id, g.app_name, g.tfidf_vec_vector, COUNT(*) as player_count
-    FROM user_items ui
-    JOIN games g ON ui.item_id = g.id
-    WHERE ui.item_id NOT IN %s
-    GROUP BY ui.item_id, g.app_name, g.tfidf_vec_vector
-    ORDER BY COUNT(*) DESC
-    LIMIT 10;
-""", (tuple([row[0] for row in user_rows]),))
-global_rows = cursor.fetchall()
+ranking = get_ranking(cursor)
+global_top_ids = ranking.top_n(10, by='player_count', exclude={row[0] for row in user_rows})
+global_rows = [
+    (gid, ranking.names[gid], vec, ranking.stats[gid][0])
+    for gid, _, vec in fetch_game_vectors(cursor, global_top_ids)
+]
 
 global_game_names = [row[1] for row in global_rows]
 global_vectors = [parse_pgvector(row[2]) for row in global_rows]
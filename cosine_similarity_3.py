@@ -63,14 +63,14 @@ def main():
     conn = psycopg2.connect(**DB_CFG)
     cursor = conn.cursor()
 
-    # Step 1: User's Top N Games (join on text to avoid type issues)
+    # Step 1: User's Top N Games (join on the interned integer ids)
     cursor.execute(
         """
         SELECT ui.item_id, ui.item_name, g.tfidf_vec_vector
         FROM user_items ui
-        JOIN games g ON ui.item_id::text = g.id::text
+        JOIN games g ON ui.item_idx = g.item_idx
         WHERE ui.user_id = %s
-        ORDER BY (COALESCE(ui.playtime_forever,0) + COALESCE(ui.playtime_2weeks,0)) DESC
+        ORDER BY (ui.playtime_forever + ui.playtime_2weeks) DESC
         LIMIT %s;
         """,
         (USER_ID, N_USER),
@@ -116,7 +116,7 @@ def main():
         SELECT id, app_name, tfidf_vec_vector
         FROM games
         {played_clause}
-        ORDER BY tfidf_vec_vector <=> %s::vector
+        ORDER BY tfidf_sparse <=> %s::vector::sparsevec
         LIMIT %s;
     """
     params = played_params + (centroid_literal, K_REC)
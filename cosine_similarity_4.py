@@ -1,9 +1,14 @@
+import argparse
 import psycopg2
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from scipy.optimize import linear_sum_assignment
 from collections import Counter, defaultdict
 
+from ratio_vectors import JOB as RATIO_VECTORS_JOB
+from recommendation_cache import RecommendationCache, library_fingerprint
+from tracing import span, tracer, add_profile_args, print_profile
+
 # ------------------ Configuration ------------------
 DB_CFG = dict(
     dbname="postgres",
@@ -19,6 +24,11 @@ K_REC = 10          # how many recommendations to output
 K_NEIGHBOR = 20     # how many similar users to fetch
 K_NEIGHBOR_TOP = 5  # how many games to show for each neighbor
 
+# Bump when the ranking logic changes so cached results are not reused;
+# the data part of the cache version comes from current_model_version()
+RANKING_REVISION = "cs4-v1"
+CACHE_DIR = None    # e.g. "cache/cosine_similarity_4" to share results across runs
+
 # ------------------ Helpers ------------------
 def parse_pgvector(vec):
     if vec is None:
@@ -48,92 +58,125 @@ def mode_dimension(vectors):
     cnt = Counter(dims)
     return cnt.most_common(1)[0][0]
 
+def current_model_version(cursor):
+    """
+    Cache version for the neighbour model: the ranking revision plus the
+    state of the user_play_ratio vectors (layout rebuild time and the last
+    change the ratio_vectors job consumed), so refreshing any user's vector
+    retires every cached neighbour list.
+    """
+    cursor.execute("""
+        SELECT (SELECT updated_at FROM ratio_vector_layout),
+               (SELECT last_change_id FROM job_watermarks WHERE job = %s);
+    """, (RATIO_VECTORS_JOB,))
+    layout_at, last_change = cursor.fetchone()
+    stamp = layout_at.isoformat() if layout_at else "none"
+    return f"{RANKING_REVISION}:{stamp}:{last_change or 0}"
+
+_cache = RecommendationCache(disk_dir=CACHE_DIR)
+
 def fetchall(cursor):
     try:
         return cursor.fetchall()
     except psycopg2.ProgrammingError:
         return []
 
-# ------------------ Main ------------------
-def main():
-    conn = psycopg2.connect(**DB_CFG)
-    cursor = conn.cursor()
+# ------------------ Recommendation ------------------
+def recommend(cursor, user_id):
+    """
+    Neighbour candidates re-ranked by cosine to the user's top-game centroid.
 
-    try:
-        # ---------- Step 1: target user's top N games ----------
+    Returns a plain dict (picklable, so it can live in the on-disk cache tier)
+    with the user's top games, neighbours with their top games, the ranked
+    recommendations and the Hungarian matching between the two top lists.
+    """
+    # ---------- Step 1: target user's top N games ----------
+    with span('recommend.db.user_top'):
         cursor.execute(
             """
             SELECT ui.item_id::text, ui.item_name, g.tfidf_vec_vector,
-                   (COALESCE(ui.playtime_forever,0) + COALESCE(ui.playtime_2weeks,0)) AS total_play
+                   (ui.playtime_forever + ui.playtime_2weeks) AS total_play
             FROM user_items ui
-            JOIN games g ON ui.item_id::text = g.id::text
+            JOIN games g ON ui.item_idx = g.item_idx
             WHERE ui.user_id = %s
             ORDER BY total_play DESC
             LIMIT %s;
             """,
-            (USER_ID, N_USER),
+            (user_id, N_USER),
         )
         user_rows = fetchall(cursor)
-        if not user_rows:
-            raise RuntimeError("No games found for this user in user_items.")
+    if not user_rows:
+        raise RuntimeError("No games found for this user in user_items.")
 
+    with span('recommend.parse_pgvector', rows=len(user_rows)):
         user_parsed = []
         for item_id, item_name, vec, total_play in user_rows:
             v = parse_pgvector(vec)
             user_parsed.append((str(item_id), item_name, v, int(total_play)))
 
+    with span('recommend.mode_dimension'):
         dim = mode_dimension([v for (_, _, v, _) in user_parsed])
-        if dim is None:
-            raise RuntimeError("All TF-IDF vectors for user's top games are empty or invalid.")
+    if dim is None:
+        raise RuntimeError("All TF-IDF vectors for user's top games are empty or invalid.")
 
-        user_valid = [(i, n, v, p) for (i, n, v, p) in user_parsed if v.size == dim]
-        user_ids = [i for (i, _, _, _) in user_valid]
-        user_names = [n for (_, n, _, _) in user_valid]
-        user_vecs = [v for (_, _, v, _) in user_valid]
+    user_valid = [(i, n, v, p) for (i, n, v, p) in user_parsed if v.size == dim]
+    user_names = [n for (_, n, _, _) in user_valid]
+    user_vecs = [v for (_, _, v, _) in user_valid]
+    with span('recommend.np_stack'):
         user_mat = np.stack(user_vecs, axis=0)
 
-        print(f"=== User '{USER_ID}' Top {N_USER} Games ===")
-        for idx, (gid, gname, _, play) in enumerate(user_valid, start=1):
-            print(f"{idx}. {gname} (id={gid}) — Playtime: {play}")
-        print()
-
-        # centroid of user's top games
-        centroid = user_mat.mean(axis=0)
-        centroid_lit = to_pgvector_literal(centroid)
+    # centroid of user's top games
+    centroid = user_mat.mean(axis=0)
 
-        # All games already played by user (exclude later)
+    # All games already played by user (exclude later)
+    with span('recommend.db.owned'):
         cursor.execute(
             "SELECT ui.item_id::text FROM user_items ui WHERE ui.user_id = %s;",
-            (USER_ID,),
+            (user_id,),
         )
         already_played = {r[0] for r in fetchall(cursor)}
 
-        # ---------- Step 2: top 20 similar users by playtime_vector ----------
+    # ---------- Step 2: top 20 similar users by playtime_sparse ----------
+    with span('recommend.db.neighbors'):
         cursor.execute(
+            # HNSW covers users with <= 1000 played games; heavier users
+            # are scored exactly and merged in
             """
-            SELECT upr.user_id
-            FROM user_play_ratio upr
-            WHERE upr.user_id <> %s
-            ORDER BY upr.playtime_vector <=> (
-                SELECT playtime_vector FROM user_play_ratio WHERE user_id = %s
-            ) ASC
-            LIMIT %s;
+            WITH target AS (
+                SELECT playtime_sparse FROM user_play_ratio
+                WHERE user_id = %(user)s AND playtime_sparse IS NOT NULL
+            )
+            SELECT user_id FROM (
+                (SELECT upr.user_id,
+                        upr.playtime_sparse <=> (SELECT playtime_sparse FROM target) AS distance
+                 FROM user_play_ratio upr
+                 WHERE upr.user_id <> %(user)s AND upr.playtime_nnz <= 1000
+                   AND EXISTS (SELECT 1 FROM target)
+                 ORDER BY upr.playtime_sparse <=> (SELECT playtime_sparse FROM target)
+                 LIMIT %(k)s)
+                UNION ALL
+                (SELECT upr.user_id,
+                        upr.playtime_sparse <=> (SELECT playtime_sparse FROM target) AS distance
+                 FROM user_play_ratio upr
+                 WHERE upr.user_id <> %(user)s AND upr.playtime_nnz > 1000
+                   AND EXISTS (SELECT 1 FROM target))
+            ) candidates
+            WHERE distance IS NOT NULL
+            ORDER BY distance ASC
+            LIMIT %(k)s;
             """,
-            (USER_ID, USER_ID, K_NEIGHBOR),
+            {'user': user_id, 'k': K_NEIGHBOR},
         )
         neighbor_ids = [row[0] for row in fetchall(cursor)]
 
-        print(f"=== Top {K_NEIGHBOR} Similar Users ===")
-        print(", ".join(neighbor_ids))
-        print()
-
-        # ---------- Step 3: each neighbor's top 5 games ----------
-        print(f"=== Each Neighbor's Top {K_NEIGHBOR_TOP} Games ===")
+    # ---------- Step 3: each neighbor's top 5 games ----------
+    neighbor_top = {}
+    with span('recommend.db.neighbor_top', neighbors=len(neighbor_ids)):
         for nid in neighbor_ids:
             cursor.execute(
                 """
                 SELECT ui.item_id::text, ui.item_name,
-                       (COALESCE(ui.playtime_forever,0) + COALESCE(ui.playtime_2weeks,0)) AS total_play
+                       (ui.playtime_forever + ui.playtime_2weeks) AS total_play
                 FROM user_items ui
                 WHERE ui.user_id = %s
                 ORDER BY total_play DESC
@@ -141,17 +184,15 @@ def main():
                 """,
                 (nid, K_NEIGHBOR_TOP),
             )
-            rows = fetchall(cursor)
-            top_line = " | ".join(f"{name} ({tp})" for _, name, tp in rows)
-            print(f"- {nid}: {top_line}")
-        print()
+            neighbor_top[nid] = fetchall(cursor)
 
-        # ---------- Step 4: candidate pool from all neighbor games ----------
+    # ---------- Step 4: candidate pool from all neighbor games ----------
+    with span('recommend.db.candidates'):
         cursor.execute(
             """
             SELECT DISTINCT ui.item_id::text, ui.item_name, g.tfidf_vec_vector
             FROM user_items ui
-            JOIN games g ON ui.item_id::text = g.id::text
+            JOIN games g ON ui.item_idx = g.item_idx
             WHERE ui.user_id = ANY(%s)
               AND ui.item_id::text <> ALL(%s)
             """,
@@ -159,43 +200,106 @@ def main():
         )
         cand_rows = fetchall(cursor)
 
+    with span('recommend.parse_pgvector', rows=len(cand_rows)):
         candidates = []
         for cid, cname, cvec in cand_rows:
             v = parse_pgvector(cvec)
             if v.size == dim:
                 candidates.append((cid, cname, v))
 
-        cand_ids = [c[0] for c in candidates]
-        cand_names = [c[1] for c in candidates]
-        cand_vecs = [c[2] for c in candidates]
+    cand_ids = [c[0] for c in candidates]
+    cand_names = [c[1] for c in candidates]
+    cand_vecs = [c[2] for c in candidates]
+    with span('recommend.np_stack'):
         cand_mat = np.stack(cand_vecs, axis=0)
 
-        # ---------- Step 5: rank by similarity to centroid ----------
+    # ---------- Step 5: rank by similarity to centroid ----------
+    with span('recommend.cosine'):
         centroid_sim = cosine_similarity(centroid.reshape(1, -1), cand_mat).ravel()
         top_idx = np.argsort(-centroid_sim)[:K_REC]
-        rec_ids = [cand_ids[i] for i in top_idx]
-        rec_names = [cand_names[i] for i in top_idx]
-        rec_vecs = [cand_vecs[i] for i in top_idx]
-        rec_mat = np.stack(rec_vecs, axis=0)
-
-        print(f"=== Top {K_REC} Recommendations ===")
-        for rnk, (rid, rname, rsim) in enumerate(zip(rec_ids, rec_names, centroid_sim[top_idx]), start=1):
-            print(f"{rnk}. {rname} (id={rid}) — Centroid cosine: {rsim:.4f}")
-        print()
+    rec_names = [cand_names[i] for i in top_idx]
+    rec_vecs = [cand_vecs[i] for i in top_idx]
+    rec_mat = np.stack(rec_vecs, axis=0)
 
-        # ---------- Step 6: best match & average cosine ----------
+    # ---------- Step 6: best match & average cosine ----------
+    with span('recommend.cosine'):
         sim_matrix = cosine_similarity(user_mat, rec_mat)
+    with span('recommend.linear_sum_assignment'):
         row_ind, col_ind = linear_sum_assignment(1.0 - sim_matrix)
-        best_avg_similarity = float(sim_matrix[row_ind, col_ind].mean())
 
-        print("=== Hungarian Best Matches (User Top -> Recommendation) ===")
-        for ui, ri in zip(row_ind, col_ind):
-            print(f"- {user_names[ui]}  ->  {rec_names[ri]}  (cosine: {sim_matrix[ui, ri]:.4f})")
-        print(f"\nAverage cosine over matched pairs: {best_avg_similarity:.4f}")
+    return {
+        'user_top': [(i, n, p) for (i, n, _, p) in user_valid],
+        'neighbor_ids': neighbor_ids,
+        'neighbor_top': neighbor_top,
+        'recommendations': [(cand_ids[i], cand_names[i], float(centroid_sim[i])) for i in top_idx],
+        'matches': [(user_names[ui], rec_names[ri], float(sim_matrix[ui, ri]))
+                    for ui, ri in zip(row_ind, col_ind)],
+        'avg_similarity': float(sim_matrix[row_ind, col_ind].mean()),
+    }
 
+def cached_recommend(cursor, user_id):
+    """recommend() through the per-user cache; entries expire when the library changes."""
+    with span('recommend', user_id=user_id):
+        with span('recommend.db.fingerprint'):
+            fingerprint = library_fingerprint(cursor, user_id)
+            version = current_model_version(cursor)
+        return _cache.get_or_compute(
+            user_id, version, lambda: recommend(cursor, user_id),
+            fingerprint=fingerprint,
+        )
+
+def print_report(user_id, result):
+    print(f"=== User '{user_id}' Top {N_USER} Games ===")
+    for idx, (gid, gname, play) in enumerate(result['user_top'], start=1):
+        print(f"{idx}. {gname} (id={gid}) — Playtime: {play}")
+    print()
+
+    print(f"=== Top {K_NEIGHBOR} Similar Users ===")
+    print(", ".join(result['neighbor_ids']))
+    print()
+
+    print(f"=== Each Neighbor's Top {K_NEIGHBOR_TOP} Games ===")
+    for nid, rows in result['neighbor_top'].items():
+        top_line = " | ".join(f"{name} ({tp})" for _, name, tp in rows)
+        print(f"- {nid}: {top_line}")
+    print()
+
+    print(f"=== Top {K_REC} Recommendations ===")
+    for rnk, (rid, rname, rsim) in enumerate(result['recommendations'], start=1):
+        print(f"{rnk}. {rname} (id={rid}) — Centroid cosine: {rsim:.4f}")
+    print()
+
+    print("=== Hungarian Best Matches (User Top -> Recommendation) ===")
+    for uname, rname, sim in result['matches']:
+        print(f"- {uname}  ->  {rname}  (cosine: {sim:.4f})")
+    print(f"\nAverage cosine over matched pairs: {result['avg_similarity']:.4f}")
+
+# ------------------ Main ------------------
+def main():
+    parser = add_profile_args(argparse.ArgumentParser(description="Neighbour + centroid recommendations"))
+    parser.add_argument('--user', default=USER_ID)
+    parser.add_argument('--no-cache', action='store_true', help="always recompute (useful with --profile)")
+    args = parser.parse_args()
+    if args.trace_file:
+        tracer.export_to(args.trace_file)
+
+    conn = psycopg2.connect(**DB_CFG)
+    cursor = conn.cursor()
+
+    try:
+        if args.no_cache:
+            with span('recommend', user_id=args.user):
+                result = recommend(cursor, args.user)
+        else:
+            result = cached_recommend(cursor, args.user)
+        print_report(args.user, result)
     finally:
         cursor.close()
         conn.close()
+        tracer.close()
+
+    if args.profile:
+        print_profile()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,249 @@
+import argparse
+import hashlib
+import json
+import time
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from game_popularity import create_game_popularity, refresh_game_popularity
+from id_interning import intern_ingested_ids
+from ingest_validation import REJECTS_DIR, RejectLog, clean_users, iter_users
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+CHANGES_DIR = Path('data/deltas')
+BATCH_USERS = 500   # changed users applied per round trip
+
+# Must produce the same digest as library_hash(); "C" collation sorts like Python's str order
+LIBRARY_HASH_SQL = """
+    md5(COALESCE(string_agg(item_id || ':' || playtime_forever || ':' || playtime_2weeks, ','
+                            ORDER BY item_id COLLATE "C"), ''))
+"""
+
+# ------------------ Hashing ------------------
+def library_hash(items):
+    """md5 of a user's sorted (item_id, playtime_forever, playtime_2weeks) rows."""
+    rows = sorted((str(it['item_id']), int(it['playtime_forever']), int(it['playtime_2weeks']))
+                  for it in items)
+    text = ",".join(f"{i}:{pf}:{p2w}" for i, pf, p2w in rows)
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+def load_hashes(cursor):
+    """user_id -> content hash of what user_items currently holds."""
+    cursor.execute("SELECT user_id, content_hash FROM user_library_hash;")
+    return dict(cursor.fetchall())
+
+def rebuild_hashes(cursor, user_ids=None):
+    """
+    Recompute stored hashes from user_items (all users, or just ``user_ids``).
+    Users with no user_items rows get the empty-set hash, md5('').
+    """
+    where = "WHERE ids.user_id = ANY(%s)" if user_ids is not None else ""
+    cursor.execute(f"""
+        INSERT INTO user_library_hash (user_id, content_hash, items_count)
+        SELECT ids.user_id, {LIBRARY_HASH_SQL}, COUNT(ui.item_id)
+        FROM (SELECT user_id FROM users UNION SELECT user_id FROM user_items) ids
+        LEFT JOIN user_items ui ON ui.user_id = ids.user_id
+        {where}
+        GROUP BY ids.user_id
+        ON CONFLICT (user_id) DO UPDATE
+        SET content_hash = EXCLUDED.content_hash,
+            items_count = EXCLUDED.items_count,
+            updated_at = now();
+    """, (list(user_ids),) if user_ids is not None else None)
+
+# ------------------ Apply ------------------
+def apply_batch(cursor, batch):
+    """
+    Bring user_items in line with ``batch`` = [(user, hash, change)] and
+    return the item_ids whose rows were inserted, changed or deleted.
+    """
+    user_ids = [u['user_id'] for u, _, _ in batch]
+    execute_values(cursor, """
+        INSERT INTO users (user_id, steam_id, items_count, user_url) VALUES %s
+        ON CONFLICT (user_id) DO UPDATE
+        SET steam_id = EXCLUDED.steam_id, items_count = EXCLUDED.items_count,
+            user_url = EXCLUDED.user_url;
+    """, [(u['user_id'], u.get('steam_id'), u.get('items_count'), u.get('user_url')) for u, _, _ in batch])
+
+    cursor.execute("TRUNCATE delta_items;")
+    rows = [(u['user_id'], it['item_id'], it.get('item_name'), it['playtime_forever'], it['playtime_2weeks'])
+            for u, _, _ in batch for it in u['items']]
+    if rows:
+        execute_values(cursor, "INSERT INTO delta_items VALUES %s;", rows)
+
+    touched = set()
+    cursor.execute("""
+        DELETE FROM user_items ui
+        WHERE ui.user_id = ANY(%s)
+          AND NOT EXISTS (SELECT 1 FROM delta_items d
+                          WHERE d.user_id = ui.user_id AND d.item_id = ui.item_id)
+        RETURNING ui.item_id;
+    """, (user_ids,))
+    touched.update(r[0] for r in cursor.fetchall())
+    # Only rows whose values actually differ are written
+    cursor.execute("""
+        INSERT INTO user_items (user_id, item_id, item_name, playtime_forever, playtime_2weeks)
+        SELECT user_id, item_id, item_name, playtime_forever, playtime_2weeks FROM delta_items
+        ON CONFLICT (user_id, item_id) DO UPDATE
+        SET item_name = EXCLUDED.item_name,
+            playtime_forever = EXCLUDED.playtime_forever,
+            playtime_2weeks = EXCLUDED.playtime_2weeks
+        WHERE (user_items.item_name, user_items.playtime_forever, user_items.playtime_2weeks)
+              IS DISTINCT FROM (EXCLUDED.item_name, EXCLUDED.playtime_forever, EXCLUDED.playtime_2weeks)
+        RETURNING item_id;
+    """)
+    touched.update(r[0] for r in cursor.fetchall())
+
+    execute_values(cursor, """
+        INSERT INTO user_library_hash (user_id, content_hash, items_count) VALUES %s
+        ON CONFLICT (user_id) DO UPDATE
+        SET content_hash = EXCLUDED.content_hash, items_count = EXCLUDED.items_count,
+            updated_at = now();
+    """, [(u['user_id'], h, len(u['items'])) for u, h, _ in batch])
+    execute_values(cursor, "INSERT INTO user_changes (user_id, change) VALUES %s;",
+                   [(u['user_id'], change) for u, _, change in batch])
+    return touched
+
+def remove_users(cursor, user_ids):
+    """Drop the libraries of users missing from a full snapshot."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return set()
+    cursor.execute("DELETE FROM user_items WHERE user_id = ANY(%s) RETURNING item_id;", (user_ids,))
+    touched = {r[0] for r in cursor.fetchall()}
+    cursor.execute("DELETE FROM user_library_hash WHERE user_id = ANY(%s);", (user_ids,))
+    execute_values(cursor, "INSERT INTO user_changes (user_id, change) VALUES %s;",
+                   [(u, 'removed') for u in user_ids])
+    return touched
+
+def apply_snapshot(cursor, users, rejects, full=False, batch_users=BATCH_USERS):
+    """
+    Diff a stream of user records against user_library_hash and apply only
+    the users whose library changed.
+
+    With ``full`` the snapshot is taken as complete, so stored users it
+    does not mention are removed. Returns a stats dict with the changed
+    user ids per kind and the touched item ids.
+    """
+    cursor.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS delta_items (
+            user_id TEXT, item_id TEXT, item_name TEXT,
+            playtime_forever INTEGER, playtime_2weeks INTEGER
+        );
+    """)
+    stored = load_hashes(cursor)
+    seen = set()
+    changed = {'added': [], 'updated': [], 'removed': []}
+    touched, batch = set(), []
+    unchanged = 0
+
+    for u in clean_users(users, rejects):
+        uid = u['user_id']
+        if uid in seen:
+            continue      # a user listed twice: the first record is the snapshot of that library
+        seen.add(uid)
+        h = library_hash(u['items'])
+        old = stored.get(uid)
+        if old == h:
+            unchanged += 1
+            continue
+        change = 'added' if old is None else 'updated'
+        changed[change].append(uid)
+        batch.append((u, h, change))
+        if len(batch) >= batch_users:
+            touched |= apply_batch(cursor, batch)
+            batch = []
+    if batch:
+        touched |= apply_batch(cursor, batch)
+
+    if full:
+        changed['removed'] = sorted(set(stored) - seen)
+        touched |= remove_users(cursor, changed['removed'])
+
+    return {'changed': changed, 'unchanged': unchanged, 'touched_items': touched}
+
+# ------------------ Consumers ------------------
+def changes_since(cursor, job):
+    """
+    (last change_id, sorted changed user_ids) logged after ``job``'s
+    watermark. Call mark_consumed() with that id in the same transaction
+    as the job's own writes, so a failed run re-reads the same changes.
+    """
+    cursor.execute("SELECT last_change_id FROM job_watermarks WHERE job = %s;", (job,))
+    row = cursor.fetchone()
+    since = row[0] if row else 0
+    cursor.execute("""
+        SELECT COALESCE(MAX(change_id), %s), COALESCE(array_agg(DISTINCT user_id), '{}')
+        FROM user_changes WHERE change_id > %s;
+    """, (since, since))
+    last, user_ids = cursor.fetchone()
+    return last, sorted(user_ids)
+
+def latest_change_id(cursor):
+    """Newest change_id in user_changes; 0 before any delta run or without migration 004."""
+    cursor.execute("SELECT to_regclass('user_changes') IS NOT NULL;")
+    if not cursor.fetchone()[0]:
+        return 0
+    cursor.execute("SELECT COALESCE(MAX(change_id), 0) FROM user_changes;")
+    return cursor.fetchone()[0]
+
+def mark_consumed(cursor, job, last_change_id):
+    cursor.execute("""
+        INSERT INTO job_watermarks (job, last_change_id) VALUES (%s, %s)
+        ON CONFLICT (job) DO UPDATE
+        SET last_change_id = GREATEST(job_watermarks.last_change_id, EXCLUDED.last_change_id),
+            updated_at = now();
+    """, (job, last_change_id))
+
+def write_changed_users(changed, out_dir=CHANGES_DIR):
+    """changed-users-<timestamp>.json for offline jobs that do not read the database."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    path = out_dir / f"changed-users-{time.strftime('%Y%m%dT%H%M%S')}.json"
+    path.write_text(json.dumps(changed, indent=1), encoding='utf-8')
+    return path
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description="Apply a user-library snapshot as a delta")
+    parser.add_argument('snapshot', type=Path, nargs='?', help="cleaned users .jsonl or .json")
+    parser.add_argument('--full', action='store_true',
+                        help="snapshot lists every user; users missing from it are removed")
+    parser.add_argument('--rebuild-hashes', action='store_true',
+                        help="recompute stored hashes from user_items first")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CFG)
+    t0 = time.perf_counter()
+    try:
+        with conn.cursor() as cur, RejectLog(REJECTS_DIR / 'delta_ingest.jsonl') as rejects:
+            if args.rebuild_hashes:
+                rebuild_hashes(cur)
+            stats = apply_snapshot(cur, iter_users(args.snapshot), rejects, full=args.full)
+            # Downstream state that depends on the changed rows
+            create_game_popularity(cur)
+            refresh_game_popularity(cur, stats['touched_items'])
+            intern_ingested_ids(cur)
+        conn.commit()
+    finally:
+        conn.close()
+
+    changed = stats['changed']
+    path = write_changed_users(changed)
+    print(f"✅ {len(changed['added'])} added, {len(changed['updated'])} updated, "
+          f"{len(changed['removed'])} removed, {stats['unchanged']} unchanged users; "
+          f"{len(stats['touched_items'])} games touched in {time.perf_counter() - t0:.1f}s")
+    print(f"   changed users -> {path}; {rejects.summary()}")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import psycopg2
+from popularity_ranking import get_ranking
 
 def get_top_10_most_played_games():
     # Database connection parameters - update these with your credentials
@@ -15,24 +16,12 @@ def get_top_10_most_played_games():
         conn = psycopg2.connect(**db_params)
         cursor = conn.cursor()
         
-        # Query to get top 10 games by total playtime
-        query = """
-        SELECT 
-            item_name,
-            SUM(playtime_forever) AS total_playtime_minutes,
-            ROUND(SUM(playtime_forever)/60, 1) AS total_playtime_hours
-        FROM 
-            user_items
-        GROUP BY 
-            item_name
-        ORDER BY 
-            total_playtime_minutes DESC
-        LIMIT 10;
-        """
-        
-        # Execute the query
-        cursor.execute(query)
-        results = cursor.fetchall()
+        # Top 10 games by total playtime, from the cached game_popularity ranking
+        ranking = get_ranking(cursor, require_game=False)
+        results = [
+            (ranking.names[gid], ranking.stats[gid][1], round(ranking.stats[gid][1] / 60.0, 1))
+            for gid in ranking.top_n(10, by='total_playtime')
+        ]
         
         # Close the connection
         cursor.close()
@@ -1,6 +1,7 @@
 import psycopg2
 import numpy as np
 from scipy.stats import spearmanr
+from popularity_ranking import get_ranking
 
 # ---------- PostgreSQL Connection ----------
 conn = psycopg2.connect(
@@ -28,29 +29,22 @@ cursor.execute(query_user_top_games, (target_user_id,))
 user_games = cursor.fetchall()
 
 # ---------- Step 2: Get user count per game ----------
+ranking = get_ranking(cursor)
 user_game_ids = [row[0] for row in user_games]
-format_ids = ','.join(['%s'] * len(user_game_ids))
-
-query_user_count = f"""
-SELECT item_id, COUNT(DISTINCT user_id) as user_count
-FROM user_items
-WHERE item_id IN ({format_ids})
-GROUP BY item_id;
-"""
-cursor.execute(query_user_count, user_game_ids)
-user_counts = dict(cursor.fetchall())
+user_counts = {gid: ranking.stats[gid][0] for gid in user_game_ids if gid in ranking.stats}
 
 # ---------- Step 3: Get top 10 globally popular games ----------
-query_global_top_games = """
-SELECT ui.item_id, g.app_name, COUNT(DISTINCT ui.user_id) as user_count, g.tfidf_vector
-FROM user_items ui
-JOIN games g ON ui.item_id = g.id
-GROUP BY ui.item_id, g.app_name, g.tfidf_vector
-ORDER BY user_count DESC
-LIMIT 10;
-"""
-cursor.execute(query_global_top_games)
-global_top_games = cursor.fetchall()
+global_top_ids = ranking.top_n(10, by='player_count')
+cursor.execute("""
+SELECT id, tfidf_vector
+FROM games
+WHERE id = ANY(%s);
+""", (global_top_ids,))
+global_vectors_by_id = dict(cursor.fetchall())
+global_top_games = [
+    (gid, ranking.names[gid], ranking.stats[gid][0], global_vectors_by_id.get(gid))
+    for gid in global_top_ids
+]
 
 # ---------- Step 4: TF-IDF Vector Parsing ----------
 def parse_vector(vec_str):
@@ -0,0 +1,99 @@
+import psycopg2
+
+from popularity_ranking import clear_rankings
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+# ------------------ Schema ------------------
+CREATE_SQL = """
+CREATE TABLE IF NOT EXISTS game_popularity (
+    item_id        TEXT PRIMARY KEY,
+    item_name      TEXT,
+    player_count   INTEGER NOT NULL DEFAULT 0,
+    total_playtime BIGINT  NOT NULL DEFAULT 0,
+    total_2weeks   BIGINT  NOT NULL DEFAULT 0,
+    refreshed_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS idx_game_popularity_players
+    ON game_popularity (player_count DESC) INCLUDE (item_id, item_name);
+CREATE INDEX IF NOT EXISTS idx_game_popularity_playtime
+    ON game_popularity (total_playtime DESC) INCLUDE (item_id, item_name);
+CREATE INDEX IF NOT EXISTS idx_game_popularity_2weeks
+    ON game_popularity (total_2weeks DESC) INCLUDE (item_id, item_name);
+CREATE INDEX IF NOT EXISTS idx_game_popularity_combined
+    ON game_popularity ((total_playtime + total_2weeks) DESC) INCLUDE (item_id, item_name);
+"""
+
+AGGREGATE_SQL = """
+INSERT INTO game_popularity AS gp
+    (item_id, item_name, player_count, total_playtime, total_2weeks, refreshed_at)
+SELECT ui.item_id,
+       MAX(ui.item_name),
+       COUNT(DISTINCT ui.user_id),
+       COALESCE(SUM(ui.playtime_forever), 0),
+       COALESCE(SUM(ui.playtime_2weeks), 0),
+       now()
+FROM user_items ui
+{where}
+GROUP BY ui.item_id
+ON CONFLICT (item_id) DO UPDATE
+SET item_name      = EXCLUDED.item_name,
+    player_count   = EXCLUDED.player_count,
+    total_playtime = EXCLUDED.total_playtime,
+    total_2weeks   = EXCLUDED.total_2weeks,
+    refreshed_at   = EXCLUDED.refreshed_at;
+"""
+
+def create_game_popularity(cursor):
+    """Create the game_popularity aggregate table and its ranking indexes."""
+    cursor.execute(CREATE_SQL)
+
+def refresh_game_popularity(cursor, item_ids=None):
+    """
+    Recompute popularity rows from user_items.
+
+    Args:
+        cursor: open psycopg2 cursor (caller commits)
+        item_ids: iterable of item_ids touched by an ingest; only those rows
+            are recomputed. When None the whole table is rebuilt.
+    """
+    if item_ids is None:
+        cursor.execute(AGGREGATE_SQL.format(where=""))
+        # Games that lost every player no longer appear in the aggregate
+        cursor.execute("""
+            DELETE FROM game_popularity gp
+            WHERE NOT EXISTS (SELECT 1 FROM user_items ui WHERE ui.item_id = gp.item_id);
+        """)
+        clear_rankings()
+        return
+
+    item_ids = list({str(i) for i in item_ids})
+    if not item_ids:
+        return
+    cursor.execute(AGGREGATE_SQL.format(where="WHERE ui.item_id = ANY(%s)"), (item_ids,))
+    cursor.execute("""
+        DELETE FROM game_popularity gp
+        WHERE gp.item_id = ANY(%s)
+          AND NOT EXISTS (SELECT 1 FROM user_items ui WHERE ui.item_id = gp.item_id);
+    """, (item_ids,))
+    clear_rankings()
+
+# ------------------ Main ------------------
+if __name__ == "__main__":
+    conn = psycopg2.connect(**DB_CFG)
+    cursor = conn.cursor()
+    try:
+        create_game_popularity(cursor)
+        refresh_game_popularity(cursor)
+        conn.commit()
+        print("✅ game_popularity rebuilt from user_items")
+    finally:
+        cursor.close()
+        conn.close()
@@ -1,81 +1,98 @@
-import psycopg2
-import csv
-from datetime import datetime
-
-def to_pg_array(lst):
-    if not lst:
-        return '{}'
-    return '{' + ','.join('"' + v.replace('"', '\\"') + '"' for v in lst) + '}'
-
-# DB credentials
-conn = psycopg2.connect(
-    dbname="postgres",
-    user="postgres",
-    password="Rohan$123",
-    host="localhost",
-    port="5432"
-)
-cur = conn.cursor()
+import io
+import time
 
-with open('games.csv', encoding='utf-8') as f:
-    reader = csv.reader(f)
-    next(reader)  # skip header
-
-    for row in reader:
-        id = row[0]
-        app_name = row[1]
-        title = row[2]
-        url = row[3]
+import pandas as pd
+import psycopg2
 
-        try:
-            release_date = datetime.strptime(row[4], '%Y-%m-%d').date() if row[4] else None
-        except ValueError:
-            release_date = None
+# ------------------ Configuration ------------------
+CSV_PATH = 'games.csv'
+CHUNK_ROWS = 50_000   # rows parsed and COPY'd per round
 
-        developer = row[5]
-        publisher = row[6]
-        genres = to_pg_array(row[7].split(',')) if row[7] else '{}'
-        tags = to_pg_array(row[8].split(',')) if row[8] else '{}'
+# games.csv column order
+COLUMNS = ['id', 'app_name', 'title', 'url', 'release_date', 'developer', 'publisher',
+           'genres', 'tags', 'price', 'discount_price', 'early_access',
+           'metascore', 'sentiment', 'specs', 'reviews_url']
+ARRAY_COLUMNS = ['genres', 'tags', 'specs']
+NULL = r'\N'
 
-        try:
-            price = float(row[9]) if row[9] else None
-        except ValueError:
-            price = None
+# ------------------ Column conversions ------------------
+def to_pg_array(col):
+    """'a,b' -> '{"a","b"}' for a whole column; empty cells become '{}'."""
+    quoted = col.str.replace('"', '\\"', regex=False).str.replace(',', '","', regex=False)
+    return ('{"' + quoted + '"}').where(col != '', '{}')
 
-        try:
-            discount_price = float(row[10]) if row[10] else None
-        except ValueError:
-            discount_price = None
+def convert(chunk):
+    """Typed columns for one chunk of raw string cells; unparseable values become NULL."""
+    out = chunk.copy()
+    dates = pd.to_datetime(chunk['release_date'], format='%Y-%m-%d', errors='coerce')
+    out['release_date'] = dates.dt.strftime('%Y-%m-%d')
+    for name in ARRAY_COLUMNS:
+        out[name] = to_pg_array(chunk[name])
+    for name in ('price', 'discount_price'):
+        out[name] = pd.to_numeric(chunk[name], errors='coerce')
+    early = chunk['early_access'].str.lower()
+    out['early_access'] = (early == 'true').astype(object).where(early != '', None)
+    # metascore must be a plain integer literal, as int() required
+    score = chunk['metascore'].str.strip()
+    out['metascore'] = pd.to_numeric(score.where(score.str.fullmatch(r'[+-]?\d+')), errors='coerce').astype('Int64')
+    return out
 
-        early_access = row[11].lower() == 'true' if row[11] else None
+# ------------------ Load ------------------
+def copy_chunk(cur, frame):
+    """Stream one converted chunk into the staging table as CSV."""
+    buf = io.StringIO()
+    frame.to_csv(buf, header=False, index=False, na_rep=NULL)
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY games_stage ({', '.join(COLUMNS)}) FROM STDIN "
+        f"WITH (FORMAT csv, NULL '{NULL}')",
+        buf,
+    )
 
-        try:
-            metascore = int(row[12]) if row[12] else None
-        except ValueError:
-            metascore = None
+def load_games(cur, path=CSV_PATH, chunk_rows=CHUNK_ROWS):
+    """
+    COPY games.csv into a temp staging table chunk by chunk, then insert
+    the new ids into games in one statement (existing ids are left alone,
+    as before). Returns (rows read, rows inserted).
+    """
+    cur.execute("""
+        CREATE TEMP TABLE games_stage (LIKE games INCLUDING DEFAULTS) ON COMMIT DROP;
+    """)
+    seen = set()
+    rows = 0
+    reader = pd.read_csv(path, header=0, names=COLUMNS, usecols=range(len(COLUMNS)),
+                         dtype=str, keep_default_na=False, chunksize=chunk_rows)
+    for chunk in reader:
+        rows += len(chunk)
+        # first occurrence of an id wins, across chunks too
+        chunk = chunk[~chunk['id'].duplicated() & ~chunk['id'].isin(seen)]
+        seen.update(chunk['id'])
+        copy_chunk(cur, convert(chunk))
 
-        sentiment = row[13]
-        specs = to_pg_array(row[14].split(',')) if row[14] else '{}'
-        reviews_url = row[15]
+    cols = ', '.join(COLUMNS)
+    cur.execute(f"""
+        INSERT INTO games ({cols})
+        SELECT {cols} FROM games_stage
+        ON CONFLICT (id) DO NOTHING;
+    """)
+    return rows, cur.rowcount
 
-        cur.execute("""
-            INSERT INTO games (
-                id, app_name, title, url, release_date, developer, publisher,
-                genres, tags, price, discount_price, early_access,
-                metascore, sentiment, specs, reviews_url
-            ) VALUES (
-                %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s,
-                %s, %s, %s, %s
-            )
-            ON CONFLICT (id) DO NOTHING;
-        """, (
-            id, app_name, title, url, release_date, developer, publisher,
-            genres, tags, price, discount_price, early_access,
-            metascore, sentiment, specs, reviews_url
-        ))
+if __name__ == "__main__":
+    # DB credentials
+    conn = psycopg2.connect(
+        dbname="postgres",
+        user="postgres",
+        password="Rohan$123",
+        host="localhost",
+        port="5432"
+    )
+    cur = conn.cursor()
 
-conn.commit()
-cur.close()
-conn.close()
-print("✅ games.csv successfully loaded into PostgreSQL.")
+    t0 = time.perf_counter()
+    rows, inserted = load_games(cur)
+    conn.commit()
+    elapsed = time.perf_counter() - t0
+    cur.close()
+    conn.close()
+    print(f"✅ games.csv successfully loaded into PostgreSQL: {inserted}/{rows} new rows "
+          f"in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s).")
@@ -3,67 +3,78 @@ from psycopg2 import sql
 import json
 from datetime import datetime
 
-def get_user_game_stats(db_connection_params):
+from memory_budget import MemoryBudget, memory_from_argv, stage, print_memory_report
+
+# Rough in-memory size of one game entry (dict + strings + boxed numbers) in the stats
+BYTES_PER_GAME_ENTRY = 600
+MAX_CHUNK = 5000   # users per query when no budget is set
+
+def _game_entry(item_id, item_name, playtime_forever, playtime_2weeks):
+    return {
+        'item_id': item_id,
+        'name': item_name,
+        'total_playtime_hours': round(playtime_forever / 60, 1),
+        'recent_playtime_hours': round(playtime_2weeks / 60, 1) if playtime_2weeks else 0
+    }
+
+def iter_user_game_stats(cursor, budget=None):
+    """
+    Yield (user_id, stats) for every user, fetching users in chunks sized
+    by ``budget`` so only one chunk's game lists are in memory at a time.
+    """
+    budget = budget or MemoryBudget()
+    cursor.execute("SELECT user_id, steam_id, user_url FROM users;")
+    users = cursor.fetchall()
+    cursor.execute("SELECT COUNT(*)::float / GREATEST(COUNT(DISTINCT user_id), 1) FROM user_items;")
+    avg_games = cursor.fetchone()[0] or 1.0
+    bytes_per_user = int(avg_games * BYTES_PER_GAME_ENTRY)
+
+    for start, stop in budget.chunks(len(users), bytes_per_user, maximum=MAX_CHUNK):
+        chunk = users[start:stop]
+        # Query to get all games for these users with playtime
+        cursor.execute(
+            """
+            SELECT user_id, item_id, item_name, playtime_forever, playtime_2weeks
+            FROM user_items
+            WHERE user_id = ANY(%s)
+            ORDER BY user_id, playtime_forever DESC;
+            """,
+            ([u[0] for u in chunk],)
+        )
+        games_by_user = {}
+        for user_id, *game in cursor.fetchall():
+            games_by_user.setdefault(user_id, []).append(game)
+
+        for user_id, steam_id, user_url in chunk:
+            games = games_by_user.pop(user_id, [])
+            # Calculate total games and total playtime
+            total_playtime = sum(game[2] for game in games) if games else 0
+            yield user_id, {
+                'steam_id': steam_id,
+                'profile_url': user_url,
+                'total_games': len(games),
+                'total_playtime_hours': round(total_playtime / 60, 1),
+                'games': [_game_entry(*game) for game in games]
+            }
+
+def get_user_game_stats(db_connection_params, budget=None):
     """
     Retrieves game play statistics for all users from the PostgreSQL database.
     
     Args:
         db_connection_params (dict): Dictionary containing database connection parameters
             (e.g., {'host': 'localhost', 'database': 'postgres', 'user': 'postgres', 'password': 'Rohan$123', 'port': '5432'})
+        budget (MemoryBudget): Optional memory budget for the per-chunk fetches
     
     Returns:
         dict: A dictionary with user_id as key and game statistics as value
     """
-    user_stats = {}
-    
     try:
         # Connect to the PostgreSQL database
         conn = psycopg2.connect(**db_connection_params)
         cursor = conn.cursor()
-        
-        # Query to get all users
-        cursor.execute("SELECT user_id, steam_id, user_url FROM users;")
-        users = cursor.fetchall()
-        
-        for user in users:
-            user_id, steam_id, user_url = user
-            
-            # Query to get all games for this user with playtime
-            cursor.execute(
-                """
-                SELECT item_id, item_name, playtime_forever, playtime_2weeks 
-                FROM user_items 
-                WHERE user_id = %s
-                ORDER BY playtime_forever DESC;
-                """,
-                (user_id,)
-            )
-            games = cursor.fetchall()
-            
-            # Calculate total games and total playtime
-            total_games = len(games)
-            total_playtime = sum(game[2] for game in games) if games else 0
-            
-            # Prepare game list with human-readable playtime (in hours)
-            game_list = []
-            for game in games:
-                item_id, item_name, playtime_forever, playtime_2weeks = game
-                game_list.append({
-                    'item_id': item_id,
-                    'name': item_name,
-                    'total_playtime_hours': round(playtime_forever / 60, 1),
-                    'recent_playtime_hours': round(playtime_2weeks / 60, 1) if playtime_2weeks else 0
-                })
-            
-            # Add user stats to the dictionary
-            user_stats[user_id] = {
-                'steam_id': steam_id,
-                'profile_url': user_url,
-                'total_games': total_games,
-                'total_playtime_hours': round(total_playtime / 60, 1),
-                'games': game_list
-            }
-            
+        with stage('collect stats'):
+            user_stats = dict(iter_user_game_stats(cursor, budget))
         cursor.close()
         conn.close()
         
@@ -78,16 +89,26 @@ def save_stats_to_json(stats, filename=None):
     Save the game statistics to a JSON file.
     
     Args:
-        stats (dict): The game statistics dictionary returned by get_user_game_stats
+        stats (dict or iterable): The dictionary returned by get_user_game_stats, or
+            (user_id, stats) pairs from iter_user_game_stats, which are written
+            one user at a time without building the whole dictionary
         filename (str): Optional filename. If not provided, generates one with timestamp.
     """
     if not filename:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"user_game_stats_{timestamp}.json"
     
+    pairs = stats.items() if isinstance(stats, dict) else stats
     try:
         with open(filename, 'w', encoding='utf-8') as jsonfile:
-            json.dump(stats, jsonfile, indent=4, ensure_ascii=False)
+            # Same layout as json.dump(stats, indent=4), written per user
+            jsonfile.write("{")
+            count = 0
+            for user_id, user_stats in pairs:
+                body = json.dumps(user_stats, indent=4, ensure_ascii=False).replace("\n", "\n    ")
+                jsonfile.write(f"{',' if count else ''}\n    {json.dumps(user_id, ensure_ascii=False)}: {body}")
+                count += 1
+            jsonfile.write("\n}" if count else "}")
         
         print(f"Successfully saved statistics to {filename}")
         return filename
@@ -106,19 +127,32 @@ if __name__ == "__main__":
         'port': '5432'  
     }
     
-    # Get all user game statistics
-    stats = get_user_game_stats(db_params)
+    budget = memory_from_argv()
+    sample = {}
+
+    def keep_sample(pairs):
+        for user_id, user_stats in pairs:
+            if not sample:
+                sample[user_id] = user_stats
+            yield user_id, user_stats
+
+    # Stream user game statistics straight to JSON, one budget-sized chunk at a time
+    try:
+        conn = psycopg2.connect(**db_params)
+        cursor = conn.cursor()
+        with stage('collect + save stats'):
+            json_file = save_stats_to_json(keep_sample(iter_user_game_stats(cursor, budget)))
+        cursor.close()
+        conn.close()
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"Database error: {error}")
+        json_file = None
     
-    if stats:
-        # Save to JSON
-        json_file = save_stats_to_json(stats)
-        
-        # Print confirmation
-        if json_file:
-            print(f"\nData successfully saved to {json_file}")
-            print("\nSample of the saved data:")
-            print(json.dumps({k: stats[k] for k in list(stats.keys())[:1]}, indent=4))
-        else:
-            print("\nFailed to save data to JSON file.")
+    # Print confirmation
+    if json_file:
+        print(f"\nData successfully saved to {json_file}")
+        print("\nSample of the saved data:")
+        print(json.dumps(sample, indent=4))
     else:
-        print("Failed to retrieve user game statistics.")
\ No newline at end of file
+        print("Failed to retrieve user game statistics.")
+    print_memory_report()
@@ -0,0 +1,234 @@
+from pathlib import Path
+
+import psycopg2
+import numpy as np
+import scipy.sparse as sp
+
+from delta_ingest import latest_change_id
+from id_interning import load_interners
+from inverted_index import INDEX_DIR, InvertedIndex, build_index
+from user_similarity import UserSimilarity, _row_normalize, _top_k
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+USER_ID = "doctr"   # <-- change as needed
+N_USER = 10         # user's top games used for the TF-IDF centroid
+K_REC = 10          # how many recommendations to output
+K_NEIGHBOR = 20     # how many similar users feed the collaborative score
+ALPHA = 0.5         # blend weight: 1.0 = content only, 0.0 = collaborative only
+
+# ------------------ Helpers ------------------
+def parse_pgvector(vec):
+    if vec is None:
+        return np.array([])
+    if isinstance(vec, (list, tuple, np.ndarray)):
+        try:
+            return np.array(vec, dtype=float)
+        except Exception:
+            return np.array([])
+    if isinstance(vec, str):
+        s = vec.strip().strip('{}[]')
+        if not s:
+            return np.array([])
+        try:
+            return np.array([float(x.strip()) for x in s.split(',') if x.strip()], dtype=float)
+        except ValueError:
+            return np.array([])
+    return np.array([])
+
+def _scale_by_best(scores, candidates):
+    """Divide by the best score among ``candidates`` (a bool mask) so that one scores 1.0."""
+    best = scores[candidates].max() if candidates.any() else 0.0
+    return scores / best if best > 0 else scores
+
+def play_matrices(user_rows, item_cols, playtime_forever, playtime_2weeks, shape):
+    """
+    (play, play_total) CSR pair from user_items columns: playtime_forever
+    divided by each user's total (the user_play_ratio values), and
+    playtime_forever + playtime_2weeks.
+    """
+    forever = np.asarray(playtime_forever, dtype=np.float32)
+    total = forever + np.asarray(playtime_2weeks, dtype=np.float32)
+    play_forever = sp.csr_matrix((forever, (user_rows, item_cols)), shape=shape, dtype=np.float32)
+    play_total = sp.csr_matrix((total, (user_rows, item_cols)), shape=shape, dtype=np.float32)
+    totals = np.asarray(play_forever.sum(axis=1)).ravel()
+    totals[totals == 0] = 1.0
+    return sp.diags(1.0 / totals) @ play_forever, play_total
+
+# ------------------ Recommender ------------------
+class HybridRecommender:
+    """
+    Collaborative + content scorer over in-memory matrices.
+
+    * ``play``: users x games CSR of playtime_forever / user total (the
+      ratios stored in user_play_ratio)
+    * ``play_total``: users x games CSR of playtime_forever + playtime_2weeks,
+      used to pick the user's top games for the centroid
+    * ``tfidf``: games x terms CSR, L2-normalized rows
+
+    The collaborative score is the similarity-weighted sum of the K nearest
+    users' ratio rows; the content score is the cosine between each game and
+    the centroid of the user's top N games. Both are scaled so the best game
+    the user does not own scores 1, then blended with ``alpha``.
+
+    Neighbours come from ``neighbour_index`` (an InvertedIndex built over the
+    same users) when given, otherwise from an in-memory UserSimilarity.
+    """
+
+    def __init__(self, user_ids, item_ids, item_names, play, play_total, tfidf,
+                 neighbour_index=None):
+        self.user_ids = list(user_ids)
+        self.item_ids = list(item_ids)
+        self.item_names = list(item_names)
+        self.user_index = {u: i for i, u in enumerate(self.user_ids)}
+        self.play = sp.csr_matrix(play, dtype=np.float32)
+        self.play_total = sp.csr_matrix(play_total, dtype=np.float32)
+        if neighbour_index is not None and neighbour_index.user_ids != [str(u) for u in self.user_ids]:
+            raise ValueError("neighbour_index was built for a different set of users; rebuild it")
+        self.similarity = neighbour_index or UserSimilarity(self.user_ids, self.play)
+        self.tfidf = _row_normalize(sp.csr_matrix(tfidf, dtype=np.float32))
+
+    @classmethod
+    def from_db(cls, cursor, index_dir=INDEX_DIR):
+        """
+        Build the matrices from user_items and games, addressed by the
+        interned *_idx rows. Neighbour search uses the inverted index in
+        ``index_dir`` when one exists; it is rebuilt first if its stamp no
+        longer matches the data (see InvertedIndex.matches).
+        """
+        stamp = latest_change_id(cursor)
+        users, games = load_interners(cursor)
+        cursor.execute("""
+            SELECT user_idx, item_idx, item_name,
+                   COALESCE(playtime_forever, 0), COALESCE(playtime_2weeks, 0)
+            FROM user_items
+            WHERE user_idx IS NOT NULL AND item_idx IS NOT NULL;
+        """)
+        rows = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT item_idx, app_name, tfidf_vec_vector
+            FROM games
+            WHERE item_idx IS NOT NULL AND tfidf_vec_vector IS NOT NULL;
+        """)
+        game_rows = cursor.fetchall()
+
+        n_users, n_items = len(users), len(games)
+        names = list(games.keys)
+        if rows:
+            r, c, item_names, pf, p2w = (list(col) for col in zip(*rows))
+        else:
+            r, c, item_names, pf, p2w = [], [], [], [], []
+        for idx, name in zip(c, item_names):
+            names[idx] = name
+
+        t_rows, t_cols, t_vals, dim = [], [], [], 0
+        for idx, app_name, vec in game_rows:
+            v = parse_pgvector(vec)
+            if v.size == 0:
+                continue
+            nz = np.flatnonzero(v)
+            t_rows.append(np.full(nz.size, idx))
+            t_cols.append(nz)
+            t_vals.append(v[nz])
+            dim = max(dim, v.size)
+            if app_name:
+                names[idx] = app_name
+
+        play, play_total = play_matrices(r, c, pf, p2w, shape=(n_users, n_items))
+
+        if t_vals:
+            tfidf = sp.csr_matrix(
+                (np.concatenate(t_vals), (np.concatenate(t_rows), np.concatenate(t_cols))),
+                shape=(n_items, dim), dtype=np.float32,
+            )
+        else:
+            tfidf = sp.csr_matrix((n_items, 1), dtype=np.float32)
+
+        index = None
+        if index_dir is not None and (Path(index_dir) / 'meta.json').exists():
+            index = InvertedIndex(index_dir)
+            if not index.matches(users.keys, play.count_nonzero(), stamp):
+                # Release the memory-mapped arrays before their files are rewritten
+                index = None
+                print(f"⏳ {index_dir} is out of date; rebuilding")
+                build_index(users.keys, play, index_dir, last_change_id=stamp)
+                index = InvertedIndex(index_dir)
+        return cls(users.keys, games.keys, names, play, play_total, tfidf, neighbour_index=index)
+
+    def neighbours(self, u, k=K_NEIGHBOR):
+        """(user rows, cosine similarities) of the k users closest to row u."""
+        return self.similarity.neighbours_of(u, k)
+
+    def collaborative_scores(self, u, k=K_NEIGHBOR):
+        nb, weights = self.neighbours(u, k)
+        weights = np.clip(weights, 0.0, None)
+        return np.asarray(self.play[nb].T @ weights).ravel()
+
+    def content_scores(self, u, n_user=N_USER):
+        row = self.play_total[u]
+        if row.nnz == 0:
+            return np.zeros(len(self.item_ids), dtype=np.float32)
+        top = row.indices[_top_k(row.data, n_user)]
+        centroid = np.asarray(self.tfidf[top].mean(axis=0)).ravel()
+        norm = np.linalg.norm(centroid)
+        if norm == 0:
+            return np.zeros(len(self.item_ids), dtype=np.float32)
+        return self.tfidf @ (centroid / norm)
+
+    def score(self, user_id, alpha=ALPHA, k_neighbor=K_NEIGHBOR, n_user=N_USER):
+        """
+        Blended score for every game (owned games set to -inf). Both parts
+        are scaled by their best score among games the user does not own;
+        owned games would otherwise set the maximum and squash the blend.
+        """
+        u = self.user_index[user_id]
+        owned = self.play_total[u].indices
+        candidates = np.ones(len(self.item_ids), dtype=bool)
+        candidates[owned] = False
+        cf = _scale_by_best(self.collaborative_scores(u, k_neighbor), candidates)
+        content = _scale_by_best(self.content_scores(u, n_user), candidates)
+        scores = alpha * content + (1.0 - alpha) * cf
+        scores[owned] = -np.inf
+        return scores, cf, content
+
+    def recommend(self, user_id, k=K_REC, alpha=ALPHA, k_neighbor=K_NEIGHBOR, n_user=N_USER):
+        """
+        Ranked recommendations for ``user_id``.
+
+        Returns:
+            list of (item_id, item_name, blended, collaborative, content)
+        """
+        scores, cf, content = self.score(user_id, alpha, k_neighbor, n_user)
+        top = [i for i in _top_k(scores, k) if np.isfinite(scores[i])]
+        return [
+            (self.item_ids[i], self.item_names[i], float(scores[i]), float(cf[i]), float(content[i]))
+            for i in top
+        ]
+
+# ------------------ Main ------------------
+def main():
+    conn = psycopg2.connect(**DB_CFG)
+    cursor = conn.cursor()
+    try:
+        model = HybridRecommender.from_db(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+    if USER_ID not in model.user_index:
+        raise RuntimeError("No games found for this user in user_items.")
+
+    print(f"=== Top {K_REC} Hybrid Recommendations for '{USER_ID}' (alpha={ALPHA}) ===")
+    for rnk, (gid, name, score, cf, content) in enumerate(model.recommend(USER_ID), start=1):
+        print(f"{rnk}. {name} (id={gid}) — score: {score:.4f} | collaborative: {cf:.4f} | content: {content:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import json
+from pathlib import Path
+
+import psycopg2
+import numpy as np
+from psycopg2.extras import execute_values
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+INTERN_DIR = Path('data/ids')
+
+# kind -> (mapping table, integer column, text key column)
+KINDS = {
+    'user': ('user_index', 'user_idx', 'user_id'),
+    'game': ('game_index', 'item_idx', 'item_id'),
+}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS user_index (
+    user_idx INTEGER PRIMARY KEY,
+    user_id  TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS game_index (
+    item_idx INTEGER PRIMARY KEY,
+    item_id  TEXT NOT NULL UNIQUE
+);
+ALTER TABLE user_items ADD COLUMN IF NOT EXISTS user_idx INTEGER;
+ALTER TABLE user_items ADD COLUMN IF NOT EXISTS item_idx INTEGER;
+ALTER TABLE games      ADD COLUMN IF NOT EXISTS item_idx INTEGER;
+CREATE INDEX IF NOT EXISTS idx_user_items_user_idx ON user_items (user_idx);
+CREATE INDEX IF NOT EXISTS idx_user_items_item_idx ON user_items (item_idx);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_games_item_idx ON games (item_idx);
+"""
+
+# ------------------ Interner ------------------
+class IdInterner:
+    """
+    Append-only mapping between text ids and dense int32 rows.
+
+    Rows are handed out in first-seen order and never reused, so a matrix
+    built today stays addressable after more users or games are interned;
+    new ids only ever add rows/columns at the end.
+    """
+
+    def __init__(self, keys=()):
+        self._keys = []
+        self._index = {}
+        for k in keys:
+            self.intern(k)
+        self._persisted = len(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._index
+
+    @property
+    def keys(self):
+        return self._keys
+
+    def intern(self, key):
+        """Row for ``key``, assigning the next free row if it is new."""
+        idx = self._index.get(key)
+        if idx is None:
+            idx = self._index[key] = len(self._keys)
+            self._keys.append(key)
+        return idx
+
+    def intern_many(self, keys):
+        return np.fromiter((self.intern(k) for k in keys), dtype=np.int32)
+
+    def get(self, key, default=None):
+        return self._index.get(key, default)
+
+    def key(self, idx):
+        return self._keys[idx]
+
+    # ---------- file persistence ----------
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with path.open('w', encoding='utf-8') as f:
+            json.dump(self._keys, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with Path(path).open(encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    # ---------- database persistence ----------
+    @classmethod
+    def from_db(cls, cursor, kind):
+        table, idx_col, key_col = KINDS[kind]
+        cursor.execute(f"SELECT {key_col} FROM {table} ORDER BY {idx_col};")
+        return cls(row[0] for row in cursor.fetchall())
+
+    def sync_to_db(self, cursor, kind):
+        """
+        Insert mappings assigned since the last load/sync.
+
+        Raises if any row was already taken: the in-memory rows were handed
+        out from a stale snapshot and must not be written to user_items.
+        """
+        table, idx_col, key_col = KINDS[kind]
+        new = [(i, self._keys[i]) for i in range(self._persisted, len(self._keys))]
+        if new:
+            inserted = execute_values(cursor,
+                                      f"INSERT INTO {table} ({idx_col}, {key_col}) VALUES %s "
+                                      f"ON CONFLICT DO NOTHING RETURNING {idx_col};",
+                                      new, fetch=True)
+            if len(inserted) != len(new):
+                raise RuntimeError(f"{table}: inserted {len(inserted)} of {len(new)} new ids; "
+                                   f"another interning run got there first")
+        self._persisted = len(self._keys)
+        return len(new)
+
+# ------------------ Ingest ------------------
+def load_interners(cursor):
+    """(users, games) interners as persisted in the database."""
+    return IdInterner.from_db(cursor, 'user'), IdInterner.from_db(cursor, 'game')
+
+def intern_ingested_ids(cursor, intern_dir=INTERN_DIR):
+    """
+    Give every new user/game an integer id and backfill the *_idx columns.
+
+    Run after loading user_items/games; only rows whose *_idx is still NULL
+    are touched. The mapping is also written to ``intern_dir`` so offline
+    jobs can load it without a database. user_index/game_index stay locked
+    until the caller commits.
+    """
+    cursor.execute(SCHEMA_SQL)
+    # Serialise concurrent runs: rows are assigned from the snapshot loaded
+    # below, so a second writer must wait until this transaction commits.
+    cursor.execute("LOCK TABLE user_index, game_index IN EXCLUSIVE MODE;")
+    users, games = load_interners(cursor)
+
+    cursor.execute("SELECT DISTINCT user_id FROM user_items WHERE user_idx IS NULL ORDER BY user_id;")
+    for (user_id,) in cursor.fetchall():
+        users.intern(user_id)
+    cursor.execute("""
+        SELECT item_id FROM user_items WHERE item_idx IS NULL
+        UNION
+        SELECT id FROM games WHERE item_idx IS NULL
+        ORDER BY 1;
+    """)
+    for (item_id,) in cursor.fetchall():
+        games.intern(str(item_id))
+
+    added = (users.sync_to_db(cursor, 'user'), games.sync_to_db(cursor, 'game'))
+
+    cursor.execute("""
+        UPDATE user_items ui SET user_idx = x.user_idx
+        FROM user_index x
+        WHERE ui.user_idx IS NULL AND ui.user_id = x.user_id;
+    """)
+    cursor.execute("""
+        UPDATE user_items ui SET item_idx = x.item_idx
+        FROM game_index x
+        WHERE ui.item_idx IS NULL AND ui.item_id = x.item_id;
+    """)
+    cursor.execute("""
+        UPDATE games g SET item_idx = x.item_idx
+        FROM game_index x
+        WHERE g.item_idx IS NULL AND g.id = x.item_id;
+    """)
+
+    users.save(Path(intern_dir) / 'users.json')
+    games.save(Path(intern_dir) / 'games.json')
+    return users, games, added
+
+# ------------------ Main ------------------
+if __name__ == "__main__":
+    conn = psycopg2.connect(**DB_CFG)
+    cursor = conn.cursor()
+    try:
+        users, games, (new_users, new_games) = intern_ingested_ids(cursor)
+        conn.commit()
+        print(f"✅ Interned {new_users} new users ({len(users)} total), "
+              f"{new_games} new games ({len(games)} total)")
+    finally:
+        cursor.close()
+        conn.close()
@@ -0,0 +1,224 @@
+import json
+import os
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+import numpy as np
+import scipy.sparse as sp
+
+from id_interning import load_interners
+from user_similarity import _top_k
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+MODEL_DIR = Path('models/als')
+
+USER_ID = "doctr"    # <-- change as needed
+K_REC = 10
+FACTORS = 64
+ITERATIONS = 15
+REGULARIZATION = 0.1
+ALPHA = 40.0         # confidence scale
+EPSILON = 60.0       # playtime (minutes) that counts as one confidence unit
+RECENT_WEIGHT = 2.0  # extra weight of playtime_2weeks over playtime_forever
+THREADS = os.cpu_count() or 1
+BLOCK_SIZE = 1024    # rows solved per thread task
+
+# ------------------ Helpers ------------------
+def confidence_matrix(user_rows, item_cols, playtime_forever, playtime_2weeks, shape,
+                      alpha=ALPHA, epsilon=EPSILON, recent_weight=RECENT_WEIGHT):
+    """
+    Users x items confidence CSR: 1 + alpha * log(1 + minutes / epsilon).
+
+    Recent playtime is weighted by ``recent_weight`` so currently played
+    games count more than an old backlog. Every owned game keeps confidence
+    of at least 1, even with zero minutes.
+    """
+    minutes = np.asarray(playtime_forever, dtype=np.float64) + \
+        recent_weight * np.asarray(playtime_2weeks, dtype=np.float64)
+    conf = 1.0 + alpha * np.log1p(np.clip(minutes, 0, None) / epsilon)
+    mat = sp.csr_matrix((conf.astype(np.float32), (user_rows, item_cols)), shape=shape)
+    mat.sum_duplicates()
+    return mat
+
+def _solve_block(conf, fixed, gram, reg, rows, out):
+    """
+    Exact least squares for ``rows`` of ``conf`` against the ``fixed`` factors:
+    (YᵀY + Yᵀ(Cᵤ - I)Y + λI) xᵤ = YᵀCᵤ pᵤ, with pᵤ = 1 on observed items.
+    """
+    eye = reg * np.eye(fixed.shape[1], dtype=np.float64)
+    for u in rows:
+        start, end = conf.indptr[u], conf.indptr[u + 1]
+        if start == end:
+            out[u] = 0.0
+            continue
+        idx = conf.indices[start:end]
+        c = conf.data[start:end].astype(np.float64)
+        y = fixed[idx].astype(np.float64)
+        a = gram + (y.T * (c - 1.0)) @ y + eye
+        b = y.T @ c
+        out[u] = np.linalg.solve(a, b)
+
+def _als_step(conf, fixed, out, reg, pool, block_size):
+    fixed64 = fixed.astype(np.float64)
+    gram = fixed64.T @ fixed64
+    blocks = [range(i, min(i + block_size, conf.shape[0]))
+              for i in range(0, conf.shape[0], block_size)]
+    list(pool.map(lambda rows: _solve_block(conf, fixed, gram, reg, rows, out), blocks))
+
+# ------------------ Model ------------------
+class ImplicitALS:
+    """
+    Implicit-feedback matrix factorization (Hu, Koren & Volinsky) on user_items.
+
+    Factors are float32 and stored as ``.npy`` files so they can be opened
+    with ``mmap_mode='r'`` and shared across processes without copying.
+    """
+
+    def __init__(self, user_ids, item_ids, user_factors, item_factors, owned=None, item_names=None):
+        self.user_ids = list(user_ids)
+        self.item_ids = list(item_ids)
+        self.item_names = list(item_names) if item_names is not None else list(self.item_ids)
+        self.user_index = {u: i for i, u in enumerate(self.user_ids)}
+        self.item_index = {g: i for i, g in enumerate(self.item_ids)}
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.owned = owned
+
+    @classmethod
+    def fit(cls, user_ids, item_ids, conf, factors=FACTORS, iterations=ITERATIONS,
+            reg=REGULARIZATION, threads=THREADS, block_size=BLOCK_SIZE, seed=0, item_names=None):
+        """Alternate exact user/item solves for ``iterations`` rounds."""
+        conf = sp.csr_matrix(conf, dtype=np.float32)
+        conf_t = conf.T.tocsr()
+        rng = np.random.default_rng(seed)
+        x = (rng.standard_normal((conf.shape[0], factors)) * 0.01).astype(np.float32)
+        y = (rng.standard_normal((conf.shape[1], factors)) * 0.01).astype(np.float32)
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for it in range(iterations):
+                _als_step(conf, y, x, reg, pool, block_size)
+                _als_step(conf_t, x, y, reg, pool, block_size)
+                print(f"⏳ ALS iteration {it + 1}/{iterations}")
+
+        owned = sp.csr_matrix((np.ones_like(conf.data, dtype=np.bool_), conf.indices, conf.indptr),
+                              shape=conf.shape)
+        return cls(user_ids, item_ids, x, y, owned=owned, item_names=item_names)
+
+    @classmethod
+    def from_db(cls, cursor, **fit_kwargs):
+        """Fit on every row of user_items, addressed by the interned *_idx rows."""
+        users, games = load_interners(cursor)
+        cursor.execute("""
+            SELECT user_idx, item_idx, item_name,
+                   COALESCE(playtime_forever, 0), COALESCE(playtime_2weeks, 0)
+            FROM user_items
+            WHERE user_idx IS NOT NULL AND item_idx IS NOT NULL;
+        """)
+        rows = cursor.fetchall()
+        names = list(games.keys)
+        if rows:
+            r, c, item_names, pf, p2w = (list(col) for col in zip(*rows))
+        else:
+            r, c, item_names, pf, p2w = [], [], [], [], []
+        for idx, name in zip(c, item_names):
+            names[idx] = name
+        conf = confidence_matrix(r, c, pf, p2w, shape=(len(users), len(games)))
+        return cls.fit(users.keys, games.keys, conf, item_names=names, **fit_kwargs)
+
+    # ---------- persistence ----------
+    def save(self, model_dir=MODEL_DIR):
+        model_dir = Path(model_dir)
+        model_dir.mkdir(parents=True, exist_ok=True)
+        for name, arr in (('user_factors', self.user_factors), ('item_factors', self.item_factors)):
+            mm = np.lib.format.open_memmap(model_dir / f'{name}.npy', mode='w+',
+                                           dtype=np.float32, shape=arr.shape)
+            mm[:] = arr
+            mm.flush()
+            del mm
+        if self.owned is not None:
+            sp.save_npz(model_dir / 'owned.npz', self.owned.astype(np.int8), compressed=False)
+        with (model_dir / 'ids.json').open('w', encoding='utf-8') as f:
+            json.dump({'user_ids': self.user_ids, 'item_ids': self.item_ids,
+                       'item_names': self.item_names}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR):
+        """Open saved factors memory-mapped (read-only)."""
+        model_dir = Path(model_dir)
+        with (model_dir / 'ids.json').open(encoding='utf-8') as f:
+            ids = json.load(f)
+        owned_path = model_dir / 'owned.npz'
+        owned = sp.load_npz(owned_path).tocsr() if owned_path.exists() else None
+        return cls(ids['user_ids'], ids['item_ids'],
+                   np.load(model_dir / 'user_factors.npy', mmap_mode='r'),
+                   np.load(model_dir / 'item_factors.npy', mmap_mode='r'),
+                   owned=owned, item_names=ids.get('item_names'))
+
+    # ---------- scoring ----------
+    def score_user(self, user_id):
+        """Preference score for every item: one (items x f) · (f,) product."""
+        return self.item_factors @ self.user_factors[self.user_index[user_id]]
+
+    def recommend(self, user_id, k=K_REC, exclude_owned=True):
+        """Top ``k`` (item_id, item_name, score) for ``user_id``."""
+        scores = np.array(self.score_user(user_id), dtype=np.float32)
+        if exclude_owned and self.owned is not None:
+            scores[self.owned[self.user_index[user_id]].indices] = -np.inf
+        top = [i for i in _top_k(scores, k) if np.isfinite(scores[i])]
+        return [(self.item_ids[i], self.item_names[i], float(scores[i])) for i in top]
+
+    def recommend_batch(self, user_ids, k=K_REC, exclude_owned=True):
+        """
+        recommend() for many users with a single (users x f) · (f x items) matmul.
+
+        Returns one result list per user id, in order.
+        """
+        rows = np.fromiter((self.user_index[u] for u in user_ids), dtype=np.int64)
+        scores = np.asarray(self.user_factors[rows] @ self.item_factors.T, dtype=np.float32)
+        if exclude_owned and self.owned is not None:
+            owned = self.owned[rows].tocoo()
+            scores[owned.row, owned.col] = -np.inf
+
+        k = min(k, scores.shape[1])
+        if k <= 0:
+            return [[] for _ in rows]
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        order = np.argsort(-part_scores, axis=1)
+        top = np.take_along_axis(part, order, axis=1)
+        return [
+            [(self.item_ids[i], self.item_names[i], float(scores[r, i]))
+             for i in top[r] if np.isfinite(scores[r, i])]
+            for r in range(len(rows))
+        ]
+
+# ------------------ Main ------------------
+def main():
+    conn = psycopg2.connect(**DB_CFG)
+    cursor = conn.cursor()
+    try:
+        model = ImplicitALS.from_db(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+    model.save()
+    print(f"✅ Saved {model.user_factors.shape[0]} user / {model.item_factors.shape[0]} item factors to {MODEL_DIR}")
+
+    model = ImplicitALS.load()
+    if USER_ID in model.user_index:
+        print(f"\n=== Top {K_REC} ALS Recommendations for '{USER_ID}' ===")
+        for rnk, (gid, name, score) in enumerate(model.recommend(USER_ID), start=1):
+            print(f"{rnk}. {name} (id={gid}) — score: {score:.4f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+import hashlib
+import json
+import math
+from collections import Counter
+from datetime import date
+from pathlib import Path
+
+# ------------------ Configuration ------------------
+REJECTS_DIR = Path('data/rejects')
+USERS_JSONL = Path('data/australian_users_items_clean.jsonl')
+USERS_JSON = Path('data/australian_users_items_clean.json')
+
+# Columns the loaders bind by name; missing keys are loaded as NULL
+GAME_FIELDS = ('id', 'app_name', 'title', 'url', 'release_date', 'developer', 'publisher',
+               'genres', 'tags', 'price', 'discount_price', 'early_access', 'metascore',
+               'sentiment', 'specs', 'reviews_url')
+USER_FIELDS = ('user_id', 'steam_id', 'items_count', 'user_url')
+
+# ------------------ Readers ------------------
+def iter_jsonl(path):
+    """One user object per non-empty line."""
+    with Path(path).open(encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def iter_json_array(path, read_size=1 << 20):
+    """Elements of a top-level JSON array, decoded incrementally instead of json.load."""
+    decoder = json.JSONDecoder()
+    with Path(path).open(encoding='utf-8') as f:
+        buf = f.read(read_size).lstrip()
+        if not buf.startswith('['):
+            raise ValueError(f"{path} is not a JSON array")
+        buf, pos, eof = buf[1:], 0, False
+        while True:
+            # skip separators, then decode the next element once it is fully buffered
+            while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                pos += 1
+            if pos < len(buf) and buf[pos] == ']':
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = f.read(read_size)
+                eof = not chunk
+                buf, pos = buf[pos:] + chunk, 0
+                continue
+            yield obj
+            pos = end
+            if pos > read_size:
+                buf, pos = buf[pos:], 0
+
+def iter_users(path=None):
+    """Users from JSON Lines when available, else from the JSON array dump."""
+    path = Path(path) if path else (USERS_JSONL if USERS_JSONL.exists() else USERS_JSON)
+    return iter_jsonl(path) if path.suffix == '.jsonl' else iter_json_array(path)
+
+# ------------------ Reject sidecar ------------------
+class RejectLog:
+    """
+    Append-only JSONL of records that were dropped, one object per line:
+    {"source": ..., "reason": ..., "context": {...}, "record": ...}.
+    Counts per reason are kept for the end-of-run summary.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.counts = Counter()
+        self._f = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = self.path.open('w', encoding='utf-8')
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+        return False
+
+    def reject(self, source, reason, record, **context):
+        self.counts[(source, reason)] += 1
+        self._f.write(json.dumps({'source': source, 'reason': reason, 'context': context or None,
+                                  'record': record}, ensure_ascii=False, default=str) + "\n")
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def summary(self):
+        if not self.counts:
+            return "no rejected records"
+        parts = [f"{n} {source}: {reason}" for (source, reason), n in self.counts.most_common()]
+        return f"{self.total} rejected -> {self.path} (" + "; ".join(parts) + ")"
+
+# ------------------ Dedup ------------------
+def key64(*parts):
+    """
+    8-byte digest of a composite key as a Python int: a set of these holds
+    millions of (user, item) pairs in a fraction of the memory of string
+    tuples, with a negligible chance of collision.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    for p in parts:
+        h.update(str(p).encode('utf-8'))
+        h.update(b'\x1f')
+    return int.from_bytes(h.digest(), 'little')
+
+# ------------------ Validation ------------------
+def _has_id(value):
+    return value is not None and str(value).strip() != ''
+
+def _iso_date(value):
+    if value in (None, ''):
+        return None
+    try:
+        return date.fromisoformat(str(value)).isoformat()
+    except ValueError:
+        return None
+
+def _minutes(value):
+    return isinstance(value, int) and not isinstance(value, bool) and value >= 0
+
+def _price(value):
+    """
+    A price that fits games.price NUMERIC(10,2), else None. Store labels such
+    as 'Free to Play' (kept as text by coercion.to_float_or_label) are not
+    amounts and would abort the INSERT.
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(price) or abs(price) >= 1e8:
+        return None
+    return round(price, 2)
+
+def clean_games(games, rejects, source='games'):
+    """
+    Valid, first-seen games. Missing ids are rejected; a release_date that
+    does not parse is loaded as NULL instead of failing the ::date cast, and
+    so are prices that are not amounts.
+    """
+    seen = set()
+    for g in games:
+        if not isinstance(g, dict):
+            rejects.reject(source, 'not an object', g)
+            continue
+        if not _has_id(g.get('id')):
+            rejects.reject(source, 'missing id', g)
+            continue
+        gid = str(g['id'])
+        if gid in seen:
+            rejects.reject(source, 'duplicate id', g, id=gid)
+            continue
+        seen.add(gid)
+        yield {**dict.fromkeys(GAME_FIELDS), **g, 'id': gid, 'release_date': _iso_date(g.get('release_date')),
+               'price': _price(g.get('price')), 'discount_price': _price(g.get('discount_price'))}
+
+def clean_users(users, rejects, source='users'):
+    """
+    Valid users with their items validated and deduplicated.
+
+    Users without a user_id are rejected whole. Items without an item_id,
+    with negative or non-integer playtimes, or repeating a (user, item)
+    pair already seen anywhere in the stream are rejected one by one, so a
+    user listed twice only contributes the items the first record lacked.
+    """
+    seen_pairs = set()
+    for u in users:
+        if not isinstance(u, dict):
+            rejects.reject(source, 'not an object', u)
+            continue
+        if not _has_id(u.get('user_id')):
+            rejects.reject(source, 'missing user_id', u)
+            continue
+        uid = str(u['user_id'])
+
+        items = u.get('items') or []
+        if not isinstance(items, list):
+            rejects.reject('user_items', 'items is not a list', items, user_id=uid)
+            items = []
+        kept = []
+        for it in items:
+            if not isinstance(it, dict) or not _has_id(it.get('item_id')):
+                rejects.reject('user_items', 'missing item_id', it, user_id=uid)
+                continue
+            it = dict(it, item_id=str(it['item_id']),
+                      playtime_forever=it.get('playtime_forever', 0),
+                      playtime_2weeks=it.get('playtime_2weeks') or 0)
+            if not (_minutes(it['playtime_forever']) and _minutes(it['playtime_2weeks'])):
+                rejects.reject('user_items', 'invalid playtime', it, user_id=uid)
+                continue
+            pair = key64(uid, it['item_id'])
+            if pair in seen_pairs:
+                rejects.reject('user_items', 'duplicate (user, item)', it, user_id=uid)
+                continue
+            seen_pairs.add(pair)
+            kept.append(it)
+        yield {**dict.fromkeys(USER_FIELDS), **u, 'user_id': uid, 'items': kept}
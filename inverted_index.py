@@ -0,0 +1,282 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import psycopg2
+import numpy as np
+import scipy.sparse as sp
+
+from delta_ingest import latest_change_id
+from user_similarity import DB_CFG, K_NEIGHBOR, USER_ID, UserSimilarity, _row_normalize, _top_k
+
+# ------------------ Configuration ------------------
+INDEX_DIR = Path('models/inverted_index')
+STOP_FRACTION = 0.2        # games owned by more than this share of users are stop-listed...
+STOP_MIN_POSTINGS = 1000   # ...but never lists shorter than this
+CHECK_DECAY = 0.8          # re-derive the pruning threshold when the unread bound drops by 20%
+
+ARRAYS = ('offsets', 'postings', 'weights', 'max_weight', 'stop',
+          'user_offsets', 'user_items', 'user_weights')
+
+# ------------------ Build ------------------
+def build_index(user_ids, ratios, out_dir=INDEX_DIR, stop_fraction=STOP_FRACTION,
+                stop_min=STOP_MIN_POSTINGS, last_change_id=None):
+    """
+    Write the game -> users index of a users x games ratio matrix.
+
+    Per game: the sorted int32 user rows that own it (``postings``, sliced
+    by ``offsets``), their L2-normalized weights and the list's maximum
+    weight for pruning. The normalized user rows are stored alongside for
+    exact rescoring of candidates. Games with more than
+    max(stop_fraction * users, stop_min) owners are flagged in ``stop``.
+    ``last_change_id`` (delta_ingest's user_changes position the data was
+    read at) is stamped into meta.json so stale indexes can be detected.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    mat = _row_normalize(sp.csr_matrix(ratios, dtype=np.float32))
+    mat.eliminate_zeros()
+    mat.sort_indices()
+    by_item = mat.T.tocsr()
+    by_item.sort_indices()
+
+    lengths = np.diff(by_item.indptr)
+    stop_postings = max(stop_min, int(stop_fraction * mat.shape[0]))
+    arrays = {
+        'offsets': by_item.indptr.astype(np.int64),
+        'postings': by_item.indices.astype(np.int32),
+        'weights': by_item.data.astype(np.float32),
+        'max_weight': by_item.max(axis=1).toarray().ravel().astype(np.float32),
+        'stop': lengths > stop_postings,
+        'user_offsets': mat.indptr.astype(np.int64),
+        'user_items': mat.indices.astype(np.int32),
+        'user_weights': mat.data.astype(np.float32),
+    }
+    for name, arr in arrays.items():
+        np.save(out_dir / f"{name}.npy", arr)
+    np.save(out_dir / 'user_ids.npy', np.asarray([str(u) for u in user_ids]))
+    meta = {'n_users': mat.shape[0], 'n_items': mat.shape[1], 'nnz': int(mat.nnz),
+            'stop_postings': stop_postings, 'stop_games': int(arrays['stop'].sum()),
+            'last_change_id': last_change_id}
+    (out_dir / 'meta.json').write_text(json.dumps(meta, indent=1), encoding='utf-8')
+    return meta
+
+# ------------------ Search ------------------
+class InvertedIndex:
+    """
+    Top-K cosine neighbours from memory-mapped posting lists.
+
+    Only users sharing a game with the query are ever scored. Query games
+    are read most-promising first (weight x list maximum); once the best
+    score an unseen user could still reach from the unread lists is below
+    the current k-th best, no new candidate can make the top K, so the
+    remaining lists are not read whole (MaxScore). The candidates' scores
+    are then finished by binary search in those sorted lists, dropping
+    each candidate as soon as its upper bound falls short (WAND-style).
+
+    Results are exact by default. With ``use_stop_list`` the stop-listed
+    games are never read whole, but still count in the final score; users
+    who share *only* stop-listed games with the query are missed (see
+    ``recall()``). A library made only of stop-listed games falls back to
+    using all of them.
+    """
+
+    def __init__(self, index_dir=INDEX_DIR):
+        index_dir = Path(index_dir)
+        self.meta = json.loads((index_dir / 'meta.json').read_text(encoding='utf-8'))
+        for name in ARRAYS:
+            setattr(self, name, np.load(index_dir / f"{name}.npy", mmap_mode='r'))
+        self.user_ids = [str(u) for u in np.load(index_dir / 'user_ids.npy')]
+        self.user_index = {u: i for i, u in enumerate(self.user_ids)}
+        self.n_users, self.n_items = self.meta['n_users'], self.meta['n_items']
+        # CSR view of the normalized user rows for exact rescoring
+        self.users = sp.csr_matrix((self.user_weights, self.user_items, self.user_offsets),
+                                   shape=(self.n_users, self.n_items))
+        self.stats = {'queries': 0, 'postings_read': 0, 'candidates': 0, 'scored': 0}
+
+    def matches(self, user_ids, nnz, last_change_id):
+        """
+        Whether the index was built from the same data: same users, same
+        number of played (user, game) pairs and no library change logged
+        since. Any mismatch means postings may be stale.
+        """
+        return (self.meta.get('last_change_id') == last_change_id
+                and self.meta['nnz'] == nnz
+                and self.user_ids == [str(u) for u in user_ids])
+
+    def user_row(self, u):
+        """(game columns, normalized weights) of user row u."""
+        s, e = self.user_offsets[u], self.user_offsets[u + 1]
+        return np.asarray(self.user_items[s:e]), np.asarray(self.user_weights[s:e])
+
+    def _rescore(self, users, q_dense):
+        """Exact cosines of ``users`` against a dense normalized query."""
+        return np.asarray(self.users[users] @ q_dense, dtype=np.float32).ravel()
+
+    def _threshold(self, cand, acc, q_dense, k):
+        """
+        A lower bound on the k-th best exact score: the exact scores of the
+        k best partial ones (partial <= exact, so these are at least as good).
+        """
+        if cand.size < k:
+            return 0.0
+        best = cand[np.argpartition(-acc, k - 1)[:k]]
+        return float(np.min(self._rescore(best, q_dense)))
+
+    @staticmethod
+    def _accumulate(cand, acc, users, contrib):
+        """
+        Add one posting list's contributions into the candidate accumulator.
+
+        ``cand`` holds the sorted user rows seen so far and ``acc`` their
+        partial scores, so memory follows the number of candidates rather
+        than the user base. Postings are sorted too: existing candidates are
+        found by binary search and new ones spliced in at their positions.
+        """
+        pos = np.searchsorted(cand, users)
+        hit = pos < cand.size
+        hit[hit] = cand[pos[hit]] == users[hit]
+        acc[pos[hit]] += contrib[hit]
+        new = ~hit
+        if new.any():
+            cand = np.insert(cand, pos[new], users[new])
+            acc = np.insert(acc, pos[new], contrib[new])
+        return cand, acc
+
+    def search(self, q_cols, q_vals, k=K_NEIGHBOR, exclude=None, use_stop_list=False):
+        """
+        (user rows, cosine similarities) of the k best matches, best first.
+        Exact unless ``use_stop_list`` is set (see the class docstring).
+        """
+        q_cols = np.asarray(q_cols, dtype=np.int64)
+        q_vals = np.asarray(q_vals, dtype=np.float32)
+        norm = np.linalg.norm(q_vals)
+        if q_cols.size == 0 or norm == 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        q_vals = q_vals / norm
+        q_dense = np.zeros(self.n_items, dtype=np.float32)
+        q_dense[q_cols] = q_vals
+
+        usable = ~np.asarray(self.stop[q_cols]) if use_stop_list else np.ones(q_cols.size, bool)
+        if not usable.any():
+            usable[:] = True
+        bound = q_vals * np.asarray(self.max_weight[q_cols])
+        # Usable games most promising first, then the stop-listed ones
+        order = np.lexsort((-bound, ~usable))
+        cols, vals, bound = q_cols[order], q_vals[order], bound[order]
+        n_usable = int(usable.sum())
+        remaining = np.concatenate([np.cumsum(bound[::-1])[::-1], [0.0]])
+        stop_bound = remaining[n_usable]
+
+        cand = np.array([], dtype=np.int32)
+        acc = np.array([], dtype=np.float32)
+        theta, read = 0.0, 0
+        next_check = np.inf
+        i = 0
+        # Phase 1 (MaxScore): read whole lists while an unseen user could still make the top K
+        for i in range(n_usable + 1):
+            if i == n_usable or (theta > 0 and remaining[i] - stop_bound < theta):
+                break
+            s, e = self.offsets[cols[i]], self.offsets[cols[i] + 1]
+            users = np.asarray(self.postings[s:e])
+            contrib = vals[i] * np.asarray(self.weights[s:e])
+            if exclude is not None:
+                keep = users != exclude
+                users, contrib = users[keep], contrib[keep]
+            cand, acc = self._accumulate(cand, acc, users, contrib)
+            read += e - s
+            # Refreshing theta costs a rescoring, so only do it each time the unread bound shrinks enough
+            if remaining[i + 1] <= next_check:
+                theta = max(theta, self._threshold(cand, acc, q_dense, k))
+                next_check = remaining[i + 1] * CHECK_DECAY
+
+        # Phase 2: finish the candidates' scores from the unread lists (stop-listed
+        # ones included) by binary search in the sorted postings, dropping every
+        # candidate whose partial score plus what is left cannot reach theta
+        n_candidates = cand.size
+        for j in range(i, cols.size):
+            keep = acc + remaining[j] >= theta
+            cand, acc = cand[keep], acc[keep]
+            if cand.size == 0:
+                break
+            s, e = self.offsets[cols[j]], self.offsets[cols[j] + 1]
+            plist = self.postings[s:e]
+            pos = np.searchsorted(plist, cand)
+            hit = pos < (e - s)
+            hit[hit] = np.asarray(plist[pos[hit]]) == cand[hit]
+            acc[hit] += vals[j] * np.asarray(self.weights[s + pos[hit]])
+        top = _top_k(acc, k)
+
+        self.stats['queries'] += 1
+        self.stats['postings_read'] += int(read)
+        self.stats['candidates'] += int(n_candidates)
+        self.stats['scored'] += int(cand.size)
+        return cand[top].astype(np.int64), acc[top]
+
+    def neighbours_of(self, u, k=K_NEIGHBOR, use_stop_list=False):
+        """(user rows, cosine similarities) of the k users closest to row u, best first."""
+        cols, vals = self.user_row(u)
+        return self.search(cols, vals, k, exclude=u, use_stop_list=use_stop_list)
+
+    def neighbours(self, user_id, k=K_NEIGHBOR, use_stop_list=False):
+        """[(user_id, similarity)] of the k users closest to ``user_id``."""
+        idx, sims = self.neighbours_of(self.user_index[user_id], k, use_stop_list)
+        return [(self.user_ids[i], float(s)) for i, s in zip(idx, sims)]
+
+    def recall(self, users, k=K_NEIGHBOR):
+        """Share of the exact top-k neighbours the stop-listed search returns for ``users``."""
+        found = total = 0
+        for u in users:
+            exact = set(self.neighbours_of(u, k)[0].tolist())
+            found += len(exact & set(self.neighbours_of(u, k, use_stop_list=True)[0].tolist()))
+            total += len(exact)
+        return found / total if total else 1.0
+
+    def touched_fraction(self):
+        """Mean share of the user base scored per query."""
+        q = self.stats['queries']
+        return self.stats['candidates'] / (q * self.n_users) if q else 0.0
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description="Game -> users inverted index for neighbour search")
+    parser.add_argument('--build', action='store_true', help="(re)build the index from user_items")
+    parser.add_argument('--dir', type=Path, default=INDEX_DIR)
+    parser.add_argument('--stop-fraction', type=float, default=STOP_FRACTION)
+    parser.add_argument('--user', default=USER_ID)
+    parser.add_argument('--k', type=int, default=K_NEIGHBOR)
+    parser.add_argument('--stop-list', action='store_true',
+                        help="skip reading stop-listed games whole (approximate; reports recall)")
+    args = parser.parse_args()
+
+    if args.build:
+        conn = psycopg2.connect(**DB_CFG)
+        cursor = conn.cursor()
+        try:
+            stamp = latest_change_id(cursor)
+            engine = UserSimilarity.from_db(cursor)
+        finally:
+            cursor.close()
+            conn.close()
+        meta = build_index(engine.user_ids, engine.matrix, args.dir, args.stop_fraction,
+                           last_change_id=stamp)
+        print(f"✅ Index for {meta['n_users']} users x {meta['n_items']} games -> {args.dir} "
+              f"({meta['stop_games']} games stop-listed above {meta['stop_postings']} owners)")
+
+    index = InvertedIndex(args.dir)
+    if args.user not in index.user_index:
+        raise RuntimeError("No games found for this user in the index.")
+    t0 = time.perf_counter()
+    result = index.neighbours(args.user, args.k, use_stop_list=args.stop_list)
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"=== Top {args.k} users similar to '{args.user}' ===")
+    for rnk, (user_id, sim) in enumerate(result, start=1):
+        print(f"{rnk}. {user_id} — cosine: {sim:.4f}")
+    print(f"({ms:.1f} ms; {index.stats['postings_read']} postings read, "
+          f"{index.touched_fraction():.2%} of users touched, {index.stats['scored']} fully scored)")
+    if args.stop_list:
+        print(f"recall vs exact: {index.recall([index.user_index[args.user]], args.k):.2%}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+import json
+from pathlib import Path
+
+import psycopg2
+import numpy as np
+import scipy.sparse as sp
+
+from id_interning import load_interners
+from user_similarity import _top_k
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+MODEL_DIR = Path('models/item_cooccurrence')
+
+USER_ID = "doctr"    # <-- change as needed
+K_REC = 10
+TOP_N = 50           # neighbours kept per game
+MIN_COUNT = 2        # co-owners needed before a pair counts
+BLOCK_ITEMS = 512    # game rows of XᵀX computed at a time
+EPSILON = 60.0       # playtime (minutes) that counts as one unit of a game's weight
+
+# ------------------ Helpers ------------------
+def play_weights(playtime_forever, epsilon=EPSILON):
+    """How much an owned game counts when scoring: 1 + log(1 + minutes / epsilon)."""
+    return 1.0 + np.log1p(np.clip(np.asarray(playtime_forever, dtype=np.float32), 0, None) / epsilon)
+
+def cooccurrence_topn(owned, top_n=TOP_N, min_count=MIN_COUNT, block_items=BLOCK_ITEMS):
+    """
+    games x games CSR of cosine similarity between game columns of the
+    boolean users x games ``owned`` matrix, keeping the ``top_n`` best
+    neighbours per game.
+
+    XᵀX is computed ``block_items`` game rows at a time; each block is
+    densified (block x games), so memory stays at one block however
+    popular the games are. Pairs with fewer than ``min_count`` co-owners
+    and the diagonal are dropped.
+    """
+    x = sp.csc_matrix(owned, dtype=np.float32)
+    x.data[:] = 1.0
+    n_items = x.shape[1]
+    counts = np.asarray(x.sum(axis=0)).ravel()
+    inv_norm = np.zeros(n_items, dtype=np.float32)
+    inv_norm[counts > 0] = 1.0 / np.sqrt(counts[counts > 0])
+    xt = x.T.tocsr()
+
+    rows, cols, vals = [], [], []
+    for start in range(0, n_items, block_items):
+        stop = min(start + block_items, n_items)
+        co = (xt[start:stop] @ x).toarray()
+        co[np.arange(stop - start), np.arange(start, stop)] = 0
+        co[co < min_count] = 0
+        sims = co * inv_norm[start:stop, None] * inv_norm[None, :]
+        k = min(top_n, n_items)
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        top_vals = np.take_along_axis(sims, top, axis=1)
+        keep = top_vals > 0
+        rows.append(np.nonzero(keep)[0] + start)
+        cols.append(top[keep])
+        vals.append(top_vals[keep])
+
+    if not rows:
+        return sp.csr_matrix((n_items, n_items), dtype=np.float32)
+    return sp.csr_matrix((np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))),
+                         shape=(n_items, n_items), dtype=np.float32)
+
+# ------------------ Recommender ------------------
+class ItemCooccurrence:
+    """
+    Item-based collaborative filtering ("players of X also played Y").
+
+    ``sims`` holds each game's top-N neighbours by co-ownership cosine. A
+    user's scores are the playtime-weighted sum of the neighbour rows of
+    the games they own: a sparse row sum over at most (owned x N) entries.
+    """
+
+    def __init__(self, user_ids, item_ids, sims, weights=None, item_names=None):
+        self.user_ids = list(user_ids)
+        self.item_ids = list(item_ids)
+        self.item_names = list(item_names) if item_names is not None else list(self.item_ids)
+        self.user_index = {u: i for i, u in enumerate(self.user_ids)}
+        self.item_index = {g: i for i, g in enumerate(self.item_ids)}
+        self.sims = sp.csr_matrix(sims, dtype=np.float32)
+        self.weights = weights      # users x games CSR of play_weights(); its pattern is what users own
+
+    @classmethod
+    def fit(cls, user_ids, item_ids, user_rows, item_cols, playtime_forever, shape,
+            top_n=TOP_N, min_count=MIN_COUNT, item_names=None):
+        weights = sp.csr_matrix((play_weights(playtime_forever), (user_rows, item_cols)),
+                                shape=shape, dtype=np.float32)
+        owned = sp.csr_matrix((np.ones_like(weights.data, dtype=np.bool_), weights.indices,
+                               weights.indptr), shape=shape)
+        sims = cooccurrence_topn(owned, top_n, min_count)
+        return cls(user_ids, item_ids, sims, weights=weights, item_names=item_names)
+
+    @classmethod
+    def from_db(cls, cursor, **fit_kwargs):
+        """Build from every row of user_items, addressed by the interned *_idx rows."""
+        users, games = load_interners(cursor)
+        cursor.execute("""
+            SELECT user_idx, item_idx, item_name, COALESCE(playtime_forever, 0)
+            FROM user_items
+            WHERE user_idx IS NOT NULL AND item_idx IS NOT NULL;
+        """)
+        rows = cursor.fetchall()
+        names = list(games.keys)
+        if rows:
+            r, c, item_names, pf = (list(col) for col in zip(*rows))
+        else:
+            r, c, item_names, pf = [], [], [], []
+        for idx, name in zip(c, item_names):
+            names[idx] = name
+        return cls.fit(users.keys, games.keys, r, c, pf, shape=(len(users), len(games)),
+                       item_names=names, **fit_kwargs)
+
+    # ---------- persistence ----------
+    def save(self, model_dir=MODEL_DIR):
+        model_dir = Path(model_dir)
+        model_dir.mkdir(parents=True, exist_ok=True)
+        sp.save_npz(model_dir / 'sims.npz', self.sims, compressed=False)
+        if self.weights is not None:
+            sp.save_npz(model_dir / 'weights.npz', self.weights, compressed=False)
+        with (model_dir / 'ids.json').open('w', encoding='utf-8') as f:
+            json.dump({'user_ids': self.user_ids, 'item_ids': self.item_ids,
+                       'item_names': self.item_names}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, model_dir=MODEL_DIR):
+        model_dir = Path(model_dir)
+        with (model_dir / 'ids.json').open(encoding='utf-8') as f:
+            ids = json.load(f)
+        weights_path = model_dir / 'weights.npz'
+        weights = sp.load_npz(weights_path).tocsr() if weights_path.exists() else None
+        return cls(ids['user_ids'], ids['item_ids'], sp.load_npz(model_dir / 'sims.npz'),
+                   weights=weights, item_names=ids.get('item_names'))
+
+    # ---------- scoring ----------
+    def score_items(self, item_cols, weights=None):
+        """Scores for every game from a library given as game columns (+ optional weights)."""
+        item_cols = np.asarray(item_cols, dtype=np.int64)
+        w = np.ones(item_cols.size, dtype=np.float32) if weights is None else \
+            np.asarray(weights, dtype=np.float32)
+        return np.asarray(self.sims[item_cols].T @ w).ravel()
+
+    def score_user(self, user_id):
+        row = self.weights[self.user_index[user_id]]
+        return self.score_items(row.indices, row.data)
+
+    def _ranked(self, scores, owned_cols, k):
+        scores[owned_cols] = -np.inf
+        top = [i for i in _top_k(scores, k) if np.isfinite(scores[i]) and scores[i] > 0]
+        return [(self.item_ids[i], self.item_names[i], float(scores[i])) for i in top]
+
+    def recommend(self, user_id, k=K_REC):
+        """Top ``k`` (item_id, item_name, score) for ``user_id``, owned games excluded."""
+        row = self.weights[self.user_index[user_id]]
+        return self._ranked(self.score_items(row.indices, row.data), row.indices, k)
+
+    def recommend_items(self, item_cols, weights=None, k=K_REC):
+        """recommend() for a library that is not in the model."""
+        return self._ranked(self.score_items(item_cols, weights), np.asarray(item_cols, dtype=np.int64), k)
+
+    def similar_items(self, item_id, k=K_REC):
+        """The game's stored neighbours, best first: [(item_id, item_name, cosine)]."""
+        row = self.sims[self.item_index[item_id]]
+        order = np.argsort(-row.data)[:k]
+        return [(self.item_ids[i], self.item_names[i], float(s))
+                for i, s in zip(row.indices[order], row.data[order])]
+
+# ------------------ Main ------------------
+def main():
+    conn = psycopg2.connect(**DB_CFG)
+    cursor = conn.cursor()
+    try:
+        model = ItemCooccurrence.from_db(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+    model.save()
+    print(f"✅ Saved top-{TOP_N} neighbours for {len(model.item_ids)} games "
+          f"({model.sims.nnz} pairs) to {MODEL_DIR}")
+
+    model = ItemCooccurrence.load()
+    if USER_ID in model.user_index:
+        print(f"\n=== Top {K_REC} 'players also played' Recommendations for '{USER_ID}' ===")
+        for rnk, (gid, name, score) in enumerate(model.recommend(USER_ID), start=1):
+            print(f"{rnk}. {name} (id={gid}) — score: {score:.4f}")
+
+if __name__ == "__main__":
+    main()
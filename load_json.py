@@ -1,4 +1,11 @@
-import psycopg2, json, pathlib
+import psycopg2, json, pathlib, time
+from game_popularity import create_game_popularity, refresh_game_popularity
+from id_interning import intern_ingested_ids
+from tracing import span, tracer, profile_from_argv, print_profile
+from metrics import Gauge, REGISTRY, INGEST_TEXTFILE
+from ingest_validation import REJECTS_DIR, RejectLog, clean_games, clean_users
+
+profile = profile_from_argv()
 
 conn = psycopg2.connect(
     host="127.0.0.1",
@@ -9,42 +16,81 @@ conn = psycopg2.connect(
 cur = conn.cursor()
 
 
-with pathlib.Path('data/steam_games_clean.json').open(encoding='utf-8') as f:
-    games = json.load(f)
-
-for g in games:
-    cur.execute("""
-        INSERT INTO games(id, app_name, title, url, release_date,
-                          developer, publisher, genres, tags,
-                          price, discount_price, early_access,
-                          metascore, sentiment, specs, reviews_url)
-        VALUES (%(id)s, %(app_name)s, %(title)s, %(url)s,
-                %(release_date)s::date,
-                %(developer)s, %(publisher)s, %(genres)s,
-                %(tags)s, %(price)s, %(discount_price)s,
-                %(early_access)s, %(metascore)s, %(sentiment)s,
-                %(specs)s, %(reviews_url)s)
-        ON CONFLICT (id) DO NOTHING;
-    """, g)
-
-with pathlib.Path('data/australian_users_items_clean.json').open(encoding='utf-8') as f:
-    users = json.load(f)
-
-for u in users:
-    cur.execute("""
-        INSERT INTO users(user_id, steam_id, items_count, user_url)
-        VALUES (%(user_id)s, %(steam_id)s, %(items_count)s, %(user_url)s)
-        ON CONFLICT (user_id) DO NOTHING;
-    """, u)
-    for it in u['items']:
-        cur.execute("""
-            INSERT INTO user_games(user_id, game_id,
-                                   playtime_forever, playtime_2weeks)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT DO NOTHING;
-        """, (u['user_id'], it['item_id'],
-              it['playtime_forever'], it.get('playtime_2weeks', 0)))
+# Duplicates and invalid records are dropped before any INSERT and logged to a sidecar
+with span('ingest'), RejectLog(REJECTS_DIR / 'load_json.jsonl') as rejects:
+    with span('ingest.load_games_json'):
+        with pathlib.Path('data/steam_games_clean.json').open(encoding='utf-8') as f:
+            games = list(clean_games(json.load(f), rejects))
+
+    with span('ingest.insert_games', rows=len(games)):
+        for g in games:
+            cur.execute("""
+                INSERT INTO games(id, app_name, title, url, release_date,
+                                  developer, publisher, genres, tags,
+                                  price, discount_price, early_access,
+                                  metascore, sentiment, specs, reviews_url)
+                VALUES (%(id)s, %(app_name)s, %(title)s, %(url)s,
+                        %(release_date)s::date,
+                        %(developer)s, %(publisher)s, %(genres)s,
+                        %(tags)s, %(price)s, %(discount_price)s,
+                        %(early_access)s, %(metascore)s, %(sentiment)s,
+                        %(specs)s, %(reviews_url)s)
+                ON CONFLICT (id) DO NOTHING;
+            """, g)
+
+    with span('ingest.load_users_json'):
+        with pathlib.Path('data/australian_users_items_clean.json').open(encoding='utf-8') as f:
+            users = list(clean_users(json.load(f), rejects))
+
+    with span('ingest.insert_user_items', users=len(users)):
+        touched_items = set()
+        for u in users:
+            cur.execute("""
+                INSERT INTO users(user_id, steam_id, items_count, user_url)
+                VALUES (%(user_id)s, %(steam_id)s, %(items_count)s, %(user_url)s)
+                ON CONFLICT (user_id) DO NOTHING;
+            """, u)
+            for it in u['items']:
+                cur.execute("""
+                    INSERT INTO user_games(user_id, game_id,
+                                           playtime_forever, playtime_2weeks)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT DO NOTHING;
+                """, (u['user_id'], it['item_id'],
+                      it['playtime_forever'], it['playtime_2weeks']))
+                touched_items.add(it['item_id'])
+
+    # Keep the popularity aggregate in step with the rows just loaded
+    with span('ingest.refresh_popularity', items=len(touched_items)):
+        create_game_popularity(cur)
+        refresh_game_popularity(cur, touched_items)
+
+    # Dense integer ids for the new users/games
+    with span('ingest.intern_ids'):
+        intern_ingested_ids(cur)
 
 conn.commit()
 cur.close()
-conn.close()
\ No newline at end of file
+conn.close()
+print(rejects.summary())
+
+# Throughput gauges for the node_exporter textfile collector / the service's /metrics
+INGEST_ROWS = Gauge('ingest_rows', "Rows read by the last ingest run", ['stage'])
+INGEST_RATE = Gauge('ingest_rows_per_second', "Insert throughput of the last ingest run", ['stage'])
+INGEST_SECONDS = Gauge('ingest_stage_seconds', "Wall time per stage of the last ingest run", ['stage'])
+INGEST_DONE = Gauge('ingest_last_success_timestamp_seconds', "Unix time the last ingest run committed")
+
+rows = {'ingest.insert_games': len(games),
+        'ingest.insert_user_items': sum(len(u['items']) for u in users)}
+for name, hist in tracer.histograms.items():
+    stage = name.split('.', 1)[-1]
+    seconds = hist.total / 1000.0
+    INGEST_SECONDS.labels(stage).set(seconds)
+    if name in rows:
+        INGEST_ROWS.labels(stage).set(rows[name])
+        INGEST_RATE.labels(stage).set(rows[name] / seconds if seconds else 0.0)
+INGEST_DONE.set(time.time())
+REGISTRY.write_textfile(INGEST_TEXTFILE)
+
+if profile:
+    print_profile()
@@ -0,0 +1,169 @@
+import argparse
+import os
+import re
+import resource
+import sys
+import tracemalloc
+from contextlib import contextmanager
+
+# ------------------ Configuration ------------------
+BUDGET_ENV = 'MEMORY_BUDGET'   # e.g. "2GB"; unset = no budget
+SAFETY = 0.5                   # share of the remaining headroom one chunk may use
+TOP_ALLOCATORS = 5
+_UNITS = {'': 1, 'B': 1, 'K': 1 << 10, 'KB': 1 << 10, 'M': 1 << 20, 'MB': 1 << 20,
+          'G': 1 << 30, 'GB': 1 << 30}
+
+# ------------------ RSS ------------------
+def parse_size(text):
+    """'512MB' / '2g' / '1048576' -> bytes."""
+    m = re.fullmatch(r'\s*([\d.]+)\s*([a-zA-Z]*)\s*', str(text))
+    if not m or m.group(2).upper() not in _UNITS:
+        raise ValueError(f"not a memory size: {text!r}")
+    return int(float(m.group(1)) * _UNITS[m.group(2).upper()])
+
+def format_size(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(n) < 1024 or unit == 'GB':
+            return f"{n:.0f} {unit}" if unit == 'B' else f"{n:.1f} {unit}"
+        n /= 1024
+
+def peak_rss():
+    """Peak resident set size of this process in bytes."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def current_rss():
+    """Current resident set size in bytes (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+# ------------------ Budget ------------------
+class MemoryBudget:
+    """
+    Picks chunk sizes so a job's RSS stays under ``limit`` bytes.
+
+    Each chunk may use ``safety`` of the headroom left between the current
+    RSS and the limit, so when memory is already tight the job falls back
+    to more, smaller chunks (never fewer than ``minimum`` items) instead
+    of allocating past the limit. With no limit, chunks are ``maximum``
+    items (everything at once when that is None too).
+    """
+
+    def __init__(self, limit=None, safety=SAFETY):
+        self.limit = limit
+        self.safety = safety
+
+    @classmethod
+    def from_env(cls):
+        value = os.environ.get(BUDGET_ENV)
+        return cls(parse_size(value) if value else None)
+
+    def headroom(self):
+        if self.limit is None:
+            return None
+        return max(0, self.limit - current_rss())
+
+    def chunk_size(self, bytes_per_item, total, minimum=1, maximum=None):
+        """How many items of ``bytes_per_item`` fit in the current headroom (capped at ``maximum``)."""
+        cap = total if maximum is None else min(total, maximum)
+        headroom = self.headroom()
+        if headroom is None:
+            return max(minimum, cap)
+        fit = int(headroom * self.safety // max(1, bytes_per_item))
+        return max(minimum, min(cap, fit))
+
+    def chunks(self, total, bytes_per_item, minimum=1, maximum=None):
+        """
+        Yield (start, stop) ranges over ``total`` items. The size is
+        recomputed before every chunk, so growth elsewhere in the process
+        shrinks the remaining chunks.
+        """
+        start = 0
+        while start < total:
+            size = self.chunk_size(bytes_per_item, total - start, minimum, maximum)
+            stop = min(total, start + size)
+            yield start, stop
+            start = stop
+
+    def __repr__(self):
+        return f"MemoryBudget({format_size(self.limit) if self.limit else 'unlimited'})"
+
+# ------------------ Profiling ------------------
+class MemoryProfiler:
+    """
+    Per-stage memory accounting: RSS before/after, the process peak, the
+    tracemalloc peak inside the stage and its top allocating lines.
+    tracemalloc slows allocation-heavy code noticeably, so it only runs
+    when the profiler is enabled.
+    """
+
+    def __init__(self, enabled=False, top=TOP_ALLOCATORS):
+        self.enabled = enabled
+        self.top = top
+        self.stages = []
+
+    def enable(self):
+        self.enabled = True
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        rss_before = current_rss()
+        tracemalloc.reset_peak()
+        before = tracemalloc.take_snapshot()
+        try:
+            yield
+        finally:
+            _, traced_peak = tracemalloc.get_traced_memory()
+            after = tracemalloc.take_snapshot()
+            growth = [s for s in after.compare_to(before, 'lineno') if s.size_diff > 0]
+            self.stages.append({
+                'stage': name,
+                'rss_before': rss_before,
+                'rss_after': current_rss(),
+                'peak_rss': peak_rss(),
+                'traced_peak': traced_peak,
+                'top': [(str(s.traceback[0]), s.size_diff) for s in growth[:self.top]],
+            })
+
+    def report(self):
+        lines = [f"{'stage':<30}{'rss before':>12}{'rss after':>12}{'peak rss':>12}{'traced peak':>13}"]
+        for s in self.stages:
+            lines.append(f"{s['stage']:<30}{format_size(s['rss_before']):>12}{format_size(s['rss_after']):>12}"
+                         f"{format_size(s['peak_rss']):>12}{format_size(s['traced_peak']):>13}")
+            for where, size in s['top']:
+                lines.append(f"    +{format_size(size):>10}  {where}")
+        return "\n".join(lines)
+
+profiler = MemoryProfiler()
+stage = profiler.stage
+
+# ------------------ CLI helpers ------------------
+def add_memory_args(parser):
+    parser.add_argument('--memory-profile', action='store_true',
+                        help="report RSS and top tracemalloc allocators per stage")
+    parser.add_argument('--memory-budget', help=f"e.g. 2GB; defaults to ${BUDGET_ENV}")
+    return parser
+
+def memory_from_argv(argv=None):
+    """
+    For scripts without their own argument parser: read --memory-profile /
+    --memory-budget, start profiling if asked, and return the budget.
+    """
+    parser = add_memory_args(argparse.ArgumentParser(add_help=False))
+    args, _ = parser.parse_known_args(argv)
+    if args.memory_profile:
+        profiler.enable()
+    return MemoryBudget(parse_size(args.memory_budget)) if args.memory_budget else MemoryBudget.from_env()
+
+def print_memory_report():
+    if profiler.enabled:
+        print("\n=== Memory ===")
+        print(profiler.report())
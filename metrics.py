@@ -0,0 +1,271 @@
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# ------------------ Configuration ------------------
+# Latency buckets in seconds, Prometheus-style upper bounds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+# Batch jobs write here; the service appends it to /metrics (node_exporter textfile format)
+INGEST_TEXTFILE = Path(os.environ.get('INGEST_METRICS_FILE', 'metrics/ingest.prom'))
+
+# ------------------ Per-thread shards ------------------
+class _Shards:
+    """
+    One mutable shard per writing thread.
+
+    Writers only ever touch their own shard, so the hot path takes no lock;
+    the lock is held when a thread registers its first shard and when a
+    scrape snapshots the list.
+    """
+
+    def __init__(self, make):
+        self._make = make
+        self._tls = threading.local()
+        self._all = []
+        self._lock = threading.Lock()
+
+    def local(self):
+        try:
+            return self._tls.shard
+        except AttributeError:
+            shard = self._tls.shard = self._make()
+            with self._lock:
+                self._all.append(shard)
+            return shard
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._all)
+
+# ------------------ Metric types ------------------
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(lambda: [0.0])
+
+    def inc(self, amount=1.0):
+        self._shards.local()[0] += amount
+
+    def value(self):
+        return sum(s[0] for s in self._shards.snapshot())
+
+class _GaugeChild:
+    # Gauges are set rarely (start-up, end of a job), so a plain attribute is enough
+    def __init__(self):
+        self._value = 0.0
+
+    def set(self, value):
+        self._value = float(value)
+
+    def inc(self, amount=1.0):
+        self._value += amount
+
+    def value(self):
+        return self._value
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        # per shard: one count per bucket (+Inf last), then the running sum
+        self._shards = _Shards(lambda: [0] * (len(buckets) + 1) + [0.0])
+
+    def observe(self, value):
+        shard = self._shards.local()
+        shard[bisect.bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def value(self):
+        """(cumulative bucket counts incl. +Inf, sum)"""
+        n = len(self.buckets) + 1
+        counts = [0] * n
+        total = 0.0
+        for shard in self._shards.snapshot():
+            for i in range(n):
+                counts[i] += shard[i]
+            total += shard[-1]
+        cumulative, running = [], 0
+        for c in counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, total
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values, **kw):
+        """Child for one label combination; bind it once and reuse it on hot paths."""
+        if kw:
+            values = tuple(kw[n] for n in self.labelnames)
+        values = tuple(str(v) for v in values)
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _default(self):
+        return self.labels()
+
+    def _label_str(self, values, extra=()):
+        pairs = list(zip(self.labelnames, values)) + list(extra)
+        if not pairs:
+            return ""
+        body = ",".join(f'{k}="{_escape(v)}"' for k, v in pairs)
+        return "{" + body + "}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{self._label_str(values)} {_fmt(child.value())}"]
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1.0):
+        self._default().inc(amount)
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._default().set(value)
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._default().observe(value)
+
+    def time(self):
+        return self._default().time()
+
+    def _render_child(self, values, child):
+        cumulative, total = child.value()
+        lines = []
+        for bound, c in zip(self.buckets + (math.inf,), cumulative):
+            le = self._label_str(values, [('le', _fmt(bound))])
+            lines.append(f"{self.name}_bucket{le} {c}")
+        labels = self._label_str(values)
+        lines.append(f"{self.name}_sum{labels} {_fmt(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative[-1]}")
+        return lines
+
+class CallbackMetric(_Metric):
+    """
+    Value read at scrape time from ``fn()``, for state another object
+    already tracks (cache stats, pool size). ``fn`` returns a number, or a
+    dict mapping label-value tuples to numbers.
+    """
+
+    def __init__(self, name, help, fn, kind='gauge', labelnames=(), registry=None):
+        self.fn = fn
+        self.kind = kind
+        super().__init__(name, help, labelnames, registry)
+
+    def render(self):
+        try:
+            result = self.fn()
+        except Exception:
+            return []      # a failing source should not break the whole scrape
+        if result is None:
+            return []
+        if not isinstance(result, dict):
+            result = {(): result}
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, v in sorted(result.items()):
+            lines.append(f"{self.name}{self._label_str(values)} {_fmt(v)}")
+        return lines
+
+# ------------------ Registry ------------------
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"metric {metric.name!r} already registered")
+            self._metrics.append(metric)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path=INGEST_TEXTFILE):
+        """Atomically write the current values for node_exporter's textfile collector."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_text(self.render(), encoding='utf-8')
+        os.replace(tmp, path)
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ------------------ Helpers ------------------
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+def _fmt(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def read_textfile(path=INGEST_TEXTFILE):
+    """Contents of a textfile written by a batch job, or '' if it has not run yet."""
+    try:
+        return Path(path).read_text(encoding='utf-8')
+    except FileNotFoundError:
+        return ""
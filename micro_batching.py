@@ -0,0 +1,87 @@
+import asyncio
+
+# ------------------ Configuration ------------------
+MAX_BATCH = 64       # users scored per matmul
+MAX_WAIT_MS = 5.0    # how long the first request of a batch may wait for company
+
+# ------------------ Batcher ------------------
+class MicroBatcher:
+    """
+    Coalesces concurrent single-key requests into batched calls.
+
+    ``score_batch(keys)`` must return one result per key, in order. It runs
+    in ``executor`` (the loop's default executor when None) so the event
+    loop keeps accepting requests while a batch is being scored.
+
+    A batch is flushed when it reaches ``max_batch`` keys or when
+    ``max_wait_ms`` has passed since its first key arrived. Concurrent
+    requests for a key that is already queued or being scored share that
+    key's future instead of being scored again.
+    """
+
+    def __init__(self, score_batch, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, executor=None):
+        self.score_batch = score_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.executor = executor
+        self._pending = []      # keys waiting for the next flush
+        self._inflight = {}     # key -> future, for queued and running keys
+        self._timer = None
+        self.batches = 0
+        self.items = 0
+        self.deduplicated = 0
+
+    async def submit(self, key):
+        """Result of ``score_batch`` for ``key``."""
+        fut = self._inflight.get(key)
+        if fut is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(fut)
+
+        loop = asyncio.get_running_loop()
+        fut = self._inflight[key] = loop.create_future()
+        self._pending.append(key)
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await asyncio.shield(fut)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        keys, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+        if self._pending:
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        asyncio.ensure_future(self._run(keys))
+
+    async def _run(self, keys):
+        loop = asyncio.get_running_loop()
+        self.batches += 1
+        self.items += len(keys)
+        try:
+            results = await loop.run_in_executor(self.executor, self.score_batch, keys)
+        except Exception as e:
+            for key in keys:
+                fut = self._inflight.pop(key, None)
+                if fut is not None and not fut.done():
+                    fut.set_exception(e)
+            return
+        for key, result in zip(keys, results):
+            fut = self._inflight.pop(key, None)
+            if fut is not None and not fut.done():
+                fut.set_result(result)
+
+    def stats(self):
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'deduplicated': self.deduplicated,
+            'mean_batch_size': self.items / self.batches if self.batches else 0.0,
+            'queued': len(self._pending),
+        }
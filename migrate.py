@@ -0,0 +1,57 @@
+import sys
+from pathlib import Path
+
+import psycopg2
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent / 'migrations'
+
+# ------------------ Helpers ------------------
+def pending_migrations(cursor, migrations_dir=MIGRATIONS_DIR):
+    """Migration files (sorted by their numeric prefix) not yet recorded as applied."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    cursor.execute("SELECT version FROM schema_migrations;")
+    applied = {row[0] for row in cursor.fetchall()}
+    return [p for p in sorted(Path(migrations_dir).glob('*.sql')) if p.stem not in applied]
+
+def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR):
+    """Apply each pending migration in its own transaction; stop at the first failure."""
+    with conn.cursor() as cur:
+        todo = pending_migrations(cur, migrations_dir)
+    conn.commit()
+
+    for path in todo:
+        print(f"⏳ Applying {path.name}")
+        try:
+            with conn.cursor() as cur:
+                cur.execute(path.read_text(encoding='utf-8'))
+                cur.execute("INSERT INTO schema_migrations (version) VALUES (%s);", (path.stem,))
+            conn.commit()
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"❌ {path.name} failed: {e}")
+            return False
+    print(f"✅ {len(todo)} migration(s) applied")
+    return True
+
+# ------------------ Main ------------------
+if __name__ == "__main__":
+    conn = psycopg2.connect(**DB_CFG)
+    try:
+        ok = apply_migrations(conn)
+    finally:
+        conn.close()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,15 @@
+-- Align the game id types so ui.item_id = g.id can use either side's index
+-- (games.id was VARCHAR(50), user_items.item_id TEXT), and make the playtime
+-- columns NOT NULL so ORDER BY playtime_forever + playtime_2weeks matches the
+-- expression indexes in 002 without COALESCE.
+
+ALTER TABLE games ALTER COLUMN id TYPE TEXT;
+
+UPDATE user_items SET playtime_forever = 0 WHERE playtime_forever IS NULL;
+UPDATE user_items SET playtime_2weeks = 0 WHERE playtime_2weeks IS NULL;
+
+ALTER TABLE user_items
+    ALTER COLUMN playtime_forever SET DEFAULT 0,
+    ALTER COLUMN playtime_forever SET NOT NULL,
+    ALTER COLUMN playtime_2weeks SET DEFAULT 0,
+    ALTER COLUMN playtime_2weeks SET NOT NULL;
@@ -0,0 +1,20 @@
+-- Covering indexes for the per-user and per-item queries in the recommenders.
+
+-- "Top N games of a user by total playtime"
+-- (cosine_similarity_1/3/4, Recommendation_3, similar_vs_user_rank, batch_matching)
+CREATE INDEX IF NOT EXISTS idx_user_items_user_total
+    ON user_items (user_id, (playtime_forever + playtime_2weeks) DESC)
+    INCLUDE (item_id, item_name);
+
+-- "Top N games of a user by playtime_forever, then playtime_2weeks"
+-- (Recommendation_1/2/4, hole_user_plays_game, S.R.C.similar)
+CREATE INDEX IF NOT EXISTS idx_user_items_user_forever
+    ON user_items (user_id, playtime_forever DESC, playtime_2weeks DESC)
+    INCLUDE (item_id, item_name);
+
+-- Per-item aggregates (game_popularity refresh, player counts)
+CREATE INDEX IF NOT EXISTS idx_user_items_item
+    ON user_items (item_id)
+    INCLUDE (user_id, playtime_forever, playtime_2weeks);
+
+ANALYZE user_items;
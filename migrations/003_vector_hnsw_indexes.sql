@@ -0,0 +1,50 @@
+-- HNSW indexes for the <=> nearest-neighbour queries (needs pgvector >= 0.7).
+--
+-- pgvector caps HNSW at 2,000 dimensions for vector and 4,000 for halfvec,
+-- while playtime_vector has one dimension per game (~10k) and
+-- tfidf_vec_vector has 5,000. Both are mostly zeros, so they are mirrored into
+-- sparsevec columns, which HNSW indexes at any dimension as long as a row
+-- has at most 1,000 non-zero entries. playtime_nnz records that count per
+-- user; the index is partial on it and neighbour queries filter on the same
+-- predicate so the planner can use it.
+--
+-- Only rows present when this runs are mirrored. On a fresh database the
+-- columns and indexes come from ratio_vectors.py and 005_tfidf_sparse_sync.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE user_play_ratio ADD COLUMN IF NOT EXISTS playtime_nnz INTEGER;
+
+UPDATE user_play_ratio upr SET playtime_nnz = (
+    SELECT COUNT(*) FROM user_items ui
+    WHERE ui.user_id = upr.user_id AND ui.playtime_forever > 0
+);
+
+-- Column dimensions come from the data, so the DDL is built dynamically
+DO $$
+DECLARE
+    dims INTEGER;
+BEGIN
+    SELECT vector_dims(playtime_vector) INTO dims
+    FROM user_play_ratio WHERE playtime_vector IS NOT NULL LIMIT 1;
+    IF dims IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE user_play_ratio ADD COLUMN IF NOT EXISTS playtime_sparse sparsevec(%s)', dims);
+        EXECUTE 'UPDATE user_play_ratio SET playtime_sparse = playtime_vector::sparsevec';
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_user_play_ratio_hnsw
+                 ON user_play_ratio USING hnsw (playtime_sparse sparsevec_cosine_ops)
+                 WHERE playtime_nnz <= 1000';
+    END IF;
+
+    SELECT vector_dims(tfidf_vec_vector) INTO dims
+    FROM games WHERE tfidf_vec_vector IS NOT NULL LIMIT 1;
+    IF dims IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE games ADD COLUMN IF NOT EXISTS tfidf_sparse sparsevec(%s)', dims);
+        EXECUTE 'UPDATE games SET tfidf_sparse = tfidf_vec_vector::sparsevec
+                 WHERE tfidf_vec_vector IS NOT NULL';
+        EXECUTE 'CREATE INDEX IF NOT EXISTS idx_games_tfidf_hnsw
+                 ON games USING hnsw (tfidf_sparse sparsevec_cosine_ops)';
+    END IF;
+END $$;
+
+ANALYZE user_play_ratio;
+ANALYZE games;
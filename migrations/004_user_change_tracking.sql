@@ -0,0 +1,37 @@
+-- Change tracking for delta ingest (delta_ingest.py).
+--
+-- user_library_hash keeps one md5 per user over its sorted
+-- (item_id, playtime_forever, playtime_2weeks) rows, so a new snapshot can be
+-- diffed without reading user_items. user_changes is an append-only log of
+-- users whose library was added, updated or removed; downstream jobs read it
+-- past their own watermark in job_watermarks.
+
+CREATE TABLE IF NOT EXISTS user_library_hash (
+    user_id      TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    items_count  INTEGER NOT NULL,
+    updated_at   TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS user_changes (
+    change_id  BIGSERIAL PRIMARY KEY,
+    user_id    TEXT NOT NULL,
+    change     TEXT NOT NULL CHECK (change IN ('added', 'updated', 'removed')),
+    changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    job            TEXT PRIMARY KEY,
+    last_change_id BIGINT NOT NULL DEFAULT 0,
+    updated_at     TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Seed the hashes from what is already loaded (same expression as delta_ingest.LIBRARY_HASH_SQL)
+INSERT INTO user_library_hash (user_id, content_hash, items_count)
+SELECT user_id,
+       md5(string_agg(item_id || ':' || playtime_forever || ':' || playtime_2weeks, ','
+                      ORDER BY item_id COLLATE "C")),
+       COUNT(*)
+FROM user_items
+GROUP BY user_id
+ON CONFLICT (user_id) DO NOTHING;
@@ -0,0 +1,36 @@
+-- Keep games.tfidf_sparse in step with tfidf_vec_vector.
+--
+-- 003 only mirrored the rows present when it ran, and created nothing on a
+-- database with no TF-IDF vectors yet. The columns are declared here from
+-- the vectorizer's fixed width (TfidfVectorizer(max_features=5000) in
+-- tf-idf_vector_embedding.py) rather than from the data, and a trigger
+-- derives tfidf_sparse on every insert or update of tfidf_vec_vector, so the
+-- HNSW index never serves stale vectors.
+--
+-- user_play_ratio.playtime_sparse and its indexes are created by their
+-- writer (ratio_vectors.ensure_capacity), whose capacity follows game_index.
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+ALTER TABLE games ADD COLUMN IF NOT EXISTS tfidf_vec_vector vector(5000);
+ALTER TABLE games ADD COLUMN IF NOT EXISTS tfidf_sparse sparsevec(5000);
+
+CREATE OR REPLACE FUNCTION games_sync_tfidf_sparse() RETURNS trigger AS $$
+BEGIN
+    NEW.tfidf_sparse := NEW.tfidf_vec_vector::sparsevec;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_games_tfidf_sparse ON games;
+CREATE TRIGGER trg_games_tfidf_sparse
+    BEFORE INSERT OR UPDATE OF tfidf_vec_vector ON games
+    FOR EACH ROW EXECUTE FUNCTION games_sync_tfidf_sparse();
+
+-- Re-sync rows written since 003 ran
+UPDATE games SET tfidf_sparse = tfidf_vec_vector::sparsevec;
+
+CREATE INDEX IF NOT EXISTS idx_games_tfidf_hnsw
+    ON games USING hnsw (tfidf_sparse sparsevec_cosine_ops);
+
+ANALYZE games;
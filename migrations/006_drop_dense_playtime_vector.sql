@@ -0,0 +1,9 @@
+-- Retire the dense user_play_ratio.playtime_vector column.
+--
+-- ratio_vectors.py keeps only playtime_sparse, whose dimension follows
+-- game_index with headroom (~40k for ~32k games). A dense vector column is
+-- capped at 16,000 dimensions by pgvector, so it can no longer be kept in the
+-- same layout; the values left in it are in the old per-run game order and
+-- no query reads them (003 has already used it to seed playtime_sparse).
+
+ALTER TABLE IF EXISTS user_play_ratio DROP COLUMN IF EXISTS playtime_vector;
@@ -0,0 +1,12 @@
+-- Seed user_library_hash for users whose library is empty.
+--
+-- 004 seeded hashes from user_items only, so a user listed in users with no
+-- owned games had no stored hash and the first delta run logged every such
+-- user as 'added'. Their snapshot hash is that of the empty set, md5(''),
+-- which is what delta_ingest.library_hash([]) returns.
+
+INSERT INTO user_library_hash (user_id, content_hash, items_count)
+SELECT u.user_id, md5(''), 0
+FROM users u
+WHERE NOT EXISTS (SELECT 1 FROM user_items ui WHERE ui.user_id = u.user_id)
+ON CONFLICT (user_id) DO NOTHING;
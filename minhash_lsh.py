@@ -0,0 +1,225 @@
+import argparse
+import json
+import time
+from pathlib import Path
+
+import psycopg2
+import numpy as np
+import scipy.sparse as sp
+
+from id_interning import load_interners
+from user_similarity import DB_CFG, K_NEIGHBOR, USER_ID, _top_k
+
+# ------------------ Configuration ------------------
+LSH_DIR = Path('models/minhash_lsh')
+N_PERM = 126          # hash functions per signature; must be a multiple of BANDS
+BANDS = 42            # 3 rows each; pairs above Jaccard ~(1/BANDS)^(1/ROWS) ≈ 0.29 usually collide
+SEED = 0
+BLOCK_NNZ = 1_000_000 # owned games hashed per block while building signatures
+MAX_BUCKET = 5000     # buckets larger than this (e.g. owners of one hit game) are skipped at query time
+
+PRIME = (1 << 31) - 1
+EMPTY = np.iinfo(np.uint32).max
+
+# ------------------ Signatures ------------------
+def hash_params(n_perm=N_PERM, seed=SEED):
+    """(a, b) of the universal hashes h(x) = (a * x + b) mod PRIME."""
+    rng = np.random.default_rng(seed)
+    return (rng.integers(1, PRIME, n_perm, dtype=np.uint64),
+            rng.integers(0, PRIME, n_perm, dtype=np.uint64))
+
+def minhash_signatures(owned, n_perm=N_PERM, seed=SEED, block_nnz=BLOCK_NNZ):
+    """
+    uint32 (users x n_perm) MinHash signatures of the games each row owns.
+
+    A game's hashes do not depend on the user, so the n_perm x games hash
+    table is computed once and each signature slot is a segmented minimum
+    (1-D reduceat per hash function, much faster than along axis 0) over
+    the table entries of the user's games. Rows are processed in blocks of
+    about ``block_nnz`` owned games. Users without games get EMPTY.
+    """
+    owned = sp.csr_matrix(owned)
+    a, b = hash_params(n_perm, seed)
+    items = np.arange(owned.shape[1], dtype=np.uint64)
+    table = ((a[:, None] * items[None, :] + b[:, None]) % PRIME).astype(np.uint32)
+
+    sig = np.full((owned.shape[0], n_perm), EMPTY, dtype=np.uint32)
+    indptr, indices = owned.indptr, owned.indices
+    start = 0
+    while start < owned.shape[0]:
+        stop = int(np.searchsorted(indptr, indptr[start] + block_nnz, side='right')) - 1
+        stop = min(max(stop, start + 1), owned.shape[0])
+        lo, hi = indptr[start], indptr[stop]
+        rows = np.flatnonzero(np.diff(indptr[start:stop + 1])) + start
+        if rows.size:
+            cols, offsets = indices[lo:hi], indptr[rows] - lo
+            for p in range(n_perm):
+                sig[rows, p] = np.minimum.reduceat(table[p][cols], offsets)
+        start = stop
+    return sig
+
+def check_bands(n_perm, bands):
+    """Bands must split the signature into equal, non-empty rows."""
+    if bands < 1 or bands > n_perm or n_perm % bands:
+        raise ValueError(f"bands={bands} must divide n_perm={n_perm} into whole rows")
+
+def band_keys(sig, bands=BANDS):
+    """uint64 bucket key of every (user, band): the band's rows mixed into one word."""
+    n, n_perm = sig.shape
+    check_bands(n_perm, bands)
+    rows = n_perm // bands
+    parts = sig.reshape(n, bands, rows).astype(np.uint64)
+    keys = np.zeros((n, bands), dtype=np.uint64)
+    for r in range(rows):
+        keys = (keys * np.uint64(0x100000001B3)) ^ parts[:, :, r]
+    return keys
+
+# ------------------ Index ------------------
+class MinHashLSH:
+    """
+    Banded LSH over MinHash signatures for approximate Jaccard neighbours
+    of users' owned-game sets.
+
+    Per band the bucket keys of all indexed users are stored sorted, with
+    the user row of each key alongside, so a bucket is a searchsorted
+    range. A query unions its buckets (skipping ones above MAX_BUCKET),
+    estimates Jaccard as the share of equal signature slots and keeps the
+    top K.
+    """
+
+    def __init__(self, user_ids, signatures, sorted_keys, members, bands=BANDS):
+        self.user_ids = list(user_ids)
+        self.user_index = {u: i for i, u in enumerate(self.user_ids)}
+        self.signatures = signatures
+        self.sorted_keys = sorted_keys    # bands x indexed users, ascending per band
+        self.members = members            # user row of each sorted key
+        self.bands = bands
+
+    @classmethod
+    def build(cls, user_ids, owned, n_perm=N_PERM, bands=BANDS, seed=SEED):
+        check_bands(n_perm, bands)
+        sig = minhash_signatures(owned, n_perm, seed)
+        indexed = np.flatnonzero(np.diff(sp.csr_matrix(owned).indptr)).astype(np.int32)
+        keys = band_keys(sig[indexed], bands).T
+        order = np.argsort(keys, axis=1, kind='stable')
+        sorted_keys = np.take_along_axis(keys, order, axis=1)
+        return cls(user_ids, sig, sorted_keys, indexed[order], bands)
+
+    @classmethod
+    def from_db(cls, cursor, **kwargs):
+        """Owned-game sets from user_items, addressed by the interned *_idx columns."""
+        users, games = load_interners(cursor)
+        cursor.execute("""
+            SELECT user_idx, item_idx FROM user_items
+            WHERE user_idx IS NOT NULL AND item_idx IS NOT NULL;
+        """)
+        rows = np.asarray(cursor.fetchall(), dtype=np.int64).reshape(-1, 2)
+        owned = sp.csr_matrix((np.ones(len(rows), dtype=np.bool_), (rows[:, 0], rows[:, 1])),
+                              shape=(len(users), len(games)))
+        return cls.build(users.keys, owned, **kwargs)
+
+    def save(self, out_dir=LSH_DIR):
+        out_dir = Path(out_dir)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        np.save(out_dir / 'signatures.npy', self.signatures)
+        np.save(out_dir / 'sorted_keys.npy', self.sorted_keys)
+        np.save(out_dir / 'members.npy', self.members)
+        np.save(out_dir / 'user_ids.npy', np.asarray([str(u) for u in self.user_ids]))
+        (out_dir / 'meta.json').write_text(json.dumps({
+            'n_users': len(self.user_ids), 'n_perm': int(self.signatures.shape[1]),
+            'bands': self.bands, 'indexed_users': int(self.members.shape[1]),
+        }, indent=1), encoding='utf-8')
+        return out_dir
+
+    @classmethod
+    def load(cls, index_dir=LSH_DIR):
+        """Memory-mapped index written by save()."""
+        index_dir = Path(index_dir)
+        meta = json.loads((index_dir / 'meta.json').read_text(encoding='utf-8'))
+        arrays = {name: np.load(index_dir / f"{name}.npy", mmap_mode='r')
+                  for name in ('signatures', 'sorted_keys', 'members')}
+        user_ids = [str(u) for u in np.load(index_dir / 'user_ids.npy')]
+        return cls(user_ids, arrays['signatures'], arrays['sorted_keys'], arrays['members'],
+                   meta['bands'])
+
+    def _search(self, sig, k, exclude=None, max_bucket=MAX_BUCKET):
+        keys = band_keys(sig[None, :], self.bands)[0]
+        found = []
+        for band, key in enumerate(keys):
+            row = self.sorted_keys[band]
+            lo, hi = np.searchsorted(row, key, 'left'), np.searchsorted(row, key, 'right')
+            if 0 < hi - lo <= max_bucket:
+                found.append(self.members[band, lo:hi])
+        if not found:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        cand = np.unique(np.concatenate(found))
+        if exclude is not None:
+            cand = cand[cand != exclude]
+        est = (np.asarray(self.signatures[cand]) == sig).mean(axis=1, dtype=np.float32)
+        top = _top_k(est, k)
+        return cand[top].astype(np.int64), est[top]
+
+    def neighbours_of(self, u, k=K_NEIGHBOR):
+        """(user rows, estimated Jaccard) of up to k users with the most similar libraries."""
+        sig = np.asarray(self.signatures[u])
+        if sig[0] == EMPTY:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        return self._search(sig, k, exclude=u)
+
+    def neighbours(self, user_id, k=K_NEIGHBOR):
+        """[(user_id, estimated Jaccard)] for ``user_id``."""
+        idx, est = self.neighbours_of(self.user_index[user_id], k)
+        return [(self.user_ids[i], float(s)) for i, s in zip(idx, est)]
+
+    def query(self, item_cols, k=K_NEIGHBOR, seed=SEED):
+        """Neighbours of a library that is not indexed, given its game columns."""
+        if len(item_cols) == 0:
+            return []
+        owned = sp.csr_matrix((np.ones(len(item_cols), dtype=np.bool_),
+                               (np.zeros(len(item_cols), dtype=np.int64), item_cols)),
+                              shape=(1, max(item_cols) + 1))
+        sig = minhash_signatures(owned, self.signatures.shape[1], seed)[0]
+        idx, est = self._search(sig, k)
+        return [(self.user_ids[i], float(s)) for i, s in zip(idx, est)]
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description="MinHash/LSH index of users' owned-game sets")
+    parser.add_argument('--build', action='store_true', help="(re)build the index from user_items")
+    parser.add_argument('--dir', type=Path, default=LSH_DIR)
+    parser.add_argument('--bands', type=int, default=BANDS,
+                        help="more bands (fewer rows each) find lower-overlap neighbours, slower")
+    parser.add_argument('--user', default=USER_ID)
+    parser.add_argument('--k', type=int, default=K_NEIGHBOR)
+    args = parser.parse_args()
+
+    if args.build:
+        try:
+            check_bands(N_PERM, args.bands)
+        except ValueError as e:
+            parser.error(str(e))
+        conn = psycopg2.connect(**DB_CFG)
+        cursor = conn.cursor()
+        t0 = time.perf_counter()
+        try:
+            lsh = MinHashLSH.from_db(cursor, bands=args.bands)
+        finally:
+            cursor.close()
+            conn.close()
+        lsh.save(args.dir)
+        print(f"✅ Indexed {lsh.members.shape[1]} users ({lsh.bands} bands) -> {args.dir} "
+              f"in {time.perf_counter() - t0:.1f}s")
+
+    lsh = MinHashLSH.load(args.dir)
+    if args.user not in lsh.user_index:
+        raise RuntimeError("User not found in the index.")
+    t0 = time.perf_counter()
+    result = lsh.neighbours(args.user, args.k)
+    ms = (time.perf_counter() - t0) * 1000
+    print(f"=== Top {args.k} users with libraries like '{args.user}' ===")
+    for rnk, (user_id, jac) in enumerate(result, start=1):
+        print(f"{rnk}. {user_id} — Jaccard ≈ {jac:.3f}")
+    print(f"({ms:.2f} ms)")
+
+if __name__ == "__main__":
+    main()
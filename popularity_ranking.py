@@ -0,0 +1,116 @@
+import time
+import threading
+import numpy as np
+
+RANKING_TTL_SECONDS = 300
+
+# ------------------ Ranking ------------------
+class PopularityRanking:
+    """
+    Presorted popularity orderings held in memory.
+
+    Each ordering is a plain list of item_ids sorted once at load time, so a
+    "top N the user doesn't own" lookup is a walk from the head of the list
+    that skips owned ids with a set membership test. The walk stops after N
+    hits, so its cost depends on how many of the most popular games the user
+    owns, not on library size or catalogue size.
+    """
+
+    def __init__(self, item_ids, item_names, player_count, total_playtime, total_2weeks):
+        self.item_ids = list(item_ids)
+        self.names = dict(zip(self.item_ids, item_names))
+        player_count = np.asarray(player_count, dtype=np.int64)
+        total_playtime = np.asarray(total_playtime, dtype=np.int64)
+        total_2weeks = np.asarray(total_2weeks, dtype=np.int64)
+        self.stats = dict(zip(self.item_ids, zip(player_count.tolist(),
+                                                 total_playtime.tolist(),
+                                                 total_2weeks.tolist())))
+
+        # np.lexsort sorts by the last key first; negate for descending order
+        keys = {
+            'player_count': (-total_playtime, -player_count),
+            'total_playtime': (-total_2weeks, -total_playtime),
+            'total_2weeks': (-total_playtime, -total_2weeks),
+            'total_combined': (-player_count, -(total_playtime + total_2weeks)),
+        }
+        self._orders = {
+            by: [self.item_ids[i] for i in np.lexsort(k)]
+            for by, k in keys.items()
+        }
+
+    @classmethod
+    def from_db(cls, cursor, require_game=True):
+        """Load from game_popularity; by default only games present in `games`."""
+        join = "JOIN games g ON gp.item_id = g.id" if require_game else ""
+        cursor.execute(f"""
+            SELECT gp.item_id, gp.item_name, gp.player_count,
+                   gp.total_playtime, gp.total_2weeks
+            FROM game_popularity gp
+            {join};
+        """)
+        rows = cursor.fetchall()
+        if not rows:
+            return cls([], [], [], [], [])
+        ids, names, players, playtime, two_weeks = zip(*rows)
+        return cls(ids, names, players, playtime, two_weeks)
+
+    def __len__(self):
+        return len(self.item_ids)
+
+    def top_n(self, n=10, by='player_count', exclude=()):
+        """
+        Top ``n`` item_ids by ``by`` that are not in ``exclude``.
+
+        Args:
+            n: number of items to return
+            by: 'player_count', 'total_playtime', 'total_2weeks' or 'total_combined'
+            exclude: item_ids to skip; pass a set/frozenset to avoid a copy
+        """
+        if by not in self._orders:
+            raise ValueError(f"Unknown popularity column: {by}")
+        if not isinstance(exclude, (set, frozenset)):
+            exclude = set(exclude)
+
+        out = []
+        if n <= 0:
+            return out
+        for item_id in self._orders[by]:
+            if item_id in exclude:
+                continue
+            out.append(item_id)
+            if len(out) == n:
+                break
+        return out
+
+# ------------------ Shared Instance ------------------
+_lock = threading.Lock()
+_loaded = {}
+
+def get_ranking(cursor, require_game=True, ttl=RANKING_TTL_SECONDS):
+    """Process-wide ranking, reloaded from game_popularity after ``ttl`` seconds."""
+    now = time.monotonic()
+    with _lock:
+        entry = _loaded.get(require_game)
+        if entry and now - entry[0] < ttl:
+            return entry[1]
+    ranking = PopularityRanking.from_db(cursor, require_game=require_game)
+    with _lock:
+        _loaded[require_game] = (now, ranking)
+    return ranking
+
+def clear_rankings():
+    """Drop the cached rankings so the next get_ranking() reloads (after a refresh)."""
+    with _lock:
+        _loaded.clear()
+
+def fetch_game_vectors(cursor, item_ids):
+    """(item_id, app_name, tfidf_vec_vector) rows for item_ids, in the given order."""
+    if not item_ids:
+        return []
+    cursor.execute("""
+        SELECT id, app_name, tfidf_vec_vector
+        FROM games
+        WHERE id = ANY(%s);
+    """, (list(item_ids),))
+    by_id = {row[0]: row for row in cursor.fetchall()}
+    return [by_id[i] for i in item_ids if i in by_id]
@@ -0,0 +1,217 @@
+import argparse
+import math
+import time
+
+import psycopg2
+from psycopg2.extras import execute_values
+
+from delta_ingest import changes_since, mark_consumed
+from id_interning import intern_ingested_ids
+from memory_budget import MemoryBudget
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+JOB = 'ratio_vectors'      # watermark name in job_watermarks
+HEADROOM = 1.25            # capacity = games * HEADROOM, rounded up to CAPACITY_ALIGN
+CAPACITY_ALIGN = 1024
+BATCH_USERS = 1000         # users per query when no memory budget is set
+BYTES_PER_ITEM = 120       # per owned game: fetched row + sparse text entry
+MAX_INDEXED_NNZ = 1000     # pgvector HNSW limit on non-zeros per sparsevec
+
+# ------------------ Schema ------------------
+# One row describing how vector positions map to games. Position i (0-based)
+# is game_index.item_idx = i, which is append-only, so a new game only ever
+# takes a fresh position and existing vectors stay valid.
+SCHEMA_SQL = """
+CREATE EXTENSION IF NOT EXISTS vector;
+CREATE TABLE IF NOT EXISTS user_play_ratio (
+    user_id TEXT PRIMARY KEY
+);
+CREATE TABLE IF NOT EXISTS ratio_vector_layout (
+    singleton  BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+    layout     TEXT NOT NULL,
+    capacity   INTEGER NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+"""
+LAYOUT = 'item_idx'
+
+# Rows over MAX_INDEXED_NNZ cannot go in the HNSW index; neighbour queries
+# scan them exactly through the second, plain partial index.
+INDEX_SQL = f"""
+CREATE INDEX IF NOT EXISTS idx_user_play_ratio_hnsw
+    ON user_play_ratio USING hnsw (playtime_sparse sparsevec_cosine_ops)
+    WHERE playtime_nnz <= {MAX_INDEXED_NNZ};
+CREATE INDEX IF NOT EXISTS idx_user_play_ratio_heavy
+    ON user_play_ratio (playtime_nnz) WHERE playtime_nnz > {MAX_INDEXED_NNZ};
+"""
+
+def capacity_for(n_games):
+    return max(CAPACITY_ALIGN, math.ceil(n_games * HEADROOM / CAPACITY_ALIGN) * CAPACITY_ALIGN)
+
+def _column_dims(cursor, column):
+    """Declared dimension of a user_play_ratio vector column, or None when unconstrained/missing."""
+    cursor.execute("""
+        SELECT format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = 'user_play_ratio'::regclass AND attname = %s AND NOT attisdropped;
+    """, (column,))
+    row = cursor.fetchone()
+    if not row or '(' not in row[0]:
+        return None
+    return int(row[0].split('(')[1].rstrip(')'))
+
+def current_layout(cursor):
+    cursor.execute(SCHEMA_SQL)
+    cursor.execute("SELECT layout, capacity FROM ratio_vector_layout;")
+    return cursor.fetchone()
+
+def ensure_capacity(cursor, n_games):
+    """
+    Make sure playtime_sparse and its indexes exist with room for
+    ``n_games`` positions and return the capacity. Growing re-declares the
+    column once with HEADROOM to spare; only the declared dimension of
+    each stored vector is rewritten.
+    """
+    layout = current_layout(cursor)
+    capacity = layout[1] if layout else 0
+    if n_games > capacity:
+        capacity = _grow(cursor, layout, n_games)
+    cursor.execute(INDEX_SQL)
+    return capacity
+
+def _grow(cursor, layout, n_games):
+    sparse_dims = _column_dims(cursor, 'playtime_sparse') or 0
+    # Never shrink below what the column already declares (a pre-layout table)
+    capacity = capacity_for(max(n_games, sparse_dims))
+    cursor.execute("ALTER TABLE user_play_ratio ADD COLUMN IF NOT EXISTS playtime_nnz INTEGER;")
+    cursor.execute(f"""
+        ALTER TABLE user_play_ratio ADD COLUMN IF NOT EXISTS playtime_sparse sparsevec({capacity});
+    """)
+    if sparse_dims and sparse_dims != capacity:
+        cursor.execute(f"""
+            ALTER TABLE user_play_ratio ALTER COLUMN playtime_sparse TYPE sparsevec({capacity})
+            USING regexp_replace(playtime_sparse::text, '/\\d+$', '/{capacity}')::sparsevec({capacity});
+        """)
+    cursor.execute("""
+        INSERT INTO ratio_vector_layout (layout, capacity) VALUES (%s, %s)
+        ON CONFLICT (singleton) DO UPDATE
+        SET capacity = EXCLUDED.capacity, updated_at = now();
+    """, (layout[0] if layout else LAYOUT, capacity))
+    print(f"⏳ ratio vector capacity -> {capacity} positions")
+    return capacity
+
+# ------------------ Vectors ------------------
+def sparse_literal(positions, ratios, capacity):
+    """pgvector sparsevec text ('{i:v,...}/dim', 1-based indices) for one user's non-zero ratios."""
+    body = ",".join(f"{p + 1}:{r}" for p, r in sorted(zip(positions, ratios)) if r)
+    return f"{{{body}}}/{capacity}"
+
+def refresh_users(cursor, user_ids, capacity):
+    """
+    Recompute and upsert the ratio vectors of ``user_ids`` from their
+    user_items rows; work is proportional to the users' libraries, not
+    to the number of games. Users with no rows left are deleted.
+    Returns the number of vectors written.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return 0
+    cursor.execute("""
+        SELECT user_id, item_idx, playtime_forever
+        FROM user_items
+        WHERE user_id = ANY(%s) AND item_idx IS NOT NULL;
+    """, (user_ids,))
+    libraries = {}
+    for user_id, idx, playtime in cursor.fetchall():
+        libraries.setdefault(user_id, {})[idx] = playtime
+
+    rows = []
+    for user_id, lib in libraries.items():
+        total = sum(lib.values()) or 1
+        positions = list(lib)
+        ratios = [round(lib[p] / total, 6) for p in positions]
+        nnz = sum(1 for r in ratios if r)
+        rows.append((user_id, sparse_literal(positions, ratios, capacity), nnz))
+
+    gone = [u for u in user_ids if u not in libraries]
+    if gone:
+        cursor.execute("DELETE FROM user_play_ratio WHERE user_id = ANY(%s);", (gone,))
+    if rows:
+        execute_values(cursor, """
+            INSERT INTO user_play_ratio (user_id, playtime_sparse, playtime_nnz)
+            SELECT v.user_id, v.sparse::sparsevec, v.nnz
+            FROM (VALUES %s) AS v (user_id, sparse, nnz)
+            ON CONFLICT (user_id) DO UPDATE
+            SET playtime_sparse = EXCLUDED.playtime_sparse,
+                playtime_nnz = EXCLUDED.playtime_nnz;
+        """, rows)
+    return len(rows)
+
+def game_count(cursor):
+    cursor.execute("SELECT COALESCE(MAX(item_idx) + 1, 0) FROM game_index;")
+    return cursor.fetchone()[0]
+
+def rebuild_all(cursor, budget=None):
+    """Recompute every user's vector in the item_idx layout (first run or --full)."""
+    budget = budget or MemoryBudget()
+    capacity = ensure_capacity(cursor, game_count(cursor))
+    last_change, _ = changes_since(cursor, JOB)
+
+    cursor.execute("SELECT user_id, COUNT(*) FROM user_items GROUP BY user_id;")
+    users = cursor.fetchall()
+    avg_library = (sum(n for _, n in users) / len(users)) if users else 1
+    user_ids = [u for u, _ in users]
+    cursor.execute("DELETE FROM user_play_ratio WHERE NOT (user_id = ANY(%s));", (user_ids,))
+
+    written = 0
+    for start, stop in budget.chunks(len(user_ids), int(avg_library * BYTES_PER_ITEM), maximum=BATCH_USERS):
+        written += refresh_users(cursor, user_ids[start:stop], capacity)
+        print(f"⏳ {stop}/{len(user_ids)} users")
+    cursor.execute("UPDATE ratio_vector_layout SET layout = %s, updated_at = now();", (LAYOUT,))
+    mark_consumed(cursor, JOB, last_change)
+    return written
+
+def refresh_changed(cursor, batch_users=BATCH_USERS):
+    """
+    Recompute only the users delta_ingest logged since this job's last run.
+    Falls back to a full rebuild when the stored vectors predate the
+    item_idx layout.
+    """
+    layout = current_layout(cursor)
+    if not layout or layout[0] != LAYOUT:
+        return rebuild_all(cursor)
+
+    capacity = ensure_capacity(cursor, game_count(cursor))
+    last_change, user_ids = changes_since(cursor, JOB)
+    written = 0
+    for start in range(0, len(user_ids), batch_users):
+        written += refresh_users(cursor, user_ids[start:start + batch_users], capacity)
+    mark_consumed(cursor, JOB, last_change)
+    return written
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description="Maintain user_play_ratio vectors incrementally")
+    parser.add_argument('--full', action='store_true', help="recompute every user")
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CFG)
+    t0 = time.perf_counter()
+    try:
+        with conn.cursor() as cur:
+            intern_ingested_ids(cur)   # new games/users need an item_idx first
+            written = rebuild_all(cur) if args.full else refresh_changed(cur)
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"✅ {written} ratio vectors written in {time.perf_counter() - t0:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# ------------------ Configuration ------------------
+MAX_ENTRIES = 10_000
+TTL_SECONDS = 3600
+DISK_DIR = None      # e.g. Path('cache/recommendations') to enable the on-disk tier
+
+# ------------------ Helpers ------------------
+def model_version(*paths, tag=""):
+    """
+    Version string for a set of model artefacts.
+
+    Built from each file's size and mtime, so retraining (or rewriting the
+    factor files) yields a new version and old cache entries stop matching.
+    """
+    h = hashlib.sha1(tag.encode('utf-8'))
+    for p in paths:
+        try:
+            st = os.stat(p)
+            h.update(f"{p}:{st.st_size}:{st.st_mtime_ns}".encode('utf-8'))
+        except FileNotFoundError:
+            h.update(f"{p}:missing".encode('utf-8'))
+    return h.hexdigest()[:16]
+
+def library_fingerprint(cursor, user_id):
+    """
+    Cheap digest of a user's user_items rows (served by idx_user_items_user_total).
+
+    Passing it to the cache makes entries self-invalidating when the library
+    changes, even if no ingest job called invalidate_user().
+    """
+    cursor.execute("""
+        SELECT COUNT(*),
+               COALESCE(SUM(playtime_forever + playtime_2weeks), 0),
+               md5(COALESCE(string_agg(item_id, ',' ORDER BY item_id), ''))
+        FROM user_items
+        WHERE user_id = %s;
+    """, (user_id,))
+    return ":".join(str(v) for v in cursor.fetchone())
+
+def _user_hash(user_id):
+    return hashlib.sha1(str(user_id).encode('utf-8')).hexdigest()[:20]
+
+# ------------------ Cache ------------------
+class RecommendationCache:
+    """
+    Per-user recommendation cache: in-process LRU with TTL, plus an optional
+    on-disk tier shared by every process pointing at the same directory.
+
+    Entries are keyed by (user_id, model_version) and may carry a library
+    fingerprint; a lookup with a different fingerprint is a miss.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, ttl=TTL_SECONDS, disk_dir=DISK_DIR):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+        self._entries = OrderedDict()   # (user_id, version) -> (stored_at, fingerprint, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ---------- disk tier ----------
+    def _disk_path(self, user_id, version):
+        return self.disk_dir / f"{_user_hash(user_id)}.{version}.pkl"
+
+    def _disk_get(self, user_id, version):
+        path = self._disk_path(user_id, version)
+        try:
+            with path.open('rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _disk_put(self, user_id, version, entry):
+        path = self._disk_path(user_id, version)
+        tmp = path.with_suffix(f'.tmp{os.getpid()}')
+        with tmp.open('wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    # ---------- public API ----------
+    def get(self, user_id, version, fingerprint=None):
+        """Cached value or None."""
+        key = (user_id, version)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl and (fingerprint is None or entry[1] == fingerprint):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                del self._entries[key]
+
+        if self.disk_dir:
+            entry = self._disk_get(user_id, version)
+            if entry is not None and now - entry[0] < self.ttl and \
+                    (fingerprint is None or entry[1] == fingerprint):
+                with self._lock:
+                    self._store(key, entry)
+                    self.hits += 1
+                    self.disk_hits += 1
+                return entry[2]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, user_id, version, value, fingerprint=None):
+        entry = (time.time(), fingerprint, value)
+        with self._lock:
+            self._store((user_id, version), entry)
+        if self.disk_dir:
+            self._disk_put(user_id, version, entry)
+
+    def _store(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get_or_compute(self, user_id, version, compute, fingerprint=None):
+        """Return the cached value, or call ``compute()`` and cache its result."""
+        value = self.get(user_id, version, fingerprint)
+        if value is None:
+            value = compute()
+            self.put(user_id, version, value, fingerprint)
+        return value
+
+    def invalidate_user(self, user_id):
+        """Drop every cached version for a user whose library changed."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == user_id]:
+                del self._entries[key]
+        if self.disk_dir:
+            for path in self.disk_dir.glob(f"{_user_hash(user_id)}.*.pkl"):
+                path.unlink(missing_ok=True)
+
+    def invalidate_users(self, user_ids):
+        user_ids = set(user_ids)
+        with self._lock:
+            for key in [k for k in self._entries if k[0] in user_ids]:
+                del self._entries[key]
+        if self.disk_dir:
+            for user_id in user_ids:
+                for path in self.disk_dir.glob(f"{_user_hash(user_id)}.*.pkl"):
+                    path.unlink(missing_ok=True)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.disk_dir:
+            for path in self.disk_dir.glob("*.pkl"):
+                path.unlink(missing_ok=True)
+
+    def stats(self):
+        """Hit/miss counters and hit ratio since start-up."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,197 @@
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response
+
+from async_db import AsyncGameDB
+from implicit_als import ImplicitALS, MODEL_DIR
+from metrics import (REGISTRY, CONTENT_TYPE, SIZE_BUCKETS, Counter, Gauge, Histogram,
+                     CallbackMetric, read_textfile)
+from micro_batching import MicroBatcher
+from recommendation_cache import RecommendationCache, model_version
+
+# ------------------ Configuration ------------------
+MAX_K = 50             # every batch scores this many; requests slice down to k
+MAX_BATCH = 64
+MAX_WAIT_MS = 5.0
+SCORING_THREADS = max(1, (os.cpu_count() or 2) // 2)
+CHANGE_POLL_SECONDS = 30   # how often user_changes is checked for libraries to invalidate
+
+# ------------------ State ------------------
+app = FastAPI(title="Game Recommendation Service")
+
+model = None
+db = None
+batcher = None
+cache = RecommendationCache()
+version = None
+change_watcher = None
+scoring_pool = ThreadPoolExecutor(max_workers=SCORING_THREADS, thread_name_prefix="scoring")
+
+# ------------------ Metrics ------------------
+REQUESTS = Counter('recsys_requests_total', "Requests by endpoint and status code",
+                   ['endpoint', 'status'])
+LATENCY = Histogram('recsys_request_duration_seconds', "Request latency by endpoint", ['endpoint'])
+FALLBACKS = Counter('recsys_popular_fallback_total', "Recommendations served from popularity for unknown users")
+BATCH_SIZE = Histogram('recsys_batch_size', "Users scored per micro-batch", buckets=SIZE_BUCKETS)
+BATCH_SECONDS = Histogram('recsys_batch_duration_seconds', "Time to score one micro-batch")
+MODEL_LOAD = Gauge('recsys_model_load_seconds', "Time to memory-map the ALS factors at start-up")
+MODEL_LOADED_AT = Gauge('recsys_model_loaded_timestamp_seconds', "Unix time the model was loaded")
+
+CallbackMetric('recsys_cache_lookups_total', "Recommendation cache lookups by result",
+               lambda: {('memory',): cache.hits - cache.disk_hits,
+                        ('disk',): cache.disk_hits,
+                        ('miss',): cache.misses},
+               kind='counter', labelnames=['result'])
+CallbackMetric('recsys_cache_entries', "Entries in the in-memory recommendation cache",
+               lambda: cache.stats()['entries'])
+CallbackMetric('recsys_db_pool_connections', "asyncpg pool connections by state",
+               lambda: None if db is None else {
+                   ('idle',): db.pool.get_idle_size(),
+                   ('busy',): db.pool.get_size() - db.pool.get_idle_size(),
+                   ('max',): db.pool.get_max_size()},
+               labelnames=['state'])
+INVALIDATED = Counter('recsys_cache_invalidated_users_total', "Users whose cached recommendations were dropped after a library change")
+
+CallbackMetric('recsys_batch_queue_depth', "Users waiting for the next micro-batch",
+               lambda: None if batcher is None else batcher.stats()['queued'])
+CallbackMetric('recsys_batch_deduplicated_total', "Requests that joined an in-flight batch for the same user",
+               lambda: None if batcher is None else batcher.deduplicated, kind='counter')
+
+def observed(endpoint):
+    """Count and time an endpoint; children are bound once so the hot path only touches its thread's shard."""
+    latency = LATENCY.labels(endpoint)
+    ok = REQUESTS.labels(endpoint, '200')
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = await fn(*args, **kwargs)
+            except HTTPException as e:
+                REQUESTS.labels(endpoint, str(e.status_code)).inc()
+                raise
+            except Exception:
+                REQUESTS.labels(endpoint, '500').inc()
+                raise
+            else:
+                ok.inc()
+                return result
+            finally:
+                latency.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def _score_batch(user_ids):
+    BATCH_SIZE.observe(len(user_ids))
+    with BATCH_SECONDS.time():
+        return model.recommend_batch(user_ids, k=MAX_K)
+
+@app.on_event("startup")
+async def startup():
+    """Open the asyncpg pool, memory-map the ALS factors and set up the batcher."""
+    global model, db, batcher, version, change_watcher
+    db = await AsyncGameDB.connect()
+    start = time.perf_counter()
+    model = ImplicitALS.load(MODEL_DIR)
+    MODEL_LOAD.set(time.perf_counter() - start)
+    MODEL_LOADED_AT.set(time.time())
+    version = model_version(MODEL_DIR / 'user_factors.npy', MODEL_DIR / 'item_factors.npy', tag='als')
+    batcher = MicroBatcher(_score_batch, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS,
+                           executor=scoring_pool)
+    change_watcher = asyncio.create_task(_watch_library_changes())
+
+async def _watch_library_changes():
+    """Drop cached recommendations of users that delta_ingest reports as changed."""
+    try:
+        last_id = await db.latest_change_id()
+    except Exception as e:
+        print(f"⚠️ library change tracking unavailable (run migrate.py): {e}")
+        return
+    while True:
+        await asyncio.sleep(CHANGE_POLL_SECONDS)
+        try:
+            last_id, user_ids = await db.changes_since(last_id)
+        except Exception as e:
+            print(f"⚠️ change poll failed: {e}")
+            continue
+        if user_ids:
+            cache.invalidate_users(user_ids)
+            INVALIDATED.inc(len(user_ids))
+
+@app.on_event("shutdown")
+async def shutdown():
+    if change_watcher is not None:
+        change_watcher.cancel()
+    if db is not None:
+        await db.close()
+    scoring_pool.shutdown(wait=False)
+
+# ------------------ Endpoints ------------------
+@app.get("/recommend/{user_id}")
+@observed('recommend')
+async def recommend(user_id: str, k: int = 10):
+    k = max(1, min(k, MAX_K))
+    if user_id not in model.user_index:
+        # Users added since the model was trained get popular games they don't own
+        owned = await db.owned_item_ids(user_id)
+        if not owned:
+            raise HTTPException(status_code=404, detail="Unknown user")
+        popular = await db.popular_games(limit=k, exclude=owned)
+        FALLBACKS.inc()
+        return {
+            'user_id': user_id,
+            'fallback': 'popular',
+            'recommendations': [
+                {'item_id': g['item_id'], 'item_name': g['item_name'], 'score': float(g['player_count'])}
+                for g in popular
+            ],
+        }
+
+    recs = cache.get(user_id, version)
+    if recs is None:
+        recs = await batcher.submit(user_id)
+        cache.put(user_id, version, recs)
+
+    return {
+        'user_id': user_id,
+        'recommendations': [
+            {'item_id': gid, 'item_name': name, 'score': score}
+            for gid, name, score in recs[:k]
+        ],
+    }
+
+@app.get("/similar-games/{item_id}")
+@observed('similar_games')
+async def similar_games(item_id: str, k: int = 10):
+    rows = await db.similar_games(item_id, limit=max(1, min(k, MAX_K)))
+    if not rows:
+        raise HTTPException(status_code=404, detail="Unknown game or no TF-IDF vector")
+    return {'item_id': item_id, 'similar': rows}
+
+@app.get("/similar-users/{user_id}")
+@observed('similar_users')
+async def similar_users(user_id: str, k: int = 20):
+    rows = await db.similar_users(user_id, limit=max(1, min(k, MAX_K)))
+    if not rows:
+        raise HTTPException(status_code=404, detail="Unknown user or no playtime vector")
+    return {'user_id': user_id, 'similar': rows}
+
+@app.get("/health")
+async def health():
+    return {
+        'model_loaded': model is not None,
+        'model_version': version,
+        'cache': cache.stats(),
+        'batching': batcher.stats() if batcher else None,
+    }
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus scrape target; ingest jobs' last textfile is appended as-is."""
+    return Response(REGISTRY.render() + read_textfile(), media_type=CONTENT_TYPE)
@@ -0,0 +1,250 @@
+import argparse
+import json
+import time
+from datetime import date
+from pathlib import Path
+
+import psycopg2
+import numpy as np
+import pyarrow as pa
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+SNAPSHOT_DIR = Path('data/snapshot')
+USERS_JSON = Path('data/australian_users_items_clean.json')
+GAMES_JSON = Path('data/steam_games_clean.json')
+FETCH_SIZE = 100_000
+CHUNK_ROWS = 1 << 20   # rows per IPC record batch
+
+# Arrow schemas; ids are dictionary-encoded so each distinct string is stored once
+USERS_SCHEMA = pa.schema([
+    ('user_id', pa.string()),
+    ('steam_id', pa.string()),
+    ('items_count', pa.int32()),
+    ('user_url', pa.string()),
+])
+
+USER_ITEMS_SCHEMA = pa.schema([
+    ('user_id', pa.dictionary(pa.int32(), pa.string())),
+    ('item_id', pa.dictionary(pa.int32(), pa.string())),
+    ('item_name', pa.dictionary(pa.int32(), pa.string())),
+    ('playtime_forever', pa.int32()),
+    ('playtime_2weeks', pa.int32()),
+])
+
+GAMES_SCHEMA = pa.schema([
+    ('id', pa.string()),
+    ('app_name', pa.string()),
+    ('title', pa.string()),
+    ('url', pa.string()),
+    ('release_date', pa.date32()),
+    ('developer', pa.dictionary(pa.int32(), pa.string())),
+    ('publisher', pa.dictionary(pa.int32(), pa.string())),
+    ('genres', pa.list_(pa.string())),
+    ('tags', pa.list_(pa.string())),
+    ('price', pa.float64()),
+    ('discount_price', pa.float64()),
+    ('early_access', pa.bool_()),
+    ('metascore', pa.int32()),
+    ('sentiment', pa.dictionary(pa.int32(), pa.string())),
+    ('specs', pa.list_(pa.string())),
+    ('reviews_url', pa.string()),
+])
+
+TABLES = {
+    'users': USERS_SCHEMA,
+    'user_items': USER_ITEMS_SCHEMA,
+    'games': GAMES_SCHEMA,
+}
+
+# ------------------ Writing ------------------
+def _to_table(columns, schema):
+    """Build a table from python column lists, dictionary-encoding where the schema asks."""
+    arrays = []
+    for field in schema:
+        values = columns[field.name]
+        if pa.types.is_dictionary(field.type):
+            arr = pa.array(values, type=field.type.value_type).dictionary_encode()
+            arr = arr.cast(field.type)
+        else:
+            arr = pa.array(values, type=field.type)
+        arrays.append(arr)
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+def write_table(table, path, chunk_rows=CHUNK_ROWS):
+    """Write an uncompressed Arrow IPC file so it can be memory-mapped on load."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with pa.OSFile(str(path), 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=chunk_rows)
+
+def _fetch_columns(conn, query, names):
+    """Stream a query through a server-side cursor into per-column lists."""
+    columns = {n: [] for n in names}
+    with conn.cursor(name='snapshot_export') as cur:
+        cur.itersize = FETCH_SIZE
+        cur.execute(query)
+        while True:
+            rows = cur.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for n, values in zip(names, zip(*rows)):
+                columns[n].extend(values)
+    return columns
+
+def export_from_db(conn, out_dir=SNAPSHOT_DIR):
+    """Snapshot users, user_items and games from Postgres."""
+    queries = {
+        'users': "SELECT user_id, steam_id, items_count, user_url FROM users ORDER BY user_id",
+        'user_items': """
+            SELECT user_id, item_id, item_name,
+                   COALESCE(playtime_forever, 0), COALESCE(playtime_2weeks, 0)
+            FROM user_items ORDER BY user_id, item_id
+        """,
+        'games': """
+            SELECT id, app_name, title, url, release_date, developer, publisher,
+                   genres, tags, price::float8, discount_price::float8, early_access,
+                   metascore, sentiment, specs, reviews_url
+            FROM games ORDER BY id
+        """,
+    }
+    for name, schema in TABLES.items():
+        columns = _fetch_columns(conn, queries[name], schema.names)
+        write_table(_to_table(columns, schema), Path(out_dir) / f'{name}.arrow')
+        print(f"✅ {name}: {len(columns[schema.names[0]])} rows")
+
+def _as_list(v):
+    if v is None:
+        return None
+    return [str(x) for x in v] if isinstance(v, list) else [str(v)]
+
+def _coerce(v, cast):
+    try:
+        return cast(v) if v is not None and v != '' else None
+    except (TypeError, ValueError):
+        return None
+
+def export_from_json(users_json=USERS_JSON, games_json=GAMES_JSON, out_dir=SNAPSHOT_DIR):
+    """Snapshot the cleaned JSON dumps without going through Postgres."""
+    with Path(users_json).open(encoding='utf-8') as f:
+        users = json.load(f)
+    u_cols = {n: [] for n in USERS_SCHEMA.names}
+    ui_cols = {n: [] for n in USER_ITEMS_SCHEMA.names}
+    for u in users:
+        u_cols['user_id'].append(str(u.get('user_id')))
+        u_cols['steam_id'].append(_coerce(u.get('steam_id'), str))
+        u_cols['items_count'].append(_coerce(u.get('items_count'), int))
+        u_cols['user_url'].append(u.get('user_url'))
+        for it in u.get('items') or []:
+            if not isinstance(it, dict):
+                continue
+            ui_cols['user_id'].append(str(u.get('user_id')))
+            ui_cols['item_id'].append(str(it.get('item_id')))
+            ui_cols['item_name'].append(_coerce(it.get('item_name'), str))
+            ui_cols['playtime_forever'].append(_coerce(it.get('playtime_forever'), int) or 0)
+            ui_cols['playtime_2weeks'].append(_coerce(it.get('playtime_2weeks'), int) or 0)
+    del users
+    write_table(_to_table(u_cols, USERS_SCHEMA), Path(out_dir) / 'users.arrow')
+    write_table(_to_table(ui_cols, USER_ITEMS_SCHEMA), Path(out_dir) / 'user_items.arrow')
+    print(f"✅ users: {len(u_cols['user_id'])} rows, user_items: {len(ui_cols['user_id'])} rows")
+
+    with Path(games_json).open(encoding='utf-8') as f:
+        games = json.load(f)
+    g_cols = {n: [] for n in GAMES_SCHEMA.names}
+    for g in games:
+        if g.get('id') is None:
+            continue
+        try:
+            released = date.fromisoformat(str(g.get('release_date')))
+        except ValueError:
+            released = None
+        g_cols['id'].append(str(g['id']))
+        for k in ('app_name', 'title', 'url', 'developer', 'publisher', 'sentiment', 'reviews_url'):
+            g_cols[k].append(_coerce(g.get(k), str))
+        g_cols['release_date'].append(released)
+        for k in ('genres', 'tags', 'specs'):
+            g_cols[k].append(_as_list(g.get(k)))
+        g_cols['price'].append(_coerce(g.get('price'), float))
+        g_cols['discount_price'].append(_coerce(g.get('discount_price'), float))
+        ea = g.get('early_access')
+        g_cols['early_access'].append(ea if isinstance(ea, bool) else None)
+        g_cols['metascore'].append(_coerce(g.get('metascore'), int))
+    write_table(_to_table(g_cols, GAMES_SCHEMA), Path(out_dir) / 'games.arrow')
+    print(f"✅ games: {len(g_cols['id'])} rows")
+
+# ------------------ Loading ------------------
+def load_table(name, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Memory-map one snapshot table.
+
+    The returned pyarrow.Table references the mapped file directly, so
+    loading costs page faults on access rather than a parse and copy.
+    """
+    source = pa.memory_map(str(Path(snapshot_dir) / f'{name}.arrow'), 'r')
+    return pa.ipc.open_file(source).read_all()
+
+def load_snapshot(snapshot_dir=SNAPSHOT_DIR):
+    """All three tables as a dict of pyarrow.Table."""
+    return {name: load_table(name, snapshot_dir) for name in TABLES}
+
+def _codes(column):
+    """int32 dictionary indices of a dictionary-encoded column."""
+    chunks = [c.indices.to_numpy() for c in column.chunks]
+    return chunks[0] if len(chunks) == 1 else np.concatenate(chunks)
+
+def interaction_arrays(user_items):
+    """
+    NumPy views of a user_items snapshot table.
+
+    Returns:
+        (user_codes, item_codes, playtime_forever, playtime_2weeks, user_ids, item_ids)
+        where the *_codes are int32 rows into the user_ids / item_ids lists.
+        Every IPC batch shares one dictionary, so the codes are consistent
+        across chunks; single-chunk columns are returned without copying.
+    """
+    users = user_items.column('user_id')
+    items = user_items.column('item_id')
+    return (
+        _codes(users),
+        _codes(items),
+        user_items.column('playtime_forever').to_numpy(),
+        user_items.column('playtime_2weeks').to_numpy(),
+        users.chunk(0).dictionary.to_pylist() if users.num_chunks else [],
+        items.chunk(0).dictionary.to_pylist() if items.num_chunks else [],
+    )
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description="Export or inspect the columnar snapshot.")
+    parser.add_argument('--source', choices=('db', 'json'), default='db')
+    parser.add_argument('--out', type=Path, default=SNAPSHOT_DIR)
+    parser.add_argument('--load-only', action='store_true', help="just time loading an existing snapshot")
+    args = parser.parse_args()
+
+    if not args.load_only:
+        if args.source == 'db':
+            conn = psycopg2.connect(**DB_CFG)
+            try:
+                export_from_db(conn, args.out)
+            finally:
+                conn.close()
+        else:
+            export_from_json(out_dir=args.out)
+
+    t0 = time.perf_counter()
+    tables = load_snapshot(args.out)
+    elapsed = time.perf_counter() - t0
+    for name, table in tables.items():
+        print(f"{name}: {table.num_rows} rows, {table.nbytes / 1e6:.1f} MB")
+    print(f"Loaded snapshot in {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
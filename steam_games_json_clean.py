@@ -2,76 +2,46 @@ import json
 import sys
 from pathlib import Path
 
+from ingest_validation import REJECTS_DIR, RejectLog
+from coercion import compile_schema, to_bool, to_float_or_label, to_int, to_str, to_str_list
+
 
 RAW_FILE   = Path('data1/steam_games.json')
 CLEAN_FILE = Path('data/steam_games_clean.json')
 
-# The exact order we want every object to have
-KEY_ORDER = [
-    'id',
-    'app_name',
-    'title',
-    'url',
-    'release_date',
-    'developer',
-    'publisher',
-    'genres',
-    'tags',
-    'price',
-    'discount_price',
-    'early_access',
-    'metascore',
-    'sentiment',
-    'specs',
-    'reviews_url'
-]
+# The exact order we want every object to have, and each field's target type
+FIELD_TYPES = {
+    'id': to_str,
+    'app_name': to_str,
+    'title': to_str,
+    'url': to_str,
+    'release_date': to_str,
+    'developer': to_str,
+    'publisher': to_str,
+    'genres': to_str_list,
+    'tags': to_str_list,
+    'price': to_float_or_label,
+    'discount_price': to_float_or_label,
+    'early_access': to_bool,
+    'metascore': to_int,
+    'sentiment': to_str,
+    'specs': to_str_list,
+    'reviews_url': to_str,
+}
+KEY_ORDER = list(FIELD_TYPES)
 # ----------------------------
 
-def fix_type(val):
-    """Convert the most common 'lazy' values to canonical JSON types."""
-    if val is None:
-        return None
-    if isinstance(val, (int, float, bool)):
-        return val
-    if isinstance(val, str):
-        val = val.strip()
-        # boolean strings
-        if val.lower() in ('true', 'false'):
-            return val.lower() == 'true'
-        # numeric strings
-        try:
-            if '.' in val:
-                return float(val)
-            return int(val)
-        except ValueError:
-            pass
-        # "Free to Play", "Free", etc.
-        if val.lower() in ('free to play', 'free'):
-            return val  # keep as string, but normalized
-        return val
-    if isinstance(val, list):
-        return [fix_type(v) for v in val]
-    return val
-
-def reorder(obj: dict) -> dict:
-    """Return a new dict with keys in the desired order."""
-    ordered = {}
-    for k in KEY_ORDER:
-        v = obj.get(k)
-        ordered[k] = fix_type(v)
-    # append any extra keys that the template missed
-    for k, v in obj.items():
-        if k not in KEY_ORDER:
-            ordered[k] = fix_type(v)
-    return ordered
+# Return a new dict with keys in the desired order, each field coerced by its schema type
+reorder = compile_schema(FIELD_TYPES)
 
 def main() -> None:
     if not RAW_FILE.exists():
         sys.exit(f'{RAW_FILE} not found.')
 
     games = []
-    with RAW_FILE.open(encoding='utf-8') as f:
-        for line in f:
+    with RAW_FILE.open(encoding='utf-8') as f, \
+            RejectLog(REJECTS_DIR / 'steam_games_clean.jsonl') as rejects:
+        for lineno, line in enumerate(f, 1):
             line = line.strip()
             if not line:
                 continue
@@ -80,12 +50,12 @@ def main() -> None:
                 obj = reorder(obj)
                 games.append(obj)
             except Exception as e:
-                print(f'Skipped bad line: {e}')
+                rejects.reject('raw', type(e).__name__, line, line=lineno, error=str(e))
 
     with CLEAN_FILE.open('w', encoding='utf-8') as f:
         json.dump(games, f, indent=2, ensure_ascii=False, sort_keys=False)
 
-    print(f'Wrote {len(games)} objects to {CLEAN_FILE}')
+    print(f'Wrote {len(games)} objects to {CLEAN_FILE}; {rejects.summary()}')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
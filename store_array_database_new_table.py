@@ -1,5 +1,11 @@
 import psycopg2
 
+from id_interning import intern_ingested_ids
+from memory_budget import memory_from_argv, stage, print_memory_report
+from ratio_vectors import rebuild_all
+
+budget = memory_from_argv()
+
 # -------------------- PostgreSQL Connection --------------------
 conn = psycopg2.connect(
     dbname="postgres",
@@ -10,49 +16,17 @@ conn = psycopg2.connect(
 )
 cursor = conn.cursor()
 
-# Get ordered item IDs (game_order)
-cursor.execute("""
-    SELECT DISTINCT item_id
-    FROM user_items
-    ORDER BY item_id;
-""")
-game_order = [row[0] for row in cursor.fetchall()]
-
-# Get all users
-cursor.execute("SELECT DISTINCT user_id FROM user_items;")
-all_user_ids = [row[0] for row in cursor.fetchall()]
-
-# Loop through each user
-for user_id in all_user_ids:
-    cursor.execute("""
-        SELECT item_id, playtime_forever
-        FROM user_items
-        WHERE user_id = %s;
-    """, (user_id,))
-    user_games = cursor.fetchall()
-
-    user_play_dict = {item_id: playtime for item_id, playtime in user_games}
-    total_playtime = sum(user_play_dict.values())
-
-    if total_playtime == 0:
-        total_playtime = 1
-
-    # Build ratio vector
-    ratio_vector = [round(user_play_dict.get(item_id, 0) / total_playtime, 6) for item_id in game_order]
-
-    # Convert to space-separated string for pgvector
-    vector_str = f"[{', '.join(map(str, ratio_vector))}]"
+# Full rebuild in the stable game_index layout (position = item_idx); routine
+# updates after a delta ingest only touch changed users: python ratio_vectors.py
+with stage('intern ids'):
+    intern_ingested_ids(cursor)
 
-    # Insert into user_play_ratio
-    cursor.execute("""
-        INSERT INTO user_play_ratio (user_id, playtime_vector)
-        VALUES (%s, %s)
-        ON CONFLICT (user_id) DO UPDATE
-        SET playtime_vector = EXCLUDED.playtime_vector;
-    """, (user_id, vector_str))
+with stage('ratio vectors'):
+    written = rebuild_all(cursor, budget)
 
 # Finalize
 conn.commit()
 cursor.close()
 conn.close()
-print("All user playtime vectors stored in the PostgreSQL vector format.")
+print(f"All {written} user playtime vectors stored in the PostgreSQL vector format.")
+print_memory_report()
@@ -0,0 +1,31 @@
+import hashlib
+
+import pytest
+
+pytest.importorskip('psycopg2')
+from delta_ingest import apply_snapshot, library_hash
+from ingest_validation import RejectLog
+
+EMPTY_HASH = hashlib.md5(b'').hexdigest()   # md5('') as seeded by migration 007 / rebuild_hashes
+
+class StoredHashesCursor:
+    """Serves load_hashes() from a dict; any write means a user was seen as changed."""
+    def __init__(self, hashes):
+        self.hashes = hashes
+
+    def execute(self, sql, params=None):
+        if 'INSERT' in sql or 'DELETE' in sql:
+            raise AssertionError(f"unexpected write: {sql.split()[0:3]}")
+
+    def fetchall(self):
+        return list(self.hashes.items())
+
+def test_empty_library_hash_matches_seed():
+    assert library_hash([]) == EMPTY_HASH
+
+def test_seeded_empty_library_is_unchanged(tmp_path):
+    users = [{'user_id': 'u1', 'items': []}]
+    with RejectLog(tmp_path / 'rejects.jsonl') as rejects:
+        stats = apply_snapshot(StoredHashesCursor({'u1': EMPTY_HASH}), users, rejects)
+    assert stats['changed']['added'] == []
+    assert stats['unchanged'] == 1
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+pytest.importorskip('psycopg2')
+from hybrid_recommender import HybridRecommender, play_matrices
+
+def _model():
+    # user0 owns games 0 and 1; its neighbours own them too, with far more
+    # playtime than the games user0 does not own (2, 3)
+    rows = [0, 0, 1, 1, 1, 2, 2, 2, 2]
+    cols = [0, 1, 0, 1, 2, 0, 1, 3, 2]
+    forever = [100, 50, 900, 800, 30, 700, 600, 10, 20]
+    shape = (3, 4)
+    play, play_total = play_matrices(rows, cols, forever, np.zeros(len(rows)), shape)
+    tfidf = sp.csr_matrix(np.array([[1, 0], [1, 1], [0, 1], [1, 0]], dtype=np.float32))
+    users = [f"user{u}" for u in range(shape[0])]
+    games = [str(g) for g in range(shape[1])]
+    return HybridRecommender(users, games, games, play, play_total, tfidf)
+
+def test_cf_normalised_over_games_not_owned():
+    model = _model()
+    scores, cf, content = model.score('user0', alpha=0.5)
+    candidates = [2, 3]
+    assert cf[candidates].max() == pytest.approx(1.0)
+    assert content[candidates].max() == pytest.approx(1.0)
+    assert np.isneginf(scores[[0, 1]]).all()
+
+def test_alpha_zero_is_pure_collaborative():
+    model = _model()
+    top = model.recommend('user0', k=1, alpha=0.0)[0]
+    assert top[2] == pytest.approx(1.0)
+    assert top[3] == pytest.approx(1.0)
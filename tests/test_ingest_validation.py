@@ -0,0 +1,26 @@
+import pytest
+
+from ingest_validation import RejectLog, clean_games
+
+def _clean(games, tmp_path):
+    with RejectLog(tmp_path / 'rejects.jsonl') as rejects:
+        return list(clean_games(games, rejects)), rejects.total
+
+@pytest.mark.parametrize('field', ['price', 'discount_price'])
+def test_price_labels_load_as_null(tmp_path, field):
+    games, rejected = _clean([{'id': '1', field: 'Free to Play'},
+                              {'id': '2', field: 'Free'},
+                              {'id': '3', field: float('nan')}], tmp_path)
+    assert [g[field] for g in games] == [None, None, None]
+    assert rejected == 0
+
+@pytest.mark.parametrize('field', ['price', 'discount_price'])
+def test_numeric_prices_kept(tmp_path, field):
+    games, _ = _clean([{'id': '1', field: 4.99},
+                       {'id': '2', field: '19.99'},
+                       {'id': '3', field: 0}], tmp_path)
+    assert [g[field] for g in games] == [4.99, 19.99, 0.0]
+
+def test_price_out_of_numeric_range_is_null(tmp_path):
+    games, _ = _clean([{'id': '1', 'price': 1e12}], tmp_path)
+    assert games[0]['price'] is None
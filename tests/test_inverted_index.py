@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import scipy.sparse as sp
+
+pytest.importorskip('psycopg2')
+from hybrid_recommender import play_matrices
+from inverted_index import InvertedIndex, build_index
+from user_similarity import UserSimilarity
+
+ROWS = [0, 0, 1, 1, 2, 2, 2]
+COLS = [0, 1, 1, 2, 0, 2, 3]
+FOREVER = [10, 0, 30, 5, 60, 20, 7]   # one zero-playtime row, as user_items has
+SHAPE = (3, 4)
+USERS = ['a', 'b', 'c']
+
+def _build(tmp_path, last_change_id=7):
+    # Built like `inverted_index.py --build`: raw playtime through UserSimilarity
+    raw = sp.csr_matrix((np.asarray(FOREVER, dtype=np.float32), (ROWS, COLS)), shape=SHAPE)
+    engine = UserSimilarity(USERS, raw)
+    build_index(engine.user_ids, engine.matrix, tmp_path, last_change_id=last_change_id)
+    return InvertedIndex(tmp_path)
+
+def test_index_matches_hybrid_play_matrix(tmp_path):
+    index = _build(tmp_path)
+    play, _ = play_matrices(ROWS, COLS, FOREVER, np.zeros(len(ROWS)), SHAPE)
+    assert index.matches(USERS, play.count_nonzero(), 7)
+
+def test_index_stale_after_change(tmp_path):
+    index = _build(tmp_path)
+    nnz = index.meta['nnz']
+    assert not index.matches(USERS, nnz, 8)          # a library changed since the build
+    assert not index.matches(USERS, nnz + 1, 7)      # a game was added outside delta_ingest
+    assert not index.matches(USERS + ['d'], nnz, 7)  # new user
+
+def test_search_exact_against_engine(tmp_path):
+    index = _build(tmp_path)
+    raw = sp.csr_matrix((np.asarray(FOREVER, dtype=np.float32), (ROWS, COLS)), shape=SHAPE)
+    engine = UserSimilarity(USERS, raw)
+    for u in range(SHAPE[0]):
+        idx, sims = index.neighbours_of(u, k=2)
+        ref_idx, ref_sims = engine.neighbours_of(u, k=2)
+        assert list(idx) == list(ref_idx)
+        assert np.allclose(sims, ref_sims)
@@ -0,0 +1,154 @@
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# ------------------ Configuration ------------------
+# Histogram bucket upper bounds in milliseconds (roughly x2 apart)
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+              1000, 2500, 5000, 10000, 30000, 60000, math.inf)
+
+_current_span = ContextVar('current_span', default=None)
+
+# ------------------ Histogram ------------------
+class Histogram:
+    """Bucketed latency histogram with exact count/sum/min/max."""
+
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def observe(self, ms):
+        for i, bound in enumerate(self.buckets):
+            if ms <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.total += ms
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (clamped to max)."""
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+# ------------------ Tracer ------------------
+class Tracer:
+    """
+    Context-manager spans timed with perf_counter_ns.
+
+    Durations are aggregated per span name into histograms. When an export
+    file is set, each finished span is also appended as one JSON line
+    shaped like an OpenTelemetry span (traceId/spanId/parentSpanId, unix
+    nano timestamps, attributes), which OTLP file receivers can ingest.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._export = None
+        self._order = []
+
+    def export_to(self, path):
+        self._export = open(path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self._export:
+            self._export.close()
+            self._export = None
+
+    @contextmanager
+    def span(self, name, **attributes):
+        if not self.enabled:
+            yield None
+            return
+
+        parent = _current_span.get()
+        span_id = os.urandom(8).hex()
+        trace_id = parent['traceId'] if parent else os.urandom(16).hex()
+        record = {'traceId': trace_id, 'spanId': span_id,
+                  'parentSpanId': parent['spanId'] if parent else None, 'name': name}
+        token = _current_span.set(record)
+        wall_start = time.time_ns()
+        start = time.perf_counter_ns()
+        try:
+            yield record
+        finally:
+            elapsed_ns = time.perf_counter_ns() - start
+            _current_span.reset(token)
+            self._finish(name, elapsed_ns, wall_start, record, attributes)
+
+    def _finish(self, name, elapsed_ns, wall_start, record, attributes):
+        with self._lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+                self._order.append(name)
+            hist.observe(elapsed_ns / 1e6)
+            if self._export:
+                record.update(startTimeUnixNano=wall_start,
+                              endTimeUnixNano=wall_start + elapsed_ns,
+                              attributes=attributes)
+                self._export.write(json.dumps(record, default=str) + "\n")
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self._order.clear()
+
+    def report(self):
+        """Per-stage breakdown table, stages in first-seen order."""
+        with self._lock:
+            rows = [(n, self.histograms[n]) for n in self._order]
+        # top-level spans share the grand total; nested ones show their share of it
+        grand = sum(h.total for n, h in rows if '.' not in n) or 1.0
+        lines = [f"{'stage':<34}{'calls':>7}{'total ms':>11}{'mean ms':>10}"
+                 f"{'p50':>9}{'p95':>9}{'max':>9}{'share':>8}"]
+        for name, h in rows:
+            lines.append(
+                f"{name:<34}{h.count:>7}{h.total:>11.2f}{h.total / h.count:>10.3f}"
+                f"{h.percentile(50):>9.2f}{h.percentile(95):>9.2f}{h.max:>9.2f}"
+                f"{100.0 * h.total / grand:>7.1f}%"
+            )
+        return "\n".join(lines)
+
+tracer = Tracer()
+span = tracer.span
+
+# ------------------ CLI helpers ------------------
+def add_profile_args(parser):
+    parser.add_argument('--profile', action='store_true', help="print a per-stage timing breakdown")
+    parser.add_argument('--trace-file', help="append finished spans as OpenTelemetry-style JSON lines")
+    return parser
+
+def profile_from_argv(argv=None):
+    """
+    For scripts without their own argument parser: read --profile and
+    --trace-file, set up export, and return whether to print the report.
+    """
+    parser = add_profile_args(argparse.ArgumentParser(add_help=False))
+    args, _ = parser.parse_known_args(argv)
+    if args.trace_file:
+        tracer.export_to(args.trace_file)
+    return args.profile
+
+def print_profile():
+    print("\n=== Profile ===")
+    print(tracer.report())
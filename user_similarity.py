@@ -0,0 +1,201 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+import psycopg2
+import numpy as np
+import scipy.sparse as sp
+
+from id_interning import load_interners
+from memory_budget import MemoryBudget, add_memory_args, memory_from_argv
+
+# ------------------ Configuration ------------------
+DB_CFG = dict(
+    dbname="postgres",
+    user="postgres",
+    password="Rohan$123",
+    host="localhost",
+    port="5432",
+)
+
+USER_ID = "doctr"     # <-- change as needed
+K_NEIGHBOR = 20
+BLOCK_USERS = 1024    # most query rows per block in all-pairs mode
+THREADS = min(8, os.cpu_count() or 1)   # each thread holds one block of scores
+BYTES_PER_SCORE = 16  # per (query user, scored user): CSR value + index + matmul scratch
+NEIGHBOURS_PATH = Path('models/user_neighbours.npz')
+
+# ------------------ Helpers ------------------
+def _row_normalize(mat):
+    """L2-normalize the rows of a CSR matrix (empty rows stay empty)."""
+    norms = np.sqrt(np.asarray(mat.multiply(mat).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return (sp.diags(1.0 / norms) @ mat).tocsr()
+
+def _top_k(scores, k):
+    """Indices of the k largest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.array([], dtype=np.int64)
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
+
+# ------------------ Engine ------------------
+class UserSimilarity:
+    """
+    Cosine user-user similarity over the sparse users x games ratio matrix.
+
+    Rows are L2-normalized once, so a cosine is a dot product. The matrix
+    is also kept transposed (games x users), whose rows are the posting
+    lists of each game's owners: scoring one user multiplies their few
+    non-zeros into those lists and only touches users sharing a game,
+    instead of a dense distance against ~10k dimensions for every user.
+    Users with nothing in common get no score and are never returned.
+    """
+
+    def __init__(self, user_ids, ratios):
+        self.user_ids = list(user_ids)
+        self.user_index = {u: i for i, u in enumerate(self.user_ids)}
+        mat = _row_normalize(sp.csr_matrix(ratios, dtype=np.float32))
+        mat.eliminate_zeros()
+        self.matrix = mat
+        self.by_item = mat.T.tocsr()
+
+    @classmethod
+    def from_db(cls, cursor):
+        """
+        Build from user_items addressed by the interned *_idx columns. Cosine
+        does not change with row scaling, so raw playtime_forever gives the
+        same neighbours as the user_play_ratio values.
+        """
+        users, games = load_interners(cursor)
+        cursor.execute("""
+            SELECT user_idx, item_idx, COALESCE(playtime_forever, 0)
+            FROM user_items
+            WHERE user_idx IS NOT NULL AND item_idx IS NOT NULL;
+        """)
+        rows = cursor.fetchall()
+        r, c, pf = (list(col) for col in zip(*rows)) if rows else ([], [], [])
+        ratios = sp.csr_matrix((np.asarray(pf, dtype=np.float32), (r, c)),
+                               shape=(len(users), len(games)))
+        return cls(users.keys, ratios)
+
+    @staticmethod
+    def _ranked(idx, vals, k, exclude=None):
+        """Top-k (user rows, similarities) among the scored users ``idx``."""
+        if exclude is not None:
+            keep = idx != exclude
+            idx, vals = idx[keep], vals[keep]
+        top = _top_k(vals, k)
+        return idx[top], vals[top]
+
+    def neighbours_of(self, u, k=K_NEIGHBOR):
+        """(user rows, cosine similarities) of the k users closest to row u, best first."""
+        sims = (self.matrix[u] @ self.by_item).tocsr()
+        return self._ranked(sims.indices, sims.data, k, exclude=u)
+
+    def neighbours(self, user_id, k=K_NEIGHBOR):
+        """[(user_id, similarity)] of the k users closest to ``user_id``."""
+        idx, sims = self.neighbours_of(self.user_index[user_id], k)
+        return [(self.user_ids[i], float(s)) for i, s in zip(idx, sims)]
+
+    def query(self, item_cols, weights, k=K_NEIGHBOR):
+        """Neighbours of a library that is not in the matrix (game columns + playtimes)."""
+        q = sp.csr_matrix((np.asarray(weights, dtype=np.float32),
+                           (np.zeros(len(item_cols), dtype=np.int64), item_cols)),
+                          shape=(1, self.matrix.shape[1]))
+        sims = (_row_normalize(q) @ self.by_item).tocsr()
+        idx, sims = self._ranked(sims.indices, sims.data, k)
+        return [(self.user_ids[i], float(s)) for i, s in zip(idx, sims)]
+
+    def _block(self, start, stop, k, out_idx, out_sims):
+        sims = (self.matrix[start:stop] @ self.by_item).tocsr()
+        for row in range(stop - start):
+            s, e = sims.indptr[row], sims.indptr[row + 1]
+            idx, vals = self._ranked(sims.indices[s:e], sims.data[s:e], k, exclude=start + row)
+            out_idx[start + row, :idx.size] = idx
+            out_sims[start + row, :idx.size] = vals
+
+    def max_reach(self):
+        """Most users any one user shares a game with (bounds a score row's size)."""
+        owned = self.matrix.copy()
+        owned.data[:] = 1.0
+        owners = np.asarray(owned.sum(axis=0)).ravel()
+        reach = owned @ owners
+        return int(min(self.matrix.shape[0], reach.max())) if reach.size else 0
+
+    def all_pairs(self, k=K_NEIGHBOR, block_users=BLOCK_USERS, threads=THREADS, budget=None):
+        """
+        Every user's top-k neighbours as (n_users x k int32 rows, float32
+        similarities). Query rows are scored in blocks of at most
+        ``block_users``, ``threads`` blocks at a time; with a ``budget`` the
+        blocks shrink so that many worst-case score blocks (one entry per
+        user sharing a game) fit. Rows with fewer than k neighbours are
+        padded with -1 / 0.
+        """
+        budget = budget or MemoryBudget()
+        n = self.matrix.shape[0]
+        threads = max(1, min(threads, THREADS))
+        out_idx = np.full((n, k), -1, dtype=np.int32)
+        out_sims = np.zeros((n, k), dtype=np.float32)
+        bytes_per_user = max(1, self.max_reach()) * BYTES_PER_SCORE * threads
+        # Block sizes are drawn one wave at a time so they follow the live RSS
+        blocks = budget.chunks(n, bytes_per_user, maximum=block_users)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            while True:
+                wave = list(islice(blocks, threads))
+                if not wave:
+                    break
+                list(pool.map(lambda b: self._block(b[0], b[1], k, out_idx, out_sims), wave))
+        return out_idx, out_sims
+
+def save_neighbours(path, user_ids, idx, sims):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez_compressed(path, user_ids=np.asarray(user_ids, dtype=object).astype(str),
+                        neighbours=idx, similarities=sims)
+    return path
+
+def load_neighbours(path=NEIGHBOURS_PATH):
+    """(user_ids, neighbour rows, similarities) written by save_neighbours()."""
+    with np.load(path) as data:
+        return list(data['user_ids']), data['neighbours'], data['similarities']
+
+# ------------------ Main ------------------
+def main():
+    parser = add_memory_args(argparse.ArgumentParser(description="Top-K similar users from sparse cosine"))
+    parser.add_argument('--user', default=USER_ID)
+    parser.add_argument('--k', type=int, default=K_NEIGHBOR)
+    parser.add_argument('--all-pairs', action='store_true',
+                        help="precompute every user's neighbours into --out")
+    parser.add_argument('--out', type=Path, default=NEIGHBOURS_PATH)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(**DB_CFG)
+    cursor = conn.cursor()
+    try:
+        engine = UserSimilarity.from_db(cursor)
+    finally:
+        cursor.close()
+        conn.close()
+
+    t0 = time.perf_counter()
+    if args.all_pairs:
+        idx, sims = engine.all_pairs(args.k, budget=memory_from_argv())
+        path = save_neighbours(args.out, engine.user_ids, idx, sims)
+        print(f"✅ {len(engine.user_ids)} users' top {args.k} neighbours -> {path} "
+              f"in {time.perf_counter() - t0:.1f}s")
+        return
+
+    if args.user not in engine.user_index:
+        raise RuntimeError("No games found for this user in user_items.")
+    print(f"=== Top {args.k} users similar to '{args.user}' ===")
+    for rnk, (user_id, sim) in enumerate(engine.neighbours(args.user, args.k), start=1):
+        print(f"{rnk}. {user_id} — cosine: {sim:.4f}")
+    print(f"({(time.perf_counter() - t0) * 1000:.1f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,135 @@
-import psycopg2
-import json, csv
+import argparse
+import csv
+import gzip
+import queue
+import threading
+import time
+import zlib
+from pathlib import Path
 
+from ingest_validation import USERS_JSON, USERS_JSONL, iter_users
 
+# ------------------ Configuration ------------------
+OUT_DIR = Path('.')
+BATCH_USERS = 1000   # users handed to a shard writer at a time
 
-# Load JSON safely
-with open('data/australian_users_items_clean.json', encoding='utf-8') as f:
-    users = json.load(f)
+USER_HEADER = ['user_id', 'steam_id', 'items_count', 'user_url']
+ITEM_HEADER = ['user_id', 'item_id', 'item_name', 'playtime_forever', 'playtime_2weeks']
 
-# Write users.csv
-with open('users.csv', 'w', newline='', encoding='utf-8') as f:
-    writer = csv.writer(f)
-    writer.writerow(['user_id', 'steam_id', 'items_count', 'user_url'])
-    for u in users:
-        writer.writerow([u.get('user_id'), u.get('steam_id'), u.get('items_count'), u.get('user_url')])
+# ------------------ Writers ------------------
+def shard_of(user_id, shards):
+    """Stable across runs and machines (unlike hash())."""
+    return zlib.crc32(str(user_id).encode('utf-8')) % shards
 
-# Write user_items.csv safely
-with open('user_items.csv', 'w', newline='', encoding='utf-8') as f:
-    writer = csv.writer(f)
-    writer.writerow(['user_id', 'item_id', 'item_name', 'playtime_forever', 'playtime_2weeks'])
-    
-    for u in users:
+class ShardWriter(threading.Thread):
+    """
+    Owns one shard's users/user_items CSVs and writes row batches from its
+    queue, so gzip compression of different shards runs in parallel
+    (zlib releases the GIL).
+    """
+
+    def __init__(self, out_dir, shard=None, compress=False):
+        super().__init__(daemon=True)
+        suffix = f"-{shard:03d}" if shard is not None else ""
+        ext = '.csv.gz' if compress else '.csv'
+        self.paths = (Path(out_dir) / f"users{suffix}{ext}", Path(out_dir) / f"user_items{suffix}{ext}")
+        self.compress = compress
+        self.queue = queue.Queue(maxsize=8)
+        self.error = None
+
+    def _open(self, path):
+        if self.compress:
+            return gzip.open(path, 'wt', newline='', encoding='utf-8', compresslevel=6)
+        return open(path, 'w', newline='', encoding='utf-8')
+
+    def run(self):
+        try:
+            with self._open(self.paths[0]) as uf, self._open(self.paths[1]) as itf:
+                users, items = csv.writer(uf), csv.writer(itf)
+                users.writerow(USER_HEADER)
+                items.writerow(ITEM_HEADER)
+                while True:
+                    batch = self.queue.get()
+                    if batch is None:
+                        break
+                    user_rows, item_rows = batch
+                    users.writerows(user_rows)
+                    items.writerows(item_rows)
+        except Exception as e:
+            self.error = e
+            # keep draining so the producer never blocks on a dead writer
+            while self.queue.get() is not None:
+                pass
+
+def export(users, out_dir=OUT_DIR, shards=1, compress=False, batch_users=BATCH_USERS):
+    """
+    Write users.csv and user_items.csv in one pass over ``users``.
+
+    With ``shards`` > 1 each user (and all its items) goes to shard
+    crc32(user_id) % shards, giving files that can be COPY'd in parallel.
+    Returns a stats dict.
+    """
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    writers = [ShardWriter(out_dir, s if shards > 1 else None, compress) for s in range(shards)]
+    for w in writers:
+        w.start()
+    pending = [([], []) for _ in range(shards)]
+    stats = {'users': 0, 'user_items': 0, 'bad_items': 0}
+
+    t0 = time.perf_counter()
+    for n, u in enumerate(users, 1):
+        user_id = u.get('user_id')
+        s = shard_of(user_id, shards) if shards > 1 else 0
+        user_rows, item_rows = pending[s]
+        user_rows.append([user_id, u.get('steam_id'), u.get('items_count'), u.get('user_url')])
         items = u.get('items')
         if isinstance(items, list):
-            print(f"[Warning] User {u.get('user_id')} has invalid items: {items}")
             for item in items:
                 # Ensure it's a dictionary
                 if isinstance(item, dict):
-                    writer.writerow([
-                        u.get('user_id'),
+                    item_rows.append([
+                        user_id,
                         item.get('item_id', ''),
                         item.get('item_name', ''),
                         item.get('playtime_forever', 0),
                         item.get('playtime_2weeks', 0)
                     ])
+                else:
+                    stats['bad_items'] += 1
+        if len(user_rows) >= batch_users:
+            stats['user_items'] += len(item_rows)
+            writers[s].queue.put(pending[s])
+            pending[s] = ([], [])
+        stats['users'] = n
+
+    for s, w in enumerate(writers):
+        stats['user_items'] += len(pending[s][1])
+        w.queue.put(pending[s])
+        w.queue.put(None)
+    for w in writers:
+        w.join()
+        if w.error:
+            raise w.error
+    stats['seconds'] = time.perf_counter() - t0
+    stats['files'] = [str(p) for w in writers for p in w.paths]
+    return stats
+
+# ------------------ Main ------------------
+def main():
+    parser = argparse.ArgumentParser(description="Export cleaned users to users.csv / user_items.csv")
+    parser.add_argument('--input', type=Path, help=f"defaults to {USERS_JSONL}, else {USERS_JSON}")
+    parser.add_argument('--out', type=Path, default=OUT_DIR)
+    parser.add_argument('--shards', type=int, default=1, help="split by user hash for parallel COPY")
+    parser.add_argument('--gzip', action='store_true', help="write .csv.gz")
+    args = parser.parse_args()
+
+    stats = export(iter_users(args.input), args.out, max(1, args.shards), args.gzip)
+    rows = stats['users'] + stats['user_items']
+    secs = stats['seconds'] or 1e-9
+    if stats['bad_items']:
+        print(f"[Warning] skipped {stats['bad_items']} items that were not objects")
+    print(f"✅ {stats['users']} users, {stats['user_items']} user_items in {secs:.1f}s "
+          f"({rows / secs:,.0f} rows/s) -> {len(stats['files'])} files")
+
+if __name__ == "__main__":
+    main()